@@ -0,0 +1,66 @@
+# bench_codecs.py
+"""Compare agentMatrix codecs by store size and decode throughput.
+
+Every codec is measured with and without content-addressed dedup. Codecs whose
+optional dependency is missing are skipped.
+
+Usage:
+    python benchmarks/bench_codecs.py --agents 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agentCores import agentCores, agentMatrix
+from agentCores.agentCodecs import available_codecs
+
+
+def synthetic_documents(count: int) -> list:
+    cores = agentCores(db_path=":memory:")
+    documents = []
+    for i in range(count):
+        core = cores.getNewAgentCore()
+        core["agentCore"]["agent_id"] = f"agent_{i}"
+        core["agentCore"]["version"] = 1
+        core["agentCore"]["uid"] = f"{i:08x}"
+        core["agentCore"]["models"]["large_language_model"] = ("llama3", "phi3", "mistral")[i % 3]
+        core["agentCore"]["prompts"]["agentPrompts"]["llmSystemPrompt"] = (
+            "You are a helpful assistant. " * 20 + f"Persona {i % 10}.")
+        documents.append(json.dumps(core))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=2000)
+    args = parser.parse_args()
+
+    documents = synthetic_documents(args.agents)
+    ids = [f"agent_{i}" for i in range(args.agents)]
+    print(f"{'codec':>8} {'dedup':>6} {'core MB':>9} {'section MB':>11} {'decodes/s':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in available_codecs():
+            for dedup in (False, True):
+                path = os.path.join(tmp, f"{name}_{dedup}.db")
+                try:
+                    matrix = agentMatrix(path, codec=name, dedup=dedup)
+                except ImportError as e:
+                    print(f"{name:>8} skipped: {e}")
+                    break
+                matrix.bulk_upsert(documents, ids)
+                stats = matrix.storage_stats()
+                start = time.perf_counter()
+                decoded = sum(1 for _ in matrix.iter_cores(decode=True))
+                rate = decoded / (time.perf_counter() - start)
+                print(f"{name:>8} {str(dedup):>6} {stats['core_bytes'] / 1e6:>9.2f} "
+                      f"{stats['section_bytes'] / 1e6:>11.2f} {rate:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_embeddings.py
+"""Measure embeddingStore search latency and IVF recall against exact search.
+
+Random unit vectors are added in batches, then the same queries are answered
+by brute force and by the IVF index at several nprobe settings. Recall@k is
+the share of exact top-k ids the approximate search also returns.
+
+Usage:
+    python benchmarks/bench_embeddings.py --rows 100000 --dim 384
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import numpy as np
+
+from agentCores import embeddingStore
+
+
+def timed_search(store, queries, k, **kwargs):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append([hit["id"] for hit in store.search(query, k=k, with_text=False, **kwargs)])
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = embeddingStore(os.path.join(tmp, "embeddings.db"), dim=args.dim)
+        start = time.perf_counter()
+        for offset in range(0, args.rows, args.batch):
+            count = min(args.batch, args.rows - offset)
+            store.add(rng.standard_normal((count, args.dim), dtype=np.float32))
+        print(f"add: {args.rows / (time.perf_counter() - start):,.0f} vectors/s")
+
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        exact, exact_ms = timed_search(store, queries, args.k, exact=True)
+        print(f"exact: {exact_ms:.2f} ms/query")
+
+        start = time.perf_counter()
+        index = store.build_index()
+        print(f"ivf build (nlist={index.nlist}): {time.perf_counter() - start:.2f} s")
+        for nprobe in (1, 4, 16, 64):
+            approx, approx_ms = timed_search(store, queries, args.k, nprobe=nprobe)
+            recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)])
+            print(f"ivf nprobe={nprobe:>3}: {approx_ms:.2f} ms/query, recall@{args.k} {recall:.3f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
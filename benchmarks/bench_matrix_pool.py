@@ -0,0 +1,57 @@
+# bench_matrix_pool.py
+"""Compare connect-per-call agentMatrix against the pooled connection mode.
+
+Usage:
+    python benchmarks/bench_matrix_pool.py --agents 500 --rounds 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agentCores.agentMatrix import agentMatrix
+
+
+def run(matrix: agentMatrix, agent_ids: list, rounds: int) -> dict:
+    document = json.dumps({"agentCore": {"agent_id": None, "version": 1, "uid": None}})
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for agent_id in agent_ids:
+            matrix.upsert(documents=[document], ids=[agent_id], metadatas=[{"save_date": "2024-12-11"}])
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for agent_id in agent_ids:
+            matrix.get(ids=[agent_id])
+    read_time = time.perf_counter() - start
+
+    ops = rounds * len(agent_ids)
+    return {"writes_per_sec": ops / write_time, "reads_per_sec": ops / read_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    agent_ids = [f"agent_{i}" for i in range(args.agents)]
+    with tempfile.TemporaryDirectory() as tmp:
+        per_call = agentMatrix(os.path.join(tmp, "per_call.db"))
+        results = {"connect_per_call": run(per_call, agent_ids, args.rounds)}
+        with agentMatrix(os.path.join(tmp, "pooled.db"), pool_size=args.pool_size) as pooled:
+            results["pooled"] = run(pooled, agent_ids, args.rounds)
+
+    for mode, stats in results.items():
+        print(f"{mode:>17}: {stats['writes_per_sec']:>10.0f} writes/s  {stats['reads_per_sec']:>10.0f} reads/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# bench_mint.py
+"""Measure agent minting throughput.
+
+Compares template copies (json round trip vs the snapshot template factory) and
+mints per second for mintAgent in a loop vs one mintAgents batch.
+
+Usage:
+    python benchmarks/bench_mint.py --agents 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agentCores import agentCores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--copies", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cores = agentCores(db_path=os.path.join(tmp, "agent_matrix.db"))
+
+        start = time.perf_counter()
+        for _ in range(args.copies):
+            json.loads(json.dumps(cores.base_template))
+        json_rate = args.copies / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(args.copies):
+            cores.getNewAgentCore()
+        factory_rate = args.copies / (time.perf_counter() - start)
+        print(f"template copies: json round trip {json_rate:>10.0f}/s  snapshot factory {factory_rate:>10.0f}/s")
+
+        start = time.perf_counter()
+        for i in range(args.agents):
+            cores.mintAgent(f"loop_{i}", model_config={"large_language_model": "llama3"})
+        loop_rate = args.agents / (time.perf_counter() - start)
+
+        batch = [{"agent_id": f"batch_{i}", "model_config": {"large_language_model": "llama3"}}
+                 for i in range(args.agents)]
+        start = time.perf_counter()
+        cores.mintAgents(batch)
+        batch_rate = args.agents / (time.perf_counter() - start)
+        print(f"mints:           mintAgent loop   {loop_rate:>10.0f}/s  mintAgents batch {batch_rate:>10.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
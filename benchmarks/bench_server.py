@@ -0,0 +1,89 @@
+# bench_server.py
+"""Load test the chat server with concurrent clients and the stub model backend.
+
+Each client runs its own session with one agent and sends several turns over
+TCP. Reported: time to first token (p50/p99), turn latency and turns/s.
+With --batch-window the server micro-batches concurrent requests per model.
+
+Usage:
+    python benchmarks/bench_server.py --clients 200 --agents 20 --turns 5 --model-limit 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agentCores import agentCores
+from agentCores.agentServer import agentServer, chat_request
+from agentCores.agentBackends import stubBackend
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def client(server, agent_id, session_id, turns, ttfts, latencies, counts):
+    for turn in range(turns):
+        start = time.perf_counter()
+        first = None
+        async for reply in chat_request(server.host, server.port, agent_id, f"question {turn}", session_id):
+            if "error" in reply:
+                raise RuntimeError(reply["error"])
+            if "token" in reply:
+                counts[0] += 1
+                if first is None:
+                    first = time.perf_counter() - start
+        ttfts.append(first)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(args, db_path):
+    cores = agentCores(db_path=db_path, pool_size=8, cache_size=args.agents)
+    cores.mintAgents([
+        {"agent_id": f"agent_{i}", "model_config": {"large_language_model": f"model_{i % 2}"}}
+        for i in range(args.agents)
+    ])
+    backend = stubBackend(tokens=args.tokens, token_delay=args.token_delay, first_token_delay=args.first_token_delay)
+    server = agentServer(cores, backend=backend, port=0, default_model_limit=args.model_limit,
+                         batch_window=args.batch_window, max_batch=args.max_batch)
+    await server.start()
+    ttfts, latencies, counts = [], [], [0]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(server, f"agent_{i % args.agents}", f"session_{i}", args.turns, ttfts, latencies, counts)
+        for i in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - start
+    await server.close()
+    print(f"{args.clients} clients x {args.turns} turns in {elapsed:.2f} s")
+    print(f"ttft    p50 {percentile(ttfts, 0.5) * 1000:.1f} ms  p99 {percentile(ttfts, 0.99) * 1000:.1f} ms")
+    print(f"turn    p50 {percentile(latencies, 0.5) * 1000:.1f} ms  p99 {percentile(latencies, 0.99) * 1000:.1f} ms"
+          f"  mean {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"turns   {len(latencies) / elapsed:,.0f}/s  ({counts[0] / elapsed:,.0f} streamed chunks/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--agents", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=32)
+    parser.add_argument("--token-delay", type=float, default=0.001)
+    parser.add_argument("--first-token-delay", type=float, default=0.01)
+    parser.add_argument("--model-limit", type=int, default=8)
+    parser.add_argument("--batch-window", type=float, default=None)
+    parser.add_argument("--max-batch", type=int, default=16)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, os.path.join(tmp, "agent_matrix.db")))
+
+
+if __name__ == "__main__":
+    main()
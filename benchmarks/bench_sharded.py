@@ -0,0 +1,77 @@
+# bench_sharded.py
+"""Measure write and read throughput of ShardedAgentMatrix against one agentMatrix.
+
+Several writer threads upsert disjoint batches of agent cores at the same time,
+as concurrent minting and import jobs do, then every core is read back with get
+and listed in agent_id order. Finally the sharded store is rebalanced.
+
+Usage:
+    python benchmarks/bench_sharded.py --agents 20000 --writers 8 --shards 1 4 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agentCores import agentMatrix, ShardedAgentMatrix
+
+
+def make_core(agent_id):
+    return json.dumps({"agentCore": {
+        "agent_id": agent_id, "uid": None, "version": None,
+        "models": {"large_language_model": "llama3"},
+        "prompts": {"user_input_prompt": f"You are {agent_id}. " * 20},
+    }})
+
+
+def run(matrix, ids, writers, batch):
+    batches = [ids[i:i + batch] for i in range(0, len(ids), batch)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(lambda chunk: matrix.bulk_upsert([make_core(i) for i in chunk], chunk), batches))
+    write_rate = len(ids) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        found = sum(pool.map(lambda chunk: len(matrix.get(chunk)["ids"]), batches))
+    read_rate = found / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    listed = sum(1 for _ in matrix.list_summaries())
+    list_rate = listed / (time.perf_counter() - start)
+    return write_rate, read_rate, list_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=250)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    ids = [f"agent_{i:07d}" for i in range(args.agents)]
+    with tempfile.TemporaryDirectory() as tmp:
+        matrix = agentMatrix(os.path.join(tmp, "single.db"), pool_size=args.writers)
+        rates = run(matrix, ids, args.writers, args.batch)
+        matrix.close()
+        print(f"agentMatrix          write {rates[0]:>9.0f}/s  get {rates[1]:>9.0f}/s  list {rates[2]:>9.0f}/s")
+
+        for shards in args.shards:
+            matrix = ShardedAgentMatrix(os.path.join(tmp, f"sharded{shards}.db"), shards=shards, pool_size=2)
+            rates = run(matrix, ids, args.writers, args.batch)
+            print(f"sharded shards={shards:<3}  write {rates[0]:>9.0f}/s  get {rates[1]:>9.0f}/s  list {rates[2]:>9.0f}/s")
+            start = time.perf_counter()
+            matrix.rebalance(shards + 1)
+            print(f"  rebalance {shards} -> {shards + 1}: {time.perf_counter() - start:.2f} s")
+            matrix.close()
+
+
+if __name__ == "__main__":
+    main()
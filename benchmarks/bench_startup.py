@@ -0,0 +1,78 @@
+# bench_startup.py
+"""Measure package import time and CLI startup time in fresh interpreters.
+
+Each measurement starts a new Python process, so module caches from earlier
+runs do not hide import costs. The CLI runs against a temporary copy of the
+packaged agent matrix and exits immediately.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 20 --importtime
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def run(args, stdin=None, env=None):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], input=stdin, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start
+
+
+def report(name, samples, baseline):
+    median = statistics.median(samples) * 1000
+    print(f"{name:<28} median {median:7.1f} ms  (+{median - baseline:6.1f} ms over bare python)"
+          f"  min {min(samples) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", action="store_true",
+                        help="Also list the slowest imports from python -X importtime")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "agent_matrix.db")
+        shutil.copyfile(os.path.join(SRC, "agentCores", "data", "agent_matrix.db"), db_path)
+        # First start migrates the copy; later starts measure the steady state
+        run(["-m", "agentCores", "--db-path", db_path], stdin="/exit\n", env=env)
+
+        cases = [
+            ("python -c pass", ["-c", "pass"], None),
+            ("import agentCores", ["-c", "import agentCores"], None),
+            ("agentCores()", ["-c", f"from agentCores import agentCores; agentCores(db_path={db_path!r})"], None),
+            ("python -m agentCores", ["-m", "agentCores", "--db-path", db_path], "/exit\n"),
+        ]
+        results = {}
+        for name, case_args, stdin in cases:
+            run(case_args, stdin, env)  # warm the bytecode and OS file caches
+            results[name] = [run(case_args, stdin, env) for _ in range(args.runs)]
+        baseline = statistics.median(results["python -c pass"]) * 1000
+        for name, samples in results.items():
+            report(name, samples, baseline)
+
+    if args.importtime:
+        output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import agentCores"],
+                                env=env, capture_output=True, text=True).stderr
+        rows = []
+        for line in output.splitlines()[1:]:
+            self_part, cumulative_us, module = line.split("|", 2)
+            rows.append((int(cumulative_us), int(self_part.split(":")[1]), module.rstrip()))
+        print("\nslowest imports (cumulative us, self us):")
+        for cumulative, self_time, module in sorted(rows, reverse=True)[:15]:
+            print(f"{cumulative:>9} {self_time:>9}  {module}")
+
+
+if __name__ == "__main__":
+    main()
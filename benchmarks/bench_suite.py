@@ -0,0 +1,343 @@
+# bench_suite.py
+"""Run the agentCores performance suite on synthetic stores and compare with a baseline.
+
+For every scale a synthetic agent matrix is generated (outside the timings),
+then each benchmark reports throughput, p50/p99 latency of its unit of work and
+the peak RSS seen while it ran:
+
+    mint           mintAgent into the populated store, one agent per op
+    load           loadAgentCore of random agents, cache disabled
+    list_page      100 listAgentCores rows from a random keyset cursor
+    list_all       iterAgentCores over the whole store, latency per 500 rows
+    iterate        iter_batches(decode=True) over the whole store, latency per batch
+    import         importAgentCores of the whole store into an empty matrix
+    migrate        migrateAgentCores of an equally large store without uid/version
+    conv_append    conversationStore.append, buffered writes
+    conv_read      conversationStore.last_turns(session, 20)
+    chat           agentServer turns on the stub backend, time to first token as p50/p99
+
+Everything runs offline: chat uses the deterministic stub backend.
+
+Results are keyed "<scale>/<benchmark>". With --baseline, a benchmark whose
+throughput drops or whose p99 rises by more than --tolerance is reported as a
+regression and the exit status is 1; p99 is only compared for benchmarks with
+at least 200 timed samples. Every benchmark except mint, import and migrate runs
+--repeat times and keeps the fastest run. Baselines are only comparable on the
+machine that recorded them; refresh with --save-baseline after intended changes.
+
+Usage:
+    python benchmarks/bench_suite.py --scales 1k --baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --scales 1k 100k 1M --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agentCores import agentCores, agentMatrix, conversationStore
+from agentCores.agentBackends import stubBackend
+from agentCores.agentServer import agentServer
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+MIN_P99_SAMPLES = 200
+
+
+class rssSampler:
+    """Track the peak resident set size of this process from a background thread."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in KiB on Linux and in bytes on macOS
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def result(items, elapsed, latencies, rss):
+    return {
+        "items": items,
+        "samples": len(latencies),
+        "seconds": round(elapsed, 4),
+        "ops_per_sec": round(items / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_rss_mb": round(rss / 2 ** 20, 1),
+    }
+
+
+def run_ops(func, args):
+    """Call func once per argument, timing each call."""
+    latencies = []
+    with rssSampler() as rss:
+        start = time.perf_counter()
+        for arg in args:
+            t = time.perf_counter()
+            func(arg)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+    return result(len(latencies), elapsed, latencies, rss.peak)
+
+
+def run_batches(batches):
+    """Consume an iterator of lists, timing the production of each list."""
+    latencies, items = [], 0
+    iterator = iter(batches)
+    with rssSampler() as rss:
+        start = time.perf_counter()
+        while True:
+            t = time.perf_counter()
+            batch = next(iterator, None)
+            if batch is None:
+                break
+            latencies.append(time.perf_counter() - t)
+            items += len(batch)
+        elapsed = time.perf_counter() - start
+    return result(items, elapsed, latencies, rss.peak)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_once(func, items):
+    """Time a single bulk call that processes items rows."""
+    with rssSampler() as rss:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    return result(items, elapsed, [elapsed], rss.peak)
+
+
+def generate_store(cores, db_path, count, versioned=True, chunk=2000):
+    """Write count synthetic agent cores derived from the base template."""
+    matrix = agentMatrix(db_path, pool_size=1)
+    template = json.dumps(cores.getNewAgentCore())
+    rng = random.Random(count)
+
+    def rows():
+        for i in range(count):
+            agent_id = f"agent_{i:08d}"
+            core = json.loads(template)
+            agent = core["agentCore"]
+            agent["agent_id"] = agent_id
+            agent["models"]["large_language_model"] = rng.choice(["llama3", "mistral", "phi3", "stub:echo"])
+            agent["prompts"]["user_input_prompt"] = f"You are {agent_id}. " + "Be helpful. " * rng.randint(1, 40)
+            agent["databases"] = {"conversation": f"agents/{agent_id}/conversations.db"}
+            if versioned:
+                agent["version"] = 1
+                agent["uid"] = f"{rng.getrandbits(32):08x}"
+            else:
+                agent["version"] = agent["uid"] = None
+            yield agent_id, json.dumps(core), {"save_date": "2024-12-11"}
+
+    matrix.upsert_rows(rows(), chunk_size=chunk)
+    matrix.close()
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the progress prints of import and migration."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def bench_chat(db_path, turns, sessions):
+    async def main():
+        # The server closes its agentCores, so every run opens its own
+        server = agentServer(agentCores(db_path=db_path), backend=stubBackend(tokens=32), workers=4)
+        prefix = os.urandom(4).hex()
+        ttft, started = [], time.perf_counter()
+
+        async def session(index):
+            for turn in range(turns // sessions):
+                t = time.perf_counter()
+                first = None
+                async for _ in server.chat("bench_chat", f"{prefix}-{index}", f"message {turn}"):
+                    if first is None:
+                        first = time.perf_counter() - t
+                ttft.append(first)
+
+        with rssSampler() as rss:
+            await asyncio.gather(*(session(i) for i in range(sessions)))
+            elapsed = time.perf_counter() - started
+        await server.close()
+        return result(len(ttft), elapsed, ttft, rss.peak)
+
+    return asyncio.run(main())
+
+
+def run_scale(name, count, args, tmp):
+    base = os.path.join(tmp, name)
+    os.makedirs(base)
+    db_path = os.path.join(base, "agent_matrix.db")
+    cores = agentCores(db_path=db_path)
+    print(f"[{name}] generating {count:,} agent cores ...", flush=True)
+    generate_store(cores, db_path, count)
+    ids = [f"agent_{i:08d}" for i in range(count)]
+    rng = random.Random(0)
+    results = {}
+
+    def best(run):
+        # Repeatable benchmarks run several times and keep the fastest run, to damp noise
+        return max((run() for _ in range(args.repeat)), key=lambda outcome: outcome["ops_per_sec"] or 0)
+
+    def record(bench, outcome):
+        results[f"{name}/{bench}"] = outcome
+        print(f"[{name}] {bench:<12} {outcome['ops_per_sec'] or 0:>12,.0f} ops/s  "
+              f"p50 {outcome['p50_ms']:>9.3f} ms  p99 {outcome['p99_ms']:>9.3f} ms  "
+              f"rss {outcome['peak_rss_mb']:>8.1f} MB", flush=True)
+
+    record("mint", run_ops(lambda i: cores.mintAgent(f"minted_{i}", model_config={"large_language_model": "llama3"}),
+                           range(args.mint_ops)))
+    load_ids = [rng.choice(ids) for _ in range(args.load_ops)]
+    record("load", best(lambda: run_ops(cores.loadAgentCore, load_ids)))
+    cursors = load_ids[:args.load_ops // 10 or 1]
+    record("list_page", best(lambda: run_ops(
+        lambda after: cores.listAgentCores(after=after, limit=100), cursors)))
+    record("list_all", best(lambda: run_batches(chunked(cores.iterAgentCores(), 500))))
+    record("iterate", best(lambda: run_batches(cores.agent_library.iter_batches(batch_size=500, decode=True))))
+    cores.close()
+
+    target = agentCores(db_path=os.path.join(base, "import_target.db"))
+    with quiet():
+        outcome = run_once(lambda: target.importAgentCores(db_path), count)
+    record("import", outcome)
+    target.close()
+
+    unversioned = os.path.join(base, "unversioned.db")
+    generate_store(cores, unversioned, count, versioned=False)
+    legacy = agentCores(db_path=unversioned)
+    with quiet():
+        outcome = run_once(legacy.migrateAgentCores, count)
+    record("migrate", outcome)
+    legacy.close()
+
+    messages = min(count, args.conversation_limit)
+    store = conversationStore(os.path.join(base, "conversations.db"), flush_interval=None)
+    sessions = [f"session_{i}" for i in range(max(1, messages // 50))]
+    record("conv_append", best(lambda: run_ops(
+        lambda i: store.append(sessions[i % len(sessions)], "user", f"message {i}"), range(messages))))
+    store.flush()
+    reads = [rng.choice(sessions) for _ in range(args.load_ops)]
+    record("conv_read", best(lambda: run_ops(lambda session: store.last_turns(session, 20), reads)))
+    store.close()
+
+    chat_cores = agentCores(db_path=db_path)
+    chat_cores.mintAgent("bench_chat", model_config={"large_language_model": "stub:echo"})
+    chat_cores.close()
+    record("chat", best(lambda: bench_chat(db_path, args.chat_turns, args.chat_sessions)))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of results against baseline as readable lines."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if previous["ops_per_sec"] and current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: {current['ops_per_sec']:,.0f} ops/s vs baseline {previous['ops_per_sec']:,.0f}")
+        # A p99 from few samples is one outlier; throughput covers those benchmarks
+        if (current["samples"] >= MIN_P99_SAMPLES and previous["p99_ms"]
+                and current["p99_ms"] > previous["p99_ms"] * (1 + tolerance)):
+            regressions.append(f"{key}: p99 {current['p99_ms']:.3f} ms vs baseline {previous['p99_ms']:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["1k"])
+    parser.add_argument("--mint-ops", type=int, default=500)
+    parser.add_argument("--load-ops", type=int, default=2000)
+    parser.add_argument("--conversation-limit", type=int, default=100_000,
+                        help="Conversation turns appended per scale, at most the scale's core count")
+    parser.add_argument("--chat-turns", type=int, default=400)
+    parser.add_argument("--chat-sessions", type=int, default=8)
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="Write the results as a new baseline JSON")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed relative throughput drop or p99 rise before a regression")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each repeatable benchmark, best kept")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.scales:
+            results.update(run_scale(name, SCALES[name], args, tmp))
+
+    report = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "results": results,
+    }
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, "w") as out:
+            json.dump(report, out, indent=2, sort_keys=True)
+            out.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        missing = sorted(set(results) - set(baseline))
+        if missing:
+            print(f"not in baseline: {', '.join(missing)}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,52 @@
 # src/agentCores/__init__.py
+# agentCores and agentMatrix share their module's name, so they are bound eagerly:
+# a later first import of the submodule would otherwise replace the lazy attribute
+# with the module. Everything else is imported on first attribute access (PEP 562),
+# so asyncio, numpy and other optional dependencies load only with the feature
+# that needs them.
+import importlib
 from .agentMatrix import agentMatrix
 from .agentCores import agentCores
 
 __version__ = "0.1.0"
-__all__ = ["agentCores", "agentMatrix"]
\ No newline at end of file
+
+_EXPORTS = {
+    "agentCoreCache": ".agentCoreCache",
+    "conversationStore": ".agentConversations",
+    "contextWindow": ".agentContext",
+    "embeddingStore": ".agentEmbeddings",
+    "ivfIndex": ".agentEmbeddings",
+    "knowledgeStore": ".agentKnowledge",
+    "federated_search": ".agentKnowledge",
+    "responseCache": ".agentResponseCache",
+    "metrics": ".agentMetrics",
+    "metricsRegistry": ".agentMetrics",
+    "ShardedAgentMatrix": ".shardedAgentMatrix",
+    "archiveWriter": ".agentArchive",
+    "read_archive": ".agentArchive",
+    "AsyncAgentMatrix": ".asyncAgentMatrix",
+    "AsyncAgentCores": ".asyncAgentCores",
+    "llmBackend": ".agentBackends",
+    "stubBackend": ".agentBackends",
+    "microBatcher": ".agentBackends",
+    "register_backend": ".agentBackends",
+    "get_backend": ".agentBackends",
+    "jsonCodec": ".agentCodecs",
+    "zlibCodec": ".agentCodecs",
+    "msgpackCodec": ".agentCodecs",
+    "register_codec": ".agentCodecs",
+    "get_codec": ".agentCodecs",
+}
+
+__all__ = ["agentCores", "agentMatrix"] + list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
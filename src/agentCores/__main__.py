@@ -1,18 +1,98 @@
+import argparse
 from .agentCores import agentCores
 
+def parse_model_limits(values):
+    """Parse repeated MODEL=N options into a dict."""
+    limits = {}
+    for value in values or []:
+        model, _, limit = value.rpartition("=")
+        if not model:
+            raise argparse.ArgumentTypeError(f"expected MODEL=N, got {value!r}")
+        limits[model] = int(limit)
+    return limits
+
+def serve(args):
+    import asyncio
+    from .agentServer import agentServer
+    from .agentBackends import stubBackend
+
+    cores = agentCores(db_path=args.db_path, pool_size=args.workers, cache_size=args.cache_size)
+    backend = stubBackend(tokens=args.stub_tokens, token_delay=args.stub_delay) if args.stub else None
+    server = agentServer(
+        cores,
+        backend=backend,
+        host=args.host,
+        port=args.port,
+        default_model_limit=args.model_limit,
+        model_limits=parse_model_limits(args.limit),
+        max_context_tokens=args.max_context_tokens,
+        workers=args.workers,
+        batch_window=args.batch_window,
+        max_batch=args.max_batch,
+        response_cache=cores.getResponseCache(ttl=args.cache_ttl) if args.response_cache else None,
+    )
+
+    async def run():
+        await server.start()
+        print(f"agentCores chat server listening on {server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
 def main():
+    parser = argparse.ArgumentParser(prog="agentCores")
+    parser.add_argument("--db-path", default=None, help="Agent matrix to use instead of the packaged one")
+    parser.add_argument("--metrics", action="store_true", help="Record performance metrics, see /stats")
+    subcommands = parser.add_subparsers(dest="command")
+    server_parser = subcommands.add_parser("serve", help="Run the concurrent multi-agent chat server")
+    server_parser.add_argument("--host", default="127.0.0.1")
+    server_parser.add_argument("--port", type=int, default=8765)
+    server_parser.add_argument("--model-limit", type=int, default=4,
+                               help="Concurrent generations per model")
+    server_parser.add_argument("--limit", action="append", metavar="MODEL=N",
+                               help="Per-model concurrency limit, repeatable")
+    server_parser.add_argument("--max-context-tokens", type=int, default=4096)
+    server_parser.add_argument("--workers", type=int, default=8, help="Threads for store access")
+    server_parser.add_argument("--cache-size", type=int, default=1024, help="Agent cores kept in memory")
+    server_parser.add_argument("--stub", action="store_true",
+                               help="Answer every model with the deterministic stub backend")
+    server_parser.add_argument("--stub-tokens", type=int, default=32)
+    server_parser.add_argument("--stub-delay", type=float, default=0.0, help="Seconds between stub tokens")
+    server_parser.add_argument("--batch-window", type=float, default=None,
+                               help="Micro-batch concurrent requests per model within this many seconds")
+    server_parser.add_argument("--max-batch", type=int, default=16)
+    server_parser.add_argument("--response-cache", action="store_true",
+                               help="Cache replies of agents with RESPONSE_CACHE_FLAG set")
+    server_parser.add_argument("--cache-ttl", type=float, default=86400.0, help="Response cache TTL in seconds")
+    args = parser.parse_args()
+
+    if args.metrics:
+        from .agentMetrics import metrics
+        metrics.enable()
+
+    if args.command == "serve":
+        serve(args)
+        return
+
     print("\n=== Welcome to agentCores Management Interface ===\n")
-    
+
     # Initialize agentCore
-    cores = agentCores()
-    
-    # Migrate existing agent cores
-    cores.migrateAgentCores()
-    
+    cores = agentCores(db_path=args.db_path)
+
+    # Migrate existing agent cores; a no-op lookup when the store is current
+    if cores.agent_library.needs_migration():
+        cores.migrateAgentCores()
+
     print("agentCore system initialized. Enter '/help' for a list of commands.\n")
-    
+
     # Start the command-line interface
     cores.commandInterface()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
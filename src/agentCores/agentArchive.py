@@ -0,0 +1,219 @@
+# agentArchive.py
+"""agentArchive
+
+Single-file, compressed JSON Lines archives of agent cores and their databases.
+
+saveToFile writes one pretty-printed JSON file per agent. An archive instead
+streams every agent into one gzip or zstd compressed JSONL file with constant
+memory, and can carry each agent's per-agent SQLite databases along. Databases
+are snapshotted with the SQLite online backup API, so live stores are copied
+consistently, and are stored as base64 chunks with their byte offsets, so they
+are restored with positional writes in any order.
+
+Records, one JSON object per line:
+    {"type": "header", "format": "agentCores-archive", "version": 1, "created": ..., "compression": ...}
+    {"type": "agent", "agent_id": ..., "save_date": ..., "databases": [db types in the archive], "core": {...}}
+    {"type": "database", "agent_id": ..., "db_type": ..., "offset": ..., "size": ..., "last": ..., "data": base64}
+    {"type": "end", "agents": n, "databases": n}
+
+A database's chunks follow its agent record. The end record marks a complete
+archive; readers raise on archives without one.
+
+Compression:
+- gzip: standard library, ".gz"
+- zstd: faster at equal ratio, ".zst" / ".zstd" (requires `pip install zstandard`)
+
+Embedding stores are archived through their embeddings.db only; the .npy
+sidecars are derived from it and rebuilt on first use.
+
+Example:
+    ```python
+    from agentCores import agentCores
+
+    cores = agentCores()
+    cores.exportAll("fleet.jsonl.zst", include_databases=True, workers=8)
+
+    restored = agentCores(db_path="restore/agent_matrix.db")
+    restored.importArchive("fleet.jsonl.zst", on_conflict="newer")
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import base64
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Iterator
+
+ARCHIVE_FORMAT = "agentCores-archive"
+ARCHIVE_VERSION = 1
+
+# Raw bytes per database record, about 1.3 MiB once base64 encoded
+CHUNK_SIZE = 1 << 20
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard package not installed. Please install with: pip install zstandard")
+    return zstandard
+
+def compression_for(path: str, compression: Optional[str] = None) -> str:
+    """Compression of an archive path: explicit, from the file extension, else gzip."""
+    if compression is None:
+        suffix = os.path.splitext(str(path))[1].lower()
+        compression = {".zst": "zstd", ".zstd": "zstd", ".jsonl": "none"}.get(suffix, "gzip")
+    if compression not in ("gzip", "zstd", "none"):
+        raise ValueError(f"Unknown compression: {compression!r}. Use 'gzip', 'zstd' or 'none'")
+    return compression
+
+def open_archive(path: str, mode: str = "r", compression: Optional[str] = None, level: Optional[int] = None):
+    """Open an archive as a text stream.
+
+    Args:
+        path (str): Archive file
+        mode (str): "r" detects the compression from the file's magic bytes, "w" uses
+            compression_for(path, compression)
+        compression (str): "gzip", "zstd" or "none" when writing
+        level (int): Compression level, defaults to 6 for gzip and 3 for zstd
+    """
+    if mode == "r":
+        with open(path, "rb") as f:
+            magic = f.read(4)
+        if magic.startswith(_GZIP_MAGIC):
+            stream = gzip.open(path, "rb")
+        elif magic == _ZSTD_MAGIC:
+            stream = _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"))
+        else:
+            stream = open(path, "rb")
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    if mode != "w":
+        raise ValueError(f"mode must be 'r' or 'w', got {mode!r}")
+    compression = compression_for(path, compression)
+    if compression == "gzip":
+        stream = gzip.open(path, "wb", compresslevel=6 if level is None else level)
+    elif compression == "zstd":
+        compressor = _zstandard().ZstdCompressor(level=3 if level is None else level)
+        stream = compressor.stream_writer(open(path, "wb"))
+    else:
+        stream = open(path, "wb")
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+def backup_database(source_path: str, target_path: str) -> None:
+    """Copy a SQLite database with the online backup API, consistent even while it is being written."""
+    source = sqlite3.connect(source_path)
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+def ordered_results(executor, func, items, window: int) -> Iterator:
+    """Yield (item, func(item)) in item order, keeping at most window calls in flight."""
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(func, item)))
+        if len(pending) >= window:
+            done_item, future = pending.popleft()
+            yield done_item, future.result()
+    while pending:
+        done_item, future = pending.popleft()
+        yield done_item, future.result()
+
+class archiveWriter:
+    """Writes the records of one archive."""
+    def __init__(self, path: str, compression: Optional[str] = None, level: Optional[int] = None):
+        self.path = path
+        self.compression = compression_for(path, compression)
+        self.agents = 0
+        self.databases = 0
+        self._out = open_archive(path, "w", self.compression, level)
+        self._write({"type": "header", "format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION,
+                     "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "compression": self.compression})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed export leaves no end record, so the archive is never mistaken as complete
+        self.close(complete=exc_type is None)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._out.write(json.dumps(record, separators=(",", ":")))
+        self._out.write("\n")
+
+    def write_agent(self, agent_id: str, document: str, save_date: Optional[str] = None,
+                    databases: Optional[list] = None) -> None:
+        """Write one agent core, splicing its JSON document in as stored rather than re-serializing it."""
+        if "\n" in document:
+            # Pretty-printed documents would span several lines
+            document = json.dumps(json.loads(document))
+        head = json.dumps({"type": "agent", "agent_id": agent_id, "save_date": save_date,
+                           "databases": databases or []}, separators=(",", ":"))
+        self._out.write(f'{head[:-1]},"core":{document}}}\n')
+        self.agents += 1
+
+    def write_database(self, agent_id: str, db_type: str, file_path: str, chunk_size: int = CHUNK_SIZE) -> None:
+        """Write a database file as base64 chunks."""
+        size = os.path.getsize(file_path)
+        with open(file_path, "rb") as f:
+            offset = 0
+            while True:
+                data = f.read(chunk_size)
+                last = offset + len(data) >= size
+                self._write({"type": "database", "agent_id": agent_id, "db_type": db_type,
+                             "offset": offset, "size": size, "last": last,
+                             "data": base64.b64encode(data).decode("ascii")})
+                offset += len(data)
+                if last or not data:
+                    break
+        self.databases += 1
+
+    def close(self, complete: bool = True) -> None:
+        if self._out.closed:
+            return
+        if complete:
+            self._write({"type": "end", "agents": self.agents, "databases": self.databases})
+        self._out.close()
+
+def read_archive(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the agent and database records of an archive.
+
+    Raises:
+        ValueError: If the file is not an archive, has an unsupported version, or
+            ends without its end record
+    """
+    with open_archive(path, "r") as f:
+        first = f.readline()
+        try:
+            header = json.loads(first)
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("format") != ARCHIVE_FORMAT:
+            raise ValueError(f"{path} is not an agentCores archive")
+        if header.get("version", 0) > ARCHIVE_VERSION:
+            raise ValueError(f"{path} has archive version {header['version']}, "
+                             f"newer than the supported {ARCHIVE_VERSION}")
+        for number, line in enumerate(f, start=2):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise ValueError(f"{path} line {number} is not a valid archive record")
+            if record["type"] == "end":
+                return
+            yield record
+    raise ValueError(f"{path} is truncated: no end record")
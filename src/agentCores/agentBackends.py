@@ -0,0 +1,377 @@
+# agentBackends.py
+"""agentBackends
+
+Pluggable LLM backends for chat_with_agent and agentServer.
+
+An agent's models.large_language_model selects the backend: "stub:echo" runs on
+the stub backend, "ollama:llama3" (or plain "llama3", using the default backend)
+on Ollama. Backend instances are created once per process and reused, so the
+Ollama backend keeps one persistent HTTP client with a timeout and retries
+instead of calling the module-level ollama.chat per message.
+
+Backends:
+- ollama: Ollama server via persistent ollama.Client / ollama.AsyncClient (requires `pip install ollama`)
+- stub: deterministic local model for tests and benchmarks, no server needed
+
+Every backend offers stream(model, messages) for blocking callers and
+astream(model, messages) for asyncio; await aclose() before an event loop that
+used astream ends, since async HTTP clients are bound to their loop. microBatcher wraps a backend so concurrent
+requests to the same model are collected for a few milliseconds and sent
+together, through the backend's abatch() when it has one; identical requests in
+a batch are generated once.
+
+Example:
+    ```python
+    from agentCores.agentBackends import get_backend, stubBackend, register_backend
+
+    backend, model = get_backend("stub:echo")
+    reply = "".join(backend.stream(model, [{"role": "user", "content": "Hi"}]))
+
+    register_backend(stubBackend(tokens=8, name="fast-stub"))
+    ```
+
+Custom backends subclass llmBackend and are made available with register_backend.
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional, Dict, Any, List, Iterator, AsyncIterator, Tuple
+
+class llmBackend:
+    """Base class of chat model backends."""
+    name = None
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield the reply to messages chunk by chunk."""
+        raise NotImplementedError
+
+    async def astream(self, model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Async counterpart of stream; runs stream on a thread unless overridden."""
+        loop = asyncio.get_running_loop()
+        chunks = iter(self.stream(model, messages))
+        done = object()
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, done)
+            if chunk is done:
+                break
+            yield chunk
+
+    def chat(self, model: str, messages: List[Dict[str, str]]) -> str:
+        """Return the complete reply to messages."""
+        return "".join(self.stream(model, messages))
+
+    def close(self) -> None:
+        """Release connections held by the backend."""
+
+    async def aclose(self) -> None:
+        """Release connections bound to the running event loop; call before the loop ends."""
+
+class stubBackend(llmBackend):
+    """Deterministic local model: the reply depends only on the model and the last message."""
+    name = "stub"
+
+    def __init__(self,
+                 tokens: int = 32,
+                 token_delay: float = 0.0,
+                 first_token_delay: float = 0.0,
+                 name: Optional[str] = None):
+        """Initialize the stub.
+
+        Args:
+            tokens (int): Tokens per reply
+            token_delay (float): Seconds between tokens
+            first_token_delay (float): Seconds before the first token, per request or per batch
+            name (str): Registry name, to register differently configured stubs
+        """
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        if name:
+            self.name = name
+
+    def _tokens(self, model: str, messages: List[Dict[str, str]]) -> List[str]:
+        seed = hashlib.sha256(f"{model}\0{messages[-1]['content'] if messages else ''}".encode()).hexdigest()
+        return [f"{seed[i % len(seed)]}{i} " for i in range(self.tokens)]
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        if self.first_token_delay:
+            time.sleep(self.first_token_delay)
+        for i, token in enumerate(self._tokens(model, messages)):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            yield token
+
+    async def astream(self, model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+        for i, token in enumerate(self._tokens(model, messages)):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+    async def abatch(self, model: str, batch: List[List[Dict[str, str]]]) -> List[str]:
+        """Answer several requests in one simulated forward pass."""
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+        if self.token_delay:
+            await asyncio.sleep(self.token_delay * max(0, self.tokens - 1))
+        return ["".join(self._tokens(model, messages)) for messages in batch]
+
+class ollamaBackend(llmBackend):
+    """Ollama server backend holding persistent blocking and async clients."""
+    name = "ollama"
+
+    def __init__(self,
+                 host: Optional[str] = None,
+                 timeout: float = 120.0,
+                 retries: int = 2,
+                 backoff: float = 0.5):
+        """Initialize the backend; clients are created on first use.
+
+        Args:
+            host (str): Ollama server URL, defaults to OLLAMA_HOST or localhost
+            timeout (float): Seconds to wait on connect and between streamed chunks
+            retries (int): Extra attempts when the server is unreachable or overloaded
+                before the first chunk arrived
+            backoff (float): Seconds before the first retry, doubled on each further one
+        """
+        try:
+            import ollama
+        except ImportError:
+            raise ImportError("ollama package not installed. Please install with: pip install ollama")
+        self._ollama = ollama
+        self.host = host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._ollama.Client(host=self.host, timeout=self.timeout)
+        return self._client
+
+    @property
+    def async_client(self):
+        # httpx async clients are bound to the event loop they were first used on
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_client[0] is not loop:
+            self._discard_async_client()
+        if self._async_client is None:
+            self._async_client = (loop, self._ollama.AsyncClient(host=self.host, timeout=self.timeout))
+        return self._async_client[1]
+
+    def _discard_async_client(self) -> None:
+        """Drop the async client, closing it on its own event loop if that loop still exists.
+
+        Its connections can only be closed by the loop that opened them. Once that
+        loop is closed, e.g. after asyncio.run returned, they are left to garbage
+        collection; await aclose() before the loop ends to release them cleanly.
+        """
+        loop, client = self._async_client
+        self._async_client = None
+        http_client = getattr(client, "_client", None)
+        if http_client is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(http_client.aclose(), loop)
+
+    def _retryable(self, error: Exception) -> bool:
+        if isinstance(error, self._ollama.ResponseError):
+            return error.status_code == 429 or error.status_code >= 500
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        try:
+            import httpx
+        except ImportError:
+            return False
+        return isinstance(error, httpx.TransportError)
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        for attempt in range(self.retries + 1):
+            started = False
+            try:
+                for chunk in self.client.chat(model=model, messages=messages, stream=True):
+                    started = True
+                    yield chunk["message"]["content"]
+                return
+            except Exception as e:
+                # Retrying after output was sent would repeat it
+                if started or attempt == self.retries or not self._retryable(e):
+                    raise
+            time.sleep(self.backoff * 2 ** attempt)
+
+    async def astream(self, model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        for attempt in range(self.retries + 1):
+            started = False
+            try:
+                async for chunk in await self.async_client.chat(model=model, messages=messages, stream=True):
+                    started = True
+                    yield chunk["message"]["content"]
+                return
+            except Exception as e:
+                if started or attempt == self.retries or not self._retryable(e):
+                    raise
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    def close(self) -> None:
+        if self._client is not None:
+            http_client = getattr(self._client, "_client", None)
+            if http_client is not None:
+                http_client.close()
+            self._client = None
+        if self._async_client is not None:
+            self._discard_async_client()
+
+    async def aclose(self) -> None:
+        if self._async_client is None:
+            return
+        loop, client = self._async_client
+        if loop is not asyncio.get_running_loop():
+            self._discard_async_client()
+            return
+        self._async_client = None
+        http_client = getattr(client, "_client", None)
+        if http_client is not None:
+            await http_client.aclose()
+
+class microBatcher(llmBackend):
+    """Collects concurrent async requests per model and dispatches them together.
+
+    Batched replies arrive as one chunk, so batching trades token-by-token
+    streaming for throughput; blocking stream() calls pass straight through.
+    """
+    def __init__(self,
+                 backend: llmBackend,
+                 window: float = 0.005,
+                 max_batch: int = 16,
+                 max_concurrent: Optional[int] = None):
+        """Wrap a backend.
+
+        Args:
+            backend (llmBackend): Backend that answers the batches
+            window (float): Seconds to wait for more requests after the first one
+            max_batch (int): Requests that trigger a dispatch without waiting
+            max_concurrent (int): Batches in flight per model; unlimited if None
+        """
+        self.backend = backend
+        self.name = backend.name
+        self.window = window
+        self.max_batch = max_batch
+        self.max_concurrent = max_concurrent
+        self._pending = {}
+        self._semaphores = {}
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        return self.backend.stream(model, messages)
+
+    async def astream(self, model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.get(model)
+        if pending is None:
+            pending = self._pending[model] = []
+            asyncio.ensure_future(self._dispatch_later(model, pending))
+        pending.append((messages, future))
+        if len(pending) >= self.max_batch:
+            self._dispatch(model, pending)
+        yield await future
+
+    async def _dispatch_later(self, model: str, pending: list) -> None:
+        await asyncio.sleep(self.window)
+        self._dispatch(model, pending)
+
+    def _dispatch(self, model: str, pending: list) -> None:
+        # A full batch may already have gone out; later requests form a new one
+        if self._pending.get(model) is pending:
+            del self._pending[model]
+            asyncio.ensure_future(self._run_batch(model, pending))
+
+    async def _run_batch(self, model: str, requests: List[Tuple[list, asyncio.Future]]) -> None:
+        # Identical requests in one batch share a single generation
+        unique = {}
+        for messages, _ in requests:
+            unique.setdefault(json.dumps(messages, sort_keys=True), messages)
+        keys = list(unique)
+        semaphore = None
+        if self.max_concurrent:
+            semaphore = self._semaphores.get(model)
+            if semaphore is None:
+                semaphore = self._semaphores[model] = asyncio.Semaphore(self.max_concurrent)
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                if hasattr(self.backend, "abatch"):
+                    replies = await self.backend.abatch(model, [unique[key] for key in keys])
+                else:
+                    replies = await asyncio.gather(*(self._collect(model, unique[key]) for key in keys))
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+        except Exception as e:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_key = dict(zip(keys, replies))
+        for messages, future in requests:
+            if not future.done():
+                future.set_result(by_key[json.dumps(messages, sort_keys=True)])
+
+    async def _collect(self, model: str, messages: List[Dict[str, str]]) -> str:
+        return "".join([chunk async for chunk in self.backend.astream(model, messages)])
+
+    def close(self) -> None:
+        self.backend.close()
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+_BACKEND_FACTORIES = {
+    "ollama": ollamaBackend,
+    "stub": stubBackend,
+}
+
+_BACKENDS: Dict[str, llmBackend] = {}
+
+DEFAULT_BACKEND = "ollama"
+
+def register_backend(backend: llmBackend) -> None:
+    """Make a backend instance available under backend.name, replacing any previous one."""
+    if not backend.name or ":" in backend.name:
+        raise ValueError(f"Invalid backend name: {backend.name!r}")
+    _BACKENDS[backend.name] = backend
+
+def get_backend(model_spec: str, default: Optional[str] = None) -> Tuple[llmBackend, str]:
+    """Resolve a large_language_model value to a backend instance and model name.
+
+    "name:model" selects a registered backend; anything else, including Ollama
+    tags such as "llama3:8b", goes to the default backend unchanged.
+
+    Raises:
+        ValueError: If the backend is unknown
+        ImportError: If the backend's optional dependency is not installed
+    """
+    prefix, sep, model = model_spec.partition(":")
+    if sep and (prefix in _BACKENDS or prefix in _BACKEND_FACTORIES):
+        name = prefix
+    else:
+        name, model = default or DEFAULT_BACKEND, model_spec
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        factory = _BACKEND_FACTORIES.get(name)
+        if factory is None:
+            raise ValueError(f"Unknown backend: {name!r}. Available backends: {available_backends()}")
+        backend = _BACKENDS[name] = factory()
+    return backend, model
+
+def available_backends() -> list:
+    """Names of the built-in and registered backends."""
+    return sorted(set(_BACKEND_FACTORIES) | set(_BACKENDS))
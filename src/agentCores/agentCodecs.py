@@ -0,0 +1,130 @@
+# agentCodecs.py
+"""agentCodecs
+
+Pluggable serialization codecs for the core_data column of agentMatrix.
+
+Every stored core is tagged with the name of the codec that wrote it, so a
+matrix can switch codecs at any time and databases holding a mix of codecs are
+read transparently. JSON text stays the default; zlib-compressed JSON and
+msgpack trade a little CPU for a much smaller store.
+
+Codecs:
+- json: plain JSON text, readable with sqlite3 and SQLite's JSON functions
+- zlib: zlib-compressed UTF-8 JSON
+- msgpack: MessagePack binary encoding (requires `pip install msgpack`)
+
+Example:
+    ```python
+    from agentCores import agentMatrix
+    
+    matrix = agentMatrix("agents.db", codec="zlib")
+    ```
+
+Custom codecs subclass jsonCodec and are made available with register_codec.
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import json
+import zlib
+from typing import Any, Dict
+
+class jsonCodec:
+    """Plain JSON text codec, and the base class for other codecs."""
+    name = "json"
+
+    def dumps(self, core: Any):
+        """Encode a decoded agent core for storage."""
+        return json.dumps(core)
+
+    def loads(self, value) -> Any:
+        """Decode a stored value into an agent core."""
+        return json.loads(value)
+
+    def encode(self, document: str):
+        """Encode a JSON document for storage."""
+        return document
+
+    def decode(self, value) -> str:
+        """Decode a stored value back into a JSON document."""
+        return value
+
+class zlibCodec(jsonCodec):
+    """zlib-compressed JSON codec."""
+    name = "zlib"
+
+    def __init__(self, level: int = 6):
+        """Initialize with a zlib compression level from 1 (fastest) to 9 (smallest)."""
+        self.level = level
+
+    def dumps(self, core: Any) -> bytes:
+        return self.encode(json.dumps(core))
+
+    def loads(self, value) -> Any:
+        return json.loads(zlib.decompress(value))
+
+    def encode(self, document: str) -> bytes:
+        return zlib.compress(document.encode("utf-8"), self.level)
+
+    def decode(self, value) -> str:
+        return zlib.decompress(value).decode("utf-8")
+
+class msgpackCodec(jsonCodec):
+    """MessagePack binary codec."""
+    name = "msgpack"
+
+    def __init__(self):
+        """Initialize the codec, failing early if msgpack is not installed."""
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("msgpack package not installed. Please install with: pip install msgpack")
+        self._msgpack = msgpack
+
+    def dumps(self, core: Any) -> bytes:
+        return self._msgpack.packb(core, use_bin_type=True)
+
+    def loads(self, value) -> Any:
+        return self._msgpack.unpackb(value, raw=False)
+
+    def encode(self, document: str) -> bytes:
+        return self.dumps(json.loads(document))
+
+    def decode(self, value) -> str:
+        return json.dumps(self.loads(value))
+
+# Codec factories by name; instances are created on first use
+_CODEC_FACTORIES = {
+    "json": jsonCodec,
+    "zlib": zlibCodec,
+    "msgpack": msgpackCodec,
+}
+_CODECS: Dict[str, jsonCodec] = {}
+
+def register_codec(codec: jsonCodec) -> None:
+    """Make a codec instance available to every agentMatrix under codec.name."""
+    if not codec.name or "+" in codec.name or codec.name == "cas":
+        raise ValueError(f"Invalid codec name: {codec.name!r}")
+    _CODECS[codec.name] = codec
+
+def get_codec(name: str) -> jsonCodec:
+    """Return the codec registered under name.
+    
+    Raises:
+        ValueError: If no codec with that name exists
+        ImportError: If the codec's optional dependency is not installed
+    """
+    codec = _CODECS.get(name)
+    if codec is None:
+        factory = _CODEC_FACTORIES.get(name)
+        if factory is None:
+            raise ValueError(f"Unknown codec: {name!r}. Available codecs: {available_codecs()}")
+        codec = _CODECS[name] = factory()
+    return codec
+
+def available_codecs() -> list:
+    """Names of the built-in and registered codecs."""
+    return sorted(set(_CODEC_FACTORIES) | set(_CODECS))
@@ -0,0 +1,126 @@
+# agentContext.py
+"""agentContext
+
+Token-budgeted, multi-turn context assembly for chat sessions.
+
+contextWindow keeps a rolling window of one session's turns in memory. Only the
+newest turns are read from the agent's conversation store when the window is
+first built; after that each build fetches just the turns written since, so
+prompt size and assembly cost stay bounded however long the session runs.
+
+Example:
+    ```python
+    from agentCores import agentCores
+    
+    cores = agentCores()
+    window = cores.getContextWindow("default_agent", "session-1", max_tokens=2048)
+    window.add("user", "What did I ask you earlier?")
+    messages = window.messages()  # system prompt + trimmed history
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable
+from .agentConversations import conversationStore
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting: about four characters per token."""
+    return len(text) // 4 + 1
+
+class contextWindow:
+    """Rolling message window for one conversation session."""
+    def __init__(self,
+                 store: conversationStore,
+                 session_id: str,
+                 system_prompt: str = "",
+                 max_tokens: int = 4096,
+                 estimator: Optional[Callable[[str], int]] = None,
+                 initial_turns: int = 200):
+        """Initialize the window.
+        
+        Args:
+            store (conversationStore): Where turns are persisted and loaded from
+            session_id (str): Session this window tracks
+            system_prompt (str): Prompt sent first on every request
+            max_tokens (int): Budget for the system prompt plus history
+            estimator (callable): Text -> token count. Defaults to estimate_tokens;
+                pass len for a character budget.
+            initial_turns (int): Newest stored turns considered when first built
+        """
+        self.store = store
+        self.session_id = session_id
+        self.max_tokens = max_tokens
+        self.estimator = estimator or estimate_tokens
+        self.initial_turns = initial_turns
+        self._lock = threading.Lock()
+        self._turns = deque()
+        self._turn_tokens = 0
+        self._last_id = None
+        self.set_system_prompt(system_prompt)
+
+    def set_system_prompt(self, system_prompt: str) -> None:
+        """Replace the system prompt, e.g. after the agent core changed."""
+        self.system_prompt = system_prompt
+        self._system_tokens = self.estimator(system_prompt) if system_prompt else 0
+
+    def add(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Record a turn in the conversation store; it joins the window on the next build."""
+        self.store.append(self.session_id, role, content, metadata)
+
+    def _append(self, turn: Dict[str, Any]) -> None:
+        tokens = self.estimator(turn["content"] or "")
+        self._turns.append((turn["role"], turn["content"], tokens))
+        self._turn_tokens += tokens
+        self._last_id = turn["id"]
+
+    def _refresh(self) -> list:
+        """Pull stored turns newer than the window into it and trim it to budget.
+        
+        Returns:
+            list: (role, content, tokens) of turns still buffered in the store
+        """
+        if self._last_id is None:
+            for turn in self.store.last_turns(self.session_id, n=self.initial_turns):
+                self._append(turn)
+            if self._last_id is None:
+                self._last_id = 0
+        pending = []
+        for turn in self.store.turns_since(self.session_id, self._last_id, include_pending=True):
+            if turn["id"] is None:
+                pending.append((turn["role"], turn["content"], self.estimator(turn["content"] or "")))
+            else:
+                self._append(turn)
+        budget = self.max_tokens - self._system_tokens
+        while len(self._turns) > 1 and self._turn_tokens > budget:
+            self._turn_tokens -= self._turns.popleft()[2]
+        return pending
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Build the chat messages: system prompt, then as many recent turns as fit.
+        
+        Turns still buffered in the store are included, and the newest turn is
+        always kept even if it alone exceeds the budget.
+        """
+        with self._lock:
+            pending = self._refresh()
+            turns = list(self._turns) + pending
+        budget = self.max_tokens - self._system_tokens
+        used = sum(tokens for _, _, tokens in turns)
+        start = 0
+        while start < len(turns) - 1 and used > budget:
+            used -= turns[start][2]
+            start += 1
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        messages.extend({"role": role, "content": content} for role, content, _ in turns[start:])
+        return messages
+
+    def token_count(self) -> int:
+        """Estimated tokens of the last built window, system prompt included."""
+        with self._lock:
+            return self._system_tokens + self._turn_tokens
@@ -0,0 +1,225 @@
+# agentConversations.py
+"""agentConversations
+
+Buffered conversation history storage for an agent's conversations.db.
+
+Writing every chat turn as its own autocommit INSERT costs a journal sync per
+turn. conversationStore buffers appended turns in memory and writes them in a
+single transaction when either flush_size turns are pending or flush_interval
+seconds have passed, and reads are served from the (session_id, timestamp)
+index. Turns of a failed flush stay buffered and are retried; failures of the
+background flusher are counted in flush_errors and kept in last_flush_error.
+
+Example:
+    ```python
+    from agentCores import agentCores
+    
+    cores = agentCores()
+    store = cores.getConversationStore("default_agent")
+    store.append("session-1", "user", "Hello!")
+    store.append("session-1", "assistant", "Hi, how can I help?")
+    last_turns = store.last_turns("session-1", n=10)
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+from .agentMetrics import metrics
+
+class conversationStore:
+    """Buffered writer and indexed reader for a conversations table."""
+    def __init__(self,
+                 db_path: str,
+                 flush_size: int = 64,
+                 flush_interval: Optional[float] = 1.0):
+        """Open the conversation database.
+        
+        Args:
+            db_path (str): Path to the agent's conversations.db
+            flush_size (int): Pending turns that trigger an immediate flush
+            flush_interval (float): Maximum seconds a turn stays buffered. None
+                disables the background flusher, leaving only size-based flushes.
+        """
+        if flush_size < 1:
+            raise ValueError("flush_size must be at least 1")
+        self.db_path = db_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT,
+                    role TEXT,
+                    content TEXT,
+                    session_id TEXT,
+                    metadata TEXT
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_conversations_session_time "
+                "ON conversations (session_id, timestamp)"
+            )
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._oldest_pending = None
+        self._closed = False
+        self._stop = threading.Event()
+        self._flusher = None
+        # Failures of the background flusher, which has no caller to raise to
+        self.flush_errors = 0
+        self.last_flush_error = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, name="conversationFlusher", daemon=True)
+            self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def append(self,
+               session_id: str,
+               role: str,
+               content: str,
+               metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Buffer one conversation turn for writing."""
+        row = (
+            datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+            role,
+            content,
+            session_id,
+            json.dumps(metadata) if metadata is not None else None
+        )
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("conversationStore is closed")
+            if not self._buffer:
+                self._oldest_pending = time.monotonic()
+            self._buffer.append(row)
+            if len(self._buffer) >= self.flush_size:
+                self._flush_locked()
+
+    def flush(self) -> int:
+        """Write every buffered turn in one transaction.
+        
+        Returns:
+            int: Number of turns written
+        """
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        if not self._buffer:
+            return 0
+        rows, self._buffer = self._buffer, []
+        self._oldest_pending = None
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO conversations (timestamp, role, content, session_id, metadata) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error:
+            # Keep the turns so a later flush can retry them
+            self._buffer = rows + self._buffer
+            self._oldest_pending = time.monotonic()
+            raise
+        return len(rows)
+
+    def _flush_loop(self) -> None:
+        """Background flush of turns older than flush_interval."""
+        while not self._stop.wait(self.flush_interval / 2):
+            with self._lock:
+                if self._oldest_pending is not None and \
+                        time.monotonic() - self._oldest_pending >= self.flush_interval:
+                    try:
+                        self._flush_locked()
+                    except sqlite3.Error as e:
+                        # The turns stay buffered and are retried on the next pass
+                        if self.last_flush_error is None:
+                            print(f"Warning: Background flush of {self.db_path} failed, will retry: {e}")
+                        self.flush_errors += 1
+                        self.last_flush_error = e
+                        metrics.inc("agentcores_conversation_flush_errors_total")
+                    else:
+                        self.last_flush_error = None
+
+    def last_turns(self, session_id: str, n: int = 10) -> List[Dict[str, Any]]:
+        """Return the last n turns of a session, oldest first. Pending turns are flushed first."""
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                "SELECT id, timestamp, role, content, session_id, metadata FROM conversations "
+                "WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (session_id, n)
+            ).fetchall()
+        return [self._to_turn(row) for row in reversed(rows)]
+
+    def turns_since(self,
+                    session_id: str,
+                    after_id: int = 0,
+                    include_pending: bool = False) -> List[Dict[str, Any]]:
+        """Return stored turns of a session with id > after_id, oldest first.
+        
+        Unlike last_turns this never forces a flush. With include_pending, turns
+        still buffered for the session are appended with id None; both reads happen
+        under the store lock so no turn is missed or returned twice.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, timestamp, role, content, session_id, metadata FROM conversations "
+                "WHERE session_id = ? AND id > ? ORDER BY id",
+                (session_id, after_id)
+            ).fetchall()
+            turns = [self._to_turn(row) for row in rows]
+            if include_pending:
+                turns.extend(
+                    self._to_turn((None,) + row) for row in self._buffer if row[3] == session_id
+                )
+        return turns
+
+    def sessions(self) -> List[str]:
+        """Return every session id stored in this database."""
+        with self._lock:
+            self._flush_locked()
+            return [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT session_id FROM conversations ORDER BY session_id")]
+
+    @staticmethod
+    def _to_turn(row: tuple) -> Dict[str, Any]:
+        id_, timestamp, role, content, session_id, metadata = row
+        return {
+            "id": id_,
+            "timestamp": timestamp,
+            "role": role,
+            "content": content,
+            "session_id": session_id,
+            "metadata": json.loads(metadata) if metadata else None
+        }
+
+    def close(self) -> None:
+        """Flush pending turns, stop the background flusher and close the database."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._closed = True
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._conn.close()
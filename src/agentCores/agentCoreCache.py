@@ -0,0 +1,123 @@
+# agentCoreCache.py
+"""agentCoreCache
+
+A bounded, thread-safe LRU cache for decoded agent cores.
+
+agentCores.loadAgentCore normally pays a SQLite round-trip and a full json.loads
+for every call. When a cache is enabled, decoded cores are kept in memory keyed by
+agent_id and tagged with the uid and version they were loaded with. Writes made
+through agentCores invalidate the affected entries.
+
+Features:
+- Least-recently-used eviction with a fixed entry budget
+- uid/version tags for validating cached entries
+- Hit, miss and eviction counters for sizing the cache
+- Cheap structural copies so callers can freely mutate returned cores
+
+Example:
+    ```python
+    from agentCores import agentCores
+    
+    cores = agentCores(cache_size=256)
+    agent = cores.loadAgentCore("default_agent")  # miss, loaded from SQLite
+    agent = cores.loadAgentCore("default_agent")  # hit
+    print(cores.core_cache.stats())
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+class agentCoreCache:
+    """LRU cache of decoded agent cores keyed by agent_id."""
+    def __init__(self, max_size: int = 128):
+        """Initialize an empty cache holding at most max_size agent cores."""
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def clone(core: Any) -> Any:
+        """Copy a JSON-shaped structure, much faster than copy.deepcopy."""
+        if isinstance(core, dict):
+            return {key: agentCoreCache.clone(value) for key, value in core.items()}
+        if isinstance(core, list):
+            return [agentCoreCache.clone(value) for value in core]
+        return core
+
+    def get(self, agent_id: str, uid: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached core, or None on a miss.
+        
+        Args:
+            agent_id (str): Agent to look up
+            uid (str): If given, an entry tagged with a different uid counts as a
+                miss and is dropped
+        """
+        with self._lock:
+            entry = self._entries.get(agent_id)
+            if entry is None or (uid is not None and entry[0] != uid):
+                if entry is not None:
+                    del self._entries[agent_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(agent_id)
+            self.hits += 1
+            core = entry[2]
+        return self.clone(core)
+
+    def put(self, agent_id: str, core: Dict[str, Any]) -> None:
+        """Cache a private copy of core, evicting the least recently used entry if full."""
+        agent_core = core.get("agentCore", {}) if isinstance(core, dict) else {}
+        entry = (agent_core.get("uid"), agent_core.get("version"), self.clone(core))
+        with self._lock:
+            self._entries[agent_id] = entry
+            self._entries.move_to_end(agent_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def tag(self, agent_id: str) -> Optional[tuple]:
+        """Return the (uid, version) tag of a cached entry without touching LRU order."""
+        with self._lock:
+            entry = self._entries.get(agent_id)
+            return entry[:2] if entry else None
+
+    def invalidate(self, agent_id: str) -> None:
+        """Drop a single agent from the cache."""
+        with self._lock:
+            self._entries.pop(agent_id, None)
+
+    def clear(self) -> None:
+        """Drop every cached agent. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._entries
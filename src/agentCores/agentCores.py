@@ -74,11 +74,26 @@ import json
 import os
 import time
 import hashlib
+import base64
 import copy
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional, Dict, Any
-from pkg_resources import resource_filename
+from typing import Optional, Dict, Any, Iterator, TYPE_CHECKING
 from .agentMatrix import agentMatrix
+from .agentCoreCache import agentCoreCache
+from .agentMetrics import metrics
+
+if TYPE_CHECKING:
+    from .agentConversations import conversationStore
+    from .agentContext import contextWindow
+    from .agentResponseCache import responseCache
+    from .agentKnowledge import knowledgeStore
 
 class agentCores:
     
@@ -96,22 +111,69 @@ class agentCores:
         "shared": {
             "global_knowledge": "shared/global_knowledge.db",
             "models": "shared/model_configs.db",
-            "prompts": "shared/prompt_templates.db"
+            "prompts": "shared/prompt_templates.db",
+            "response_cache": "shared/response_cache.db"
         }
     }
     
+    # Bump whenever _init_specific_db changes a per-agent schema so existing
+    # databases are upgraded and stale provisioning templates are rebuilt
+    AGENT_DB_SCHEMA_VERSION = 3
+    
+    # Store name of shared/global_knowledge.db in federated search results and
+    # knowledge store caches; a tuple, so no agent_id can collide with it
+    GLOBAL_KNOWLEDGE = ("shared", "global_knowledge")
+    
     def __init__(self, 
                  db_path: str = None,
                  db_config: Optional[Dict] = None,
-                 template: Optional[Dict] = None):
-        """Initialize AgentCore with optional custom configuration."""
+                 template: Optional[Dict] = None,
+                 cache_size: int = 0,
+                 pool_size: int = 0,
+                 base_path: Optional[str] = None,
+                 dedup: bool = False,
+                 codec: str = "json",
+                 matrix=None):
+        """Initialize AgentCore with optional custom configuration.
+        
+        Args:
+            db_path (str): Path to the agent matrix database, defaults to the packaged one
+            db_config (dict): Database path overrides for the base template
+            template (dict): Custom template merged into the base template
+            cache_size (int): Number of decoded agent cores kept in an in-process LRU
+                cache for loadAgentCore. 0 disables caching.
+            pool_size (int): Number of long-lived matrix connections. 0 opens a
+                connection per call.
+            base_path (str): Root directory for per-agent and shared databases,
+                defaults to the directory containing db_path
+            dedup (bool): Store shared core sections once in the matrix, see agentMatrix
+            codec (str): Codec used to write core documents, see agentCodecs
+            matrix: Open agentMatrix or ShardedAgentMatrix to use instead of opening
+                db_path; pool_size, dedup and codec then come from the matrix
+        """
         self.current_date = time.strftime("%Y-%m-%d")
         
         # Use package data path if no custom path provided
-        if db_path is None:
-            db_path = resource_filename('agentCores', 'data/agent_matrix.db')
+        if matrix is not None:
+            db_path = matrix.db_path
+        elif db_path is None:
+            db_path = str(Path(__file__).resolve().parent / 'data' / 'agent_matrix.db')
             
-        self.agent_library = agentMatrix(db_path)
+        if matrix is None:
+            matrix = agentMatrix(db_path, pool_size=pool_size, dedup=dedup, codec=codec)
+        self.agent_library = matrix
+        self.core_cache = agentCoreCache(cache_size) if cache_size > 0 else None
+        self.base_path = Path(base_path) if base_path else Path(db_path).resolve().parent
+        self.db_paths = self._init_db_paths()
+        self._template_lock = threading.Lock()
+        self._conversation_stores = {}
+        self._conversation_lock = threading.Lock()
+        self._context_windows = {}
+        self._embedding_stores = {}
+        self._knowledge_stores = {}
+        self._search_executor = None
+        self._response_cache = None
+        self._system_prompts = {}
         
         # Initialize template with any custom configuration
         self.initTemplate(template)
@@ -119,6 +181,7 @@ class agentCores:
         # Update database configuration if provided
         if db_config:
             self.base_template["agentCore"]["databases"].update(db_config)
+            self._templateFactory = None
 
     def _init_db_paths(self, custom_config: Optional[Dict] = None) -> Dict:
         """Initialize all database paths with optional custom configuration"""
@@ -162,8 +225,13 @@ class agentCores:
             Path(db_path).parent.mkdir(parents=True, exist_ok=True)
             self._init_specific_db(db_name, db_path)
             
-    def create_agent_databases(self, agent_id: str) -> Dict[str, str]:
-        """Create all necessary databases for a new agent"""
+    def create_agent_databases(self, agent_id: str, use_template: bool = True) -> Dict[str, str]:
+        """Create all necessary databases for a new agent.
+        
+        Idempotent: databases already at AGENT_DB_SCHEMA_VERSION are left alone and
+        older ones are upgraded in place. New databases are copied from a
+        schema-initialized template file unless use_template is False.
+        """
         paths = self.get_agent_db_paths(agent_id)
         
         # Create agent directory
@@ -172,10 +240,60 @@ class agentCores:
         
         # Initialize each database
         for db_type, db_path in paths.items():
-            self._init_specific_db(db_type, db_path)
+            if os.path.exists(db_path):
+                with sqlite3.connect(db_path) as conn:
+                    current = conn.execute("PRAGMA user_version").fetchone()[0]
+                if current < self.AGENT_DB_SCHEMA_VERSION:
+                    self._init_specific_db(db_type, db_path)
+            elif use_template:
+                tmp_path = f"{db_path}.{threading.get_ident()}.tmp"
+                shutil.copyfile(self._agentDbTemplate(db_type), tmp_path)
+                os.replace(tmp_path, db_path)
+            else:
+                self._init_specific_db(db_type, db_path)
             
         return paths
 
+    def provisionAgentDatabases(self,
+                                agent_ids: list,
+                                workers: int = 8,
+                                use_template: bool = True) -> Dict[str, Dict[str, str]]:
+        """Create the databases of many agents concurrently.
+        
+        Args:
+            agent_ids (list): Agents to provision
+            workers (int): Size of the thread pool. File copies and SQLite calls
+                release the GIL, so threads scale on provisioning I/O.
+            use_template (bool): Copy pre-built template files instead of running DDL
+            
+        Returns:
+            dict: agent_id -> database paths, as returned by create_agent_databases
+        """
+        if use_template:
+            # Build templates up front so workers only ever copy them
+            for db_type in self.DEFAULT_DB_PATHS["agents"]:
+                self._agentDbTemplate(db_type)
+        if workers <= 1 or len(agent_ids) <= 1:
+            return {agent_id: self.create_agent_databases(agent_id, use_template) for agent_id in agent_ids}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agentProvision") as pool:
+            results = pool.map(lambda agent_id: self.create_agent_databases(agent_id, use_template), agent_ids)
+            return dict(zip(agent_ids, results))
+
+    def _agentDbTemplate(self, db_type: str) -> str:
+        """Return a schema-initialized template database for db_type, building it once."""
+        template_dir = self.base_path / "system" / "templates"
+        template_path = template_dir / f"{db_type}.v{self.AGENT_DB_SCHEMA_VERSION}.db"
+        if not template_path.exists():
+            with self._template_lock:
+                if not template_path.exists():
+                    template_dir.mkdir(parents=True, exist_ok=True)
+                    tmp_path = f"{template_path}.{os.getpid()}.tmp"
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    self._init_specific_db(db_type, tmp_path)
+                    os.replace(tmp_path, template_path)
+        return str(template_path)
+
     def _init_specific_db(self, db_type: str, db_path: str):
         """Initialize a specific type of database with the appropriate schema"""
         with sqlite3.connect(db_path) as conn:
@@ -190,16 +308,13 @@ class agentCores:
                         metadata TEXT
                     )
                 """)
-            elif db_type == "knowledge":
                 conn.execute("""
-                    CREATE TABLE IF NOT EXISTS knowledge_base (
-                        id INTEGER PRIMARY KEY,
-                        topic TEXT,
-                        content TEXT,
-                        source TEXT,
-                        last_updated TEXT
-                    )
+                    CREATE INDEX IF NOT EXISTS idx_conversations_session_time
+                    ON conversations (session_id, timestamp)
                 """)
+            elif db_type in ("knowledge", "global_knowledge"):
+                from .agentKnowledge import init_knowledge_schema
+                init_knowledge_schema(conn)
             elif db_type == "embeddings":
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS embeddings (
@@ -209,7 +324,246 @@ class agentCores:
                         metadata TEXT
                     )
                 """)
+            if db_type in self.DEFAULT_DB_PATHS["agents"]:
+                conn.execute(f"PRAGMA user_version = {self.AGENT_DB_SCHEMA_VERSION}")
                 
+    def _agentDatabasePath(self, agent_id: str, db_type: str) -> str:
+        """Resolve an agent's database of db_type, provisioning default databases if needed.
+        
+        The path linked in the agent core wins; otherwise the default per-agent
+        path is used.
+        """
+        agent = self.loadAgentCore(agent_id)
+        db_path = None
+        if agent:
+            db_path = agent["agentCore"].get("databases", {}).get(db_type)
+        if not db_path:
+            db_path = self.create_agent_databases(agent_id)[db_type]
+        return db_path
+
+    def getConversationStore(self, agent_id: str, **store_kwargs) -> "conversationStore":
+        """Get the buffered conversation store of an agent, opening it on first use.
+        
+        The agent's linked "conversation" database is used when it has one,
+        otherwise its default per-agent path, which is provisioned if missing.
+        
+        Args:
+            agent_id (str): Agent whose conversation history to open
+            **store_kwargs: flush_size / flush_interval for a newly opened store
+        """
+        from .agentConversations import conversationStore
+        with self._conversation_lock:
+            store = self._conversation_stores.get(agent_id)
+            if store is None:
+                db_path = self._agentDatabasePath(agent_id, "conversation")
+                with metrics.timer("agentcores_db_open_seconds", db_type="conversation"):
+                    store = conversationStore(db_path, **store_kwargs)
+                self._conversation_stores[agent_id] = store
+            return store
+
+    def getEmbeddingStore(self, agent_id: str, dim: Optional[int] = None, **store_kwargs):
+        """Get the vector store of an agent's embeddings database, opening it on first use.
+        
+        Args:
+            agent_id (str): Agent whose embeddings to open
+            dim (int): Vector dimension, required the first time a store is used
+            **store_kwargs: dtype / metric for a new store, see embeddingStore
+        """
+        from .agentEmbeddings import embeddingStore
+        with self._conversation_lock:
+            store = self._embedding_stores.get(agent_id)
+            if store is None:
+                db_path = self._agentDatabasePath(agent_id, "embeddings")
+                with metrics.timer("agentcores_db_open_seconds", db_type="embeddings"):
+                    store = embeddingStore(db_path, dim=dim, **store_kwargs)
+                self._embedding_stores[agent_id] = store
+            return store
+
+    def getKnowledgeStore(self, agent_id: str) -> "knowledgeStore":
+        """Get the full-text searchable knowledge store of an agent, opening it on first use."""
+        store = self._knowledge_stores.get(agent_id)
+        if store is None:
+            store = self._cacheKnowledgeStore(agent_id, self._agentDatabasePath(agent_id, "knowledge"))
+        return store
+
+    def getGlobalKnowledgeStore(self) -> "knowledgeStore":
+        """Get the knowledge store of shared/global_knowledge.db, opening it on first use."""
+        key = self.GLOBAL_KNOWLEDGE
+        store = self._knowledge_stores.get(key)
+        if store is None:
+            db_path = self.db_paths["shared"]["global_knowledge"]
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            store = self._cacheKnowledgeStore(key, db_path)
+        return store
+
+    def _cacheKnowledgeStore(self, key: str, db_path: str) -> "knowledgeStore":
+        from .agentKnowledge import knowledgeStore
+        # Opened outside the lock so federated searches open stores in parallel
+        with metrics.timer("agentcores_db_open_seconds", db_type="knowledge"):
+            store = knowledgeStore(db_path)
+        with self._conversation_lock:
+            existing = self._knowledge_stores.setdefault(key, store)
+        if existing is not store:
+            store.close()
+        return existing
+
+    def _existingKnowledgeStore(self, agent_id: str) -> Optional["knowledgeStore"]:
+        """Open an agent's knowledge store only if its database already exists."""
+        store = self._knowledge_stores.get(agent_id)
+        if store is None:
+            agent = self.loadAgentCore(agent_id)
+            db_path = agent["agentCore"].get("databases", {}).get("knowledge") if agent else None
+            db_path = db_path or self.get_agent_db_paths(agent_id)["knowledge"]
+            if not os.path.exists(db_path):
+                return None
+            store = self._cacheKnowledgeStore(agent_id, db_path)
+        return store
+
+    def searchKnowledge(self, agent_id: str, query: str, k: int = 10, **kwargs) -> list:
+        """BM25-ranked search of an agent's knowledge base, see knowledgeStore.search."""
+        return self.getKnowledgeStore(agent_id).search(query, k=k, **kwargs)
+
+    def ingestKnowledge(self, agent_id: str, documents, **kwargs) -> int:
+        """Chunk and store documents in an agent's knowledge base, see knowledgeStore.ingest."""
+        return self.getKnowledgeStore(agent_id).ingest(documents, **kwargs)
+
+    def federatedSearch(self,
+                        query: str,
+                        agent_ids: Optional[list] = None,
+                        k: int = 10,
+                        include_global: bool = True,
+                        min_score: Optional[float] = None,
+                        timeout: Optional[float] = None,
+                        workers: int = 8,
+                        errors: Optional[Dict[str, Exception]] = None,
+                        **search_kwargs) -> list:
+        """Search global knowledge and many agents' knowledge bases at once.
+        
+        Stores are searched concurrently and merged by BM25 score, see
+        agentKnowledge.federated_search. Agents without a knowledge database are
+        skipped rather than provisioned.
+        
+        Args:
+            query (str): Free-text query
+            agent_ids (list): Agents to search; None searches every stored agent
+            k (int): Number of merged results
+            include_global (bool): Also search shared/global_knowledge.db
+            min_score (float): Return once k results scoring at least this have arrived
+            timeout (float): Return what has arrived after this many seconds
+            workers (int): Size of the search thread pool, created on first use
+            errors (dict): Filled with agent_id (or GLOBAL_KNOWLEDGE) -> exception for
+                knowledge bases that could not be searched; they are skipped either way
+            
+        Returns:
+            list: Hits best first, each with a "store" key holding the agent_id, or
+                agentCores.GLOBAL_KNOWLEDGE for shared/global_knowledge.db
+        """
+        from .agentKnowledge import federated_search
+        if agent_ids is None:
+            agent_ids = [summary["agent_id"] for summary in self.agent_library.list_summaries()]
+        sources = {}
+        if include_global:
+            sources[self.GLOBAL_KNOWLEDGE] = self.getGlobalKnowledgeStore
+        for agent_id in agent_ids:
+            sources[agent_id] = partial(self._existingKnowledgeStore, agent_id)
+        with self._conversation_lock:
+            if self._search_executor is None:
+                self._search_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agentSearch")
+        return federated_search(sources, query, k=k, min_score=min_score, timeout=timeout,
+                                executor=self._search_executor, errors=errors, **search_kwargs)
+
+    def getResponseCache(self, **cache_kwargs) -> "responseCache":
+        """Get the shared response cache, opening it on first use.
+        
+        Args:
+            **cache_kwargs: ttl / max_entries / max_bytes for a newly opened cache
+        """
+        from .agentResponseCache import responseCache
+        with self._conversation_lock:
+            if self._response_cache is None:
+                db_path = self.db_paths["shared"]["response_cache"]
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._response_cache = responseCache(db_path, **cache_kwargs)
+            return self._response_cache
+
+    def getSystemPrompt(self, agent: Dict) -> str:
+        """Build the LLM system prompt of an agent core.
+        
+        The prompt is cached per agent together with the prompt fields it was built
+        from, so a core stored with edited prompts never reuses the old prompt.
+        """
+        agent_core = agent["agentCore"]
+        prompts = agent_core["prompts"]
+        fields = (prompts["user_input_prompt"],
+                  prompts["agentPrompts"]["llmSystemPrompt"],
+                  prompts["agentPrompts"]["llmBoosterPrompt"])
+        agent_id = agent_core.get("agent_id")
+        cached = self._system_prompts.get(agent_id)
+        if cached is not None and cached[0] == fields:
+            return cached[1]
+        prompt = f"{fields[0]} {fields[1]} {fields[2]}"
+        self._system_prompts[agent_id] = (fields, prompt)
+        return prompt
+
+    def getContextWindow(self,
+                         agent_id: str,
+                         session_id: str,
+                         max_tokens: int = 4096,
+                         agent: Optional[Dict] = None) -> "contextWindow":
+        """Get the rolling context window of a chat session, creating it on first use.
+        
+        Args:
+            agent_id (str): Agent the session belongs to
+            session_id (str): Conversation session id
+            max_tokens (int): Token budget for system prompt plus history
+            agent (dict): Already loaded agent core, to skip another load
+        """
+        from .agentContext import contextWindow
+        if agent is None:
+            agent = self.loadAgentCore(agent_id)
+            if agent is None:
+                raise ValueError(f"Agent '{agent_id}' not found")
+        system_prompt = self.getSystemPrompt(agent)
+        key = (agent_id, session_id)
+        window = self._context_windows.get(key)
+        if window is None:
+            window = self._context_windows[key] = contextWindow(
+                self.getConversationStore(agent_id), session_id,
+                system_prompt=system_prompt, max_tokens=max_tokens)
+        elif window.system_prompt != system_prompt:
+            window.set_system_prompt(system_prompt)
+        return window
+
+    def closeContextWindow(self, agent_id: str, session_id: str) -> None:
+        """Forget a session's context window; its turns stay in the conversation store."""
+        self._context_windows.pop((agent_id, session_id), None)
+
+    def close(self) -> None:
+        """Flush and close open per-agent stores and the matrix connection pool."""
+        with self._conversation_lock:
+            for stores in (self._conversation_stores, self._embedding_stores, self._knowledge_stores):
+                for store in stores.values():
+                    store.close()
+                stores.clear()
+            self._context_windows.clear()
+            if self._response_cache is not None:
+                self._response_cache.close()
+                self._response_cache = None
+            if self._search_executor is not None:
+                self._search_executor.shutdown(wait=False)
+                self._search_executor = None
+        self.agent_library.close()
+
+    def _closeAgentStores(self, agent_id: str) -> None:
+        """Close the cached stores and context windows of one agent, e.g. before replacing its files."""
+        with self._conversation_lock:
+            for stores in (self._conversation_stores, self._embedding_stores, self._knowledge_stores):
+                store = stores.pop(agent_id, None)
+                if store is not None:
+                    store.close()
+            for key in [key for key in self._context_windows if key[0] == agent_id]:
+                del self._context_windows[key]
+
     def initTemplate(self, custom_template: Optional[Dict] = None) -> Dict:
         """Initialize or customize the agent template while maintaining required structure."""
         # Base template structure (as shown in previous response)
@@ -248,7 +602,8 @@ class agentCores:
                     "LATEX_FLAG": False,
                     "CMD_RUN_FLAG": False,
                     "AGENT_FLAG": True,
-                    "MEMORY_CLEAR_FLAG": False
+                    "MEMORY_CLEAR_FLAG": False,
+                    "RESPONSE_CACHE_FLAG": False
                 },
                 "conversation": {
                     "save_name": "defaultConversation",
@@ -278,12 +633,26 @@ class agentCores:
             deep_merge(base_template["agentCore"], custom_template["agentCore"])
         
         self.base_template = base_template
-        self.agentCores = json.loads(json.dumps(base_template))
+        self._templateFactory = None
+        self.agentCores = self.getNewAgentCore()
         return base_template
 
     def getNewAgentCore(self) -> Dict:
         """Get a fresh agent core based on the base template."""
-        return json.loads(json.dumps(self.base_template))  # Deep copy
+        if self._templateFactory is None:
+            self._templateFactory = self._compileTemplate(self.base_template)
+        return self._templateFactory()
+    
+    @staticmethod
+    def _compileTemplate(template: Dict):
+        """Snapshot a template into a factory that builds fresh deep copies of it.
+        
+        The template is serialized once, so each copy is a single C-accelerated
+        json.loads rather than a full json round trip or copy.deepcopy, and later
+        changes to the template object cannot leak into new cores.
+        """
+        snapshot = json.dumps(template)
+        return partial(json.loads, snapshot)
         
     def _createAgentConfig(self, agent_id: str, config: Dict) -> Dict:
         """Create a full agent configuration from base template and config data."""
@@ -315,34 +684,114 @@ class agentCores:
             ids=[agent_id],  # No need for extra agent_ prefix, keep IDs clean
             metadatas=[{"agent_id": agent_id, "save_date": self.current_date}]
         )
+        self._invalidateCache(agent_id)
+
+    def storeAgentCores(self, core_configs: Dict[str, Dict[str, Any]], chunk_size: int = 500) -> int:
+        """Store many agent configurations in one transaction.
+        
+        Args:
+            core_configs (dict): Mapping of agent_id to agent core configuration
+            chunk_size (int): Rows per executemany batch
+            
+        Returns:
+            int: Number of agent cores written
+        """
+        written = self.agent_library.bulk_upsert(
+            documents=(json.dumps(config) for config in core_configs.values()),
+            ids=core_configs.keys(),
+            metadatas=({"agent_id": agent_id, "save_date": self.current_date} for agent_id in core_configs),
+            chunk_size=chunk_size
+        )
+        for agent_id in core_configs:
+            self._invalidateCache(agent_id)
+        return written
+
+    def _invalidateCache(self, agent_id: Optional[str] = None) -> None:
+        """Drop one agent, or every agent when agent_id is None, from the core and system prompt caches."""
+        if agent_id is None:
+            self._system_prompts.clear()
+        else:
+            self._system_prompts.pop(agent_id, None)
+        if self.core_cache is None:
+            return
+        if agent_id is None:
+            self.core_cache.clear()
+        else:
+            self.core_cache.invalidate(agent_id)
 
+    @metrics.timed("agentcores_operation_seconds", op="loadAgentCore")
     def loadAgentCore(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """Load an agent configuration from the library."""
+        if self.core_cache is not None:
+            cached = self.core_cache.get(agent_id)
+            if cached is not None:
+                metrics.inc("agentcores_core_cache_total", result="hit")
+                self.agentCores = cached
+                return cached
+            metrics.inc("agentcores_core_cache_total", result="miss")
         results = self.agent_library.get(ids=[agent_id])
         if results and results["documents"]:
             loaded_config = json.loads(results["documents"][0])
+            if self.core_cache is not None:
+                self.core_cache.put(agent_id, loaded_config)
             self.agentCores = loaded_config
             return loaded_config
         return None
 
-    def listAgentCores(self) -> list:
-        """List all available agent cores."""
-        all_agents = self.agent_library.get()
-        agent_cores = []
-        for metadata, document in zip(all_agents["metadatas"], all_agents["documents"]):
-            agent_core = json.loads(document)  # Deserialize the JSON string into a dictionary
-            agent_cores.append({
-                "agent_id": metadata["agent_id"],
-                "uid": agent_core["agentCore"].get("uid", "Unknown"),
-                "version": agent_core["agentCore"].get("version", "Unknown"),
-            })
-        return agent_cores
+    def listAgentCores(self,
+                       limit: Optional[int] = None,
+                       offset: int = 0,
+                       after: Optional[str] = None,
+                       model: Optional[str] = None,
+                       saved_after: Optional[str] = None,
+                       saved_before: Optional[str] = None) -> list:
+        """List available agent cores, ordered by agent_id.
+        
+        Only the indexed summary columns are read, so no core document is
+        deserialized. Pass the last agent_id seen as after to page with a
+        keyset cursor, or use limit/offset. Use iterAgentCores to stream a
+        large store instead of building the whole list.
+        
+        Args:
+            limit (int): Maximum number of agents to return
+            offset (int): Number of matching agents to skip
+            after (str): Keyset cursor, only agents with agent_id > after are returned
+            model (str): Filter by large_language_model
+            saved_after (str): Only agents saved on or after this date (YYYY-MM-DD)
+            saved_before (str): Only agents saved on or before this date (YYYY-MM-DD)
+            
+        Returns:
+            list: Dicts with agent_id, uid, version, model and save_date
+        """
+        return list(self.iterAgentCores(limit=limit, offset=offset, after=after, model=model,
+                                        saved_after=saved_after, saved_before=saved_before))
+
+    def iterAgentCores(self,
+                       limit: Optional[int] = None,
+                       offset: int = 0,
+                       after: Optional[str] = None,
+                       model: Optional[str] = None,
+                       saved_after: Optional[str] = None,
+                       saved_before: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the summaries of listAgentCores, reading the store page by page."""
+        for summary in self.agent_library.list_summaries(
+                limit=limit, offset=offset, after=after, model=model,
+                saved_after=saved_after, saved_before=saved_before):
+            yield {
+                "agent_id": summary["agent_id"],
+                "uid": summary["uid"] if summary["uid"] is not None else "Unknown",
+                "version": summary["version"] if summary["version"] is not None else "Unknown",
+                "model": summary["model"],
+                "save_date": summary["save_date"],
+            }
     
+    @metrics.timed("agentcores_operation_seconds", op="_generateUID")
     def _generateUID(self, core_config: Dict) -> str:
         """Generate a unique identifier (UID) based on the agent core configuration."""
         core_json = json.dumps(core_config, sort_keys=True)
         return hashlib.sha256(core_json.encode()).hexdigest()[:8]
     
+    @metrics.timed("agentcores_operation_seconds", op="mintAgent")
     def mintAgent(self,
                   agent_id: str,
                   db_config: Optional[Dict] = None,
@@ -353,6 +802,57 @@ class agentCores:
         # Create agent-specific databases
         agent_db_paths = self.create_agent_databases(agent_id)
         
+        new_config = self._buildAgentCore(agent_id, agent_db_paths, db_config,
+                                          model_config, prompt_config, command_flags)
+        
+        # Store the new agent
+        self.storeAgentCore(agent_id, new_config)
+        return new_config
+
+    def mintAgents(self, batch: list, chunk_size: int = 500, workers: int = 8) -> list:
+        """Create many agents in one pass.
+        
+        The per-agent databases are provisioned concurrently from templates, every
+        core is built from the template snapshot and hashed, and all cores are
+        stored in a single transaction.
+        
+        Args:
+            batch (list): Agent ids, or dicts holding an agent_id plus any of the
+                mintAgent keyword arguments (db_config, model_config, prompt_config,
+                command_flags)
+            chunk_size (int): Rows per executemany batch when storing
+            workers (int): Threads used to provision the per-agent databases
+            
+        Returns:
+            list: The minted agent cores, in batch order
+            
+        Raises:
+            ValueError: If an agent_id appears more than once in batch; nothing is minted
+        """
+        specs = [{"agent_id": spec} if isinstance(spec, str) else spec for spec in batch]
+        counts = Counter(spec["agent_id"] for spec in specs)
+        duplicates = sorted(agent_id for agent_id, count in counts.items() if count > 1)
+        if duplicates:
+            raise ValueError(f"Duplicate agent_ids in batch: {', '.join(duplicates)}")
+        db_paths = self.provisionAgentDatabases([spec["agent_id"] for spec in specs], workers=workers)
+        minted = {}
+        for spec in specs:
+            minted[spec["agent_id"]] = self._buildAgentCore(
+                spec["agent_id"], db_paths[spec["agent_id"]],
+                spec.get("db_config"), spec.get("model_config"),
+                spec.get("prompt_config"), spec.get("command_flags")
+            )
+        self.storeAgentCores(minted, chunk_size=chunk_size)
+        return list(minted.values())
+
+    def _buildAgentCore(self,
+                        agent_id: str,
+                        agent_db_paths: Dict[str, str],
+                        db_config: Optional[Dict] = None,
+                        model_config: Optional[Dict] = None,
+                        prompt_config: Optional[Dict] = None,
+                        command_flags: Optional[Dict] = None) -> Dict:
+        """Build and hash a new agent core from the base template."""
         # Merge with any custom db_config
         if db_config:
             agent_db_paths.update(db_config)
@@ -372,9 +872,6 @@ class agentCores:
             new_config["agentCore"]["commandFlags"].update(command_flags)
         
         new_config["agentCore"]["uid"] = self._generateUID(new_config)
-        
-        # Store the new agent
-        self.storeAgentCore(agent_id, new_config)
         return new_config
 
     def resetAgentCore(self):
@@ -403,6 +900,7 @@ class agentCores:
     def deleteAgentCore(self, agent_id: str) -> None:
         """Remove an agent configuration from storage."""
         self.agent_library.delete(ids=[agent_id])
+        self._invalidateCache(agent_id)
 
     def saveToFile(self, agent_id: str, file_path: str) -> None:
         """Save an agent configuration to a JSON file."""
@@ -420,22 +918,234 @@ class agentCores:
             else:
                 raise ValueError("Invalid agent configuration file")
         
-    def migrateAgentCores(self):
-        """Add versioning and UID to existing agent cores."""
-        print("Migrating agent cores to include versioning and UID...")
-        all_agents = self.agent_library.get()
-        for metadata, document in zip(all_agents["metadatas"], all_agents["documents"]):
-            agent_core = json.loads(document)
+    def exportAll(self,
+                  archive_path: str,
+                  include_databases: bool = False,
+                  db_types: Optional[list] = None,
+                  workers: int = 4,
+                  compression: Optional[str] = None,
+                  batch_size: int = 500) -> Dict[str, int]:
+        """Stream every agent core into one compressed JSONL archive, see agentArchive.
+        
+        Memory stays bounded by batch_size whatever the number of agents. Each
+        document is parsed once, to skip invalid cores and find its databases,
+        and written as stored rather than re-serialized.
+        
+        Args:
+            archive_path (str): Archive to write; ".gz" uses gzip, ".zst" zstd
+            include_databases (bool): Also archive each agent's per-agent databases,
+                snapshotted with the SQLite backup API
+            db_types (list): Database types to include, defaults to conversation,
+                knowledge and embeddings
+            workers (int): Threads taking database snapshots in parallel
+            compression (str): "gzip", "zstd" or "none", overriding the extension
+            batch_size (int): Agent cores read per query
             
-            # Add versioning and UID if missing
-            if "version" not in agent_core["agentCore"] or agent_core["agentCore"]["version"] is None:
-                agent_core["agentCore"]["version"] = 1
-            if "uid" not in agent_core["agentCore"] or agent_core["agentCore"]["uid"] is None:
-                agent_core["agentCore"]["uid"] = self._generateUID(agent_core)
+        Returns:
+            dict: Numbers of agents and databases written
+        """
+        from .agentArchive import archiveWriter, backup_database, ordered_results
+        db_types = tuple(db_types or self.DEFAULT_DB_PATHS["agents"])
+        if include_databases:
+            # Buffered conversation turns must be on disk before the snapshots
+            with self._conversation_lock:
+                for store in self._conversation_stores.values():
+                    store.flush()
+        
+        with tempfile.TemporaryDirectory() as snapshot_dir, \
+                ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="agentExport") as pool, \
+                archiveWriter(archive_path, compression) as archive:
+            
+            def snapshot(job):
+                index, agent_id, db_type, db_path = job
+                target = os.path.join(snapshot_dir, f"{index}.db")
+                backup_database(db_path, target)
+                return target
+            
+            jobs = 0
+            for batch in self.agent_library.iter_batches(batch_size=batch_size, decode=False):
+                pending = []
+                for agent_id, document, metadata in batch:
+                    try:
+                        core = json.loads(document)
+                    except (json.JSONDecodeError, TypeError):
+                        print(f"Warning: Failed to parse agent configuration for {agent_id}")
+                        continue
+                    databases = []
+                    if include_databases:
+                        linked = core.get("agentCore", {}).get("databases") or {}
+                        defaults = self.get_agent_db_paths(agent_id)
+                        for db_type in db_types:
+                            db_path = linked.get(db_type) or defaults.get(db_type)
+                            if db_path and os.path.isfile(db_path):
+                                databases.append(db_type)
+                                pending.append((jobs, agent_id, db_type, db_path))
+                                jobs += 1
+                    archive.write_agent(agent_id, document, metadata["save_date"], databases)
+                # Snapshots run ahead on the pool while finished ones are written in order
+                for (_, agent_id, db_type, _), snapshot_path in ordered_results(
+                        pool, snapshot, pending, window=2 * max(1, workers)):
+                    archive.write_database(agent_id, db_type, snapshot_path)
+                    os.remove(snapshot_path)
+            
+            print(f"Exported {archive.agents} agents and {archive.databases} databases to {archive_path}")
+            return {"agents": archive.agents, "databases": archive.databases}
+
+    def importArchive(self,
+                      archive_path: str,
+                      on_conflict: str = "overwrite",
+                      validate: bool = True,
+                      restore_databases: bool = True,
+                      workers: int = 4) -> Dict[str, int]:
+        """Import the agents of an archive written by exportAll.
+        
+        Cores are streamed into a temporary staging matrix and then merged with
+        agentMatrix.import_from, so on_conflict and validate behave as in
+        importAgentCores. Archived databases are restored to this system's
+        per-agent paths, which the imported cores are pointed at, for exactly
+        the agents whose core was inserted or updated, so a core and its data
+        never diverge; agents kept by "skip" or "newer" keep their databases.
+        Nothing is changed if the archive turns out to be truncated or corrupt.
+        
+        Args:
+            archive_path (str): Archive to read; the compression is detected
+            on_conflict (str): "skip", "overwrite" or "newer" for existing agent_ids
+            validate (bool): Skip cores whose JSON fails SQLite's json_valid
+            restore_databases (bool): Restore the archived per-agent databases
+            workers (int): Threads decoding and writing database chunks
+            
+        Returns:
+            dict: source, invalid, inserted, updated and skipped agent counts and
+                the number of databases restored
+        """
+        from .agentArchive import read_archive
+        if on_conflict not in agentMatrix.IMPORT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {agentMatrix.IMPORT_POLICIES}, got {on_conflict!r}")
+        if not os.path.exists(archive_path):
+            raise FileNotFoundError(f"Archive not found: {archive_path}")
+        
+        print(f"Importing agent archive: {archive_path}")
+        restores = {}
+        
+        def write_chunk(part_path, offset, data):
+            with open(part_path, "r+b") as f:
+                f.seek(offset)
+                f.write(base64.b64decode(data))
+        
+        with tempfile.TemporaryDirectory() as staging_dir, \
+                ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="agentImport") as pool:
+            writes = deque()
+            
+            def rows():
+                for record in read_archive(archive_path):
+                    if record["type"] == "agent":
+                        agent_id, core = record["agent_id"], record["core"]
+                        if restore_databases and record.get("databases") and isinstance(core.get("agentCore"), dict):
+                            defaults = self.get_agent_db_paths(agent_id)
+                            linked = core["agentCore"].setdefault("databases", {})
+                            for db_type in record["databases"]:
+                                target = defaults.get(db_type) or str(
+                                    self.base_path / "agents" / agent_id / f"{db_type}.db")
+                                linked[db_type] = target
+                                restores[(agent_id, db_type)] = [target, f"{target}.restoring", False]
+                        yield agent_id, json.dumps(core), {"save_date": record.get("save_date")}
+                    elif record["type"] == "database" and restore_databases:
+                        restore = restores.get((record["agent_id"], record["db_type"]))
+                        if restore is None:
+                            continue
+                        if record["offset"] == 0:
+                            os.makedirs(os.path.dirname(restore[1]), exist_ok=True)
+                            with open(restore[1], "wb") as f:
+                                f.truncate(record["size"])
+                        writes.append(pool.submit(write_chunk, restore[1], record["offset"], record["data"]))
+                        restore[2] = record["last"]
+                        # Bound the chunks held in memory by queued writes
+                        while len(writes) > 4 * max(1, workers):
+                            writes.popleft().result()
             
-            # Save the updated agent core back to the database
-            self.storeAgentCore(metadata["agent_id"], agent_core)
+            staging_path = os.path.join(staging_dir, "staging.db")
+            staging = agentMatrix(staging_path)
+            try:
+                staging.upsert_rows(rows())
+                while writes:
+                    writes.popleft().result()
+                incomplete = [key for key, restore in restores.items() if not restore[2]]
+                if incomplete:
+                    raise ValueError(f"{archive_path} is missing database data for {incomplete[0]}")
+                counts = self.agent_library.import_from(staging_path, on_conflict=on_conflict,
+                                                        validate=validate, save_date=self.current_date,
+                                                        written_ids=True)
+            except BaseException:
+                for _, part_path, _ in restores.values():
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                raise
+            finally:
+                staging.close()
+        
+        written = set(counts.pop("written_ids"))
+        restored = 0
+        for (agent_id, _), (target, part_path, _) in restores.items():
+            if agent_id not in written:
+                os.remove(part_path)
+                continue
+            self._closeAgentStores(agent_id)
+            # Sidecars of the replaced database, the embeddings .npy files are rebuilt on first use
+            for stale in (f"{target}-wal", f"{target}-shm",
+                          f"{target}.vectors.npy", f"{target}.ids.npy", f"{target}.alive.npy"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            os.replace(part_path, target)
+            restored += 1
+        self._invalidateCache()
+        
+        for agent_id in counts.pop("invalid_ids"):
+            print(f"Warning: Failed to parse agent configuration for {agent_id}")
+        counts["databases"] = restored
+        print(f"Import complete. {counts['source']} agents processed: {counts['inserted']} added, "
+              f"{counts['updated']} updated, {counts['skipped']} kept, {counts['invalid']} invalid, "
+              f"{restored} databases restored.")
+        return counts
+        
+    def migrateAgentCores(self) -> int:
+        """Add versioning and UID to existing agent cores.
+        
+        The matrix schema is upgraded in place first. Only cores still missing a
+        uid or version are then streamed, fixed and written back batch by batch.
+        A store that is already current is detected with one index lookup and
+        left alone.
+        
+        Returns:
+            int: Number of agent cores that were updated
+        """
+        self.agent_library.migrate()
+        if not self.agent_library.has_unversioned():
+            return 0
+        print("Migrating agent cores to include versioning and UID...")
+        migrated_count = 0
+        for batch in self.agent_library.iter_batches(decode=False, unversioned_only=True):
+            migrated = {}
+            for agent_id, document, _ in batch:
+                try:
+                    agent_core = json.loads(document)
+                except (json.JSONDecodeError, TypeError):
+                    print(f"Warning: Failed to parse agent configuration for {agent_id}")
+                    continue
+                
+                # Add versioning and UID if missing
+                if "version" not in agent_core["agentCore"] or agent_core["agentCore"]["version"] is None:
+                    agent_core["agentCore"]["version"] = 1
+                if "uid" not in agent_core["agentCore"] or agent_core["agentCore"]["uid"] is None:
+                    agent_core["agentCore"]["uid"] = self._generateUID(agent_core)
+                
+                migrated[agent_id] = agent_core
+                
+            # Save each batch of updated agent cores back in one transaction
+            if migrated:
+                self.storeAgentCores(migrated)
+                migrated_count += len(migrated)
         print("Migration complete.")
+        return migrated_count
  
     def createDatabase(self, db_name: str, db_path: str) -> None:
         """Create a new database for an agent."""
@@ -453,51 +1163,66 @@ class agentCores:
         else:
             print(f"Agent '{agent_id}' not found")
 
-    def importAgentCores(self, import_db_path: str) -> None:
+    def importAgentCores(self,
+                         import_db_path,
+                         on_conflict: str = "overwrite",
+                         validate: bool = True) -> Dict[str, Any]:
         """
         Import agent cores from another agent_matrix.db file into the current system.
         
+        Rows are moved by SQLite itself, see agentMatrix.import_from: the source is
+        attached and copied with one INSERT ... SELECT per transaction, keeping
+        its stored encoding, uid, version and save_date.
+        
         Args:
-            import_db_path (str): Path to the agent_matrix.db file to import from
+            import_db_path: Path to the agent_matrix.db file to import from, or an
+                open agentMatrix or ShardedAgentMatrix
+            on_conflict (str): "skip", "overwrite" or "newer" for agent_ids that
+                already exist in this system
+            validate (bool): Skip cores whose JSON fails SQLite's json_valid
+            
+        Returns:
+            dict: source, invalid, inserted, updated and skipped counts
             
         Raises:
             FileNotFoundError: If the import database file doesn't exist
+            ValueError: If on_conflict is not a known policy
             sqlite3.Error: If there's an error reading from or writing to the databases
         """
-        if not os.path.exists(import_db_path):
-            raise FileNotFoundError(f"Import database not found: {import_db_path}")
+        if on_conflict not in agentMatrix.IMPORT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {agentMatrix.IMPORT_POLICIES}, got {on_conflict!r}")
+        if isinstance(import_db_path, (str, os.PathLike)):
+            source_paths = [import_db_path]
+        elif hasattr(import_db_path, "shards"):
+            source_paths = [shard.db_path for shard in import_db_path.shards]
+            import_db_path = import_db_path.db_path
+        else:
+            import_db_path = import_db_path.db_path
+            source_paths = [import_db_path]
+        for path in source_paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Import database not found: {path}")
             
         print(f"Importing agent cores from: {import_db_path}")
         
         try:
-            # Create a temporary agentMatrix instance for the import database
-            import_matrix = agentMatrix(import_db_path)
-            
-            # Get all agents from the import database
-            import_agents = import_matrix.get()
+            totals = {"source": 0, "invalid": 0, "inserted": 0, "updated": 0, "skipped": 0}
+            for path in source_paths:
+                counts = self.agent_library.import_from(path, on_conflict=on_conflict,
+                                                        validate=validate, save_date=self.current_date)
+                for agent_id in counts.pop("invalid_ids"):
+                    print(f"Warning: Failed to parse agent configuration for {agent_id}")
+                for key, value in counts.items():
+                    totals[key] += value
+            self._invalidateCache()
             
-            if not import_agents["documents"]:
+            if not totals["source"]:
                 print("No agents found in import database.")
-                return
-                
-            # Store each imported agent in the current system
-            for doc, id_, metadata in zip(import_agents["documents"], 
-                                        import_agents["ids"], 
-                                        import_agents["metadatas"]):
-                try:
-                    # Parse the agent configuration
-                    agent_core = json.loads(doc)
-                    
-                    # Store the agent in the current system
-                    self.storeAgentCore(id_, agent_core)
-                    print(f"Imported agent: {id_}")
-                    
-                except json.JSONDecodeError:
-                    print(f"Warning: Failed to parse agent configuration for {id_}")
-                except Exception as e:
-                    print(f"Warning: Failed to import agent {id_}: {str(e)}")
+                return totals
                     
-            print(f"Import complete. {len(import_agents['documents'])} agents processed.")
+            print(f"Import complete. {totals['source']} agents processed: {totals['inserted']} added, "
+                  f"{totals['updated']} updated, {totals['skipped']} kept, {totals['invalid']} invalid.")
+            return totals
             
         except Exception as e:
             raise Exception(f"Error importing agent cores: {str(e)}")
@@ -522,7 +1247,10 @@ class agentCores:
                 print("  /deleteAgent <uid> - Delete an agent by UID.")
                 print("  /resetAgent <uid> - Reset an agent to the base template.")
                 print("  /chat <agent_id> - Start a chat session with an agent.")
-                print("  /importAgents <db_path> - gets the agentCores from the given db path and stores them in the default agent_matrix.db")
+                print("  /importAgents <db_path> [skip|overwrite|newer] - gets the agentCores from the given db path and stores them in the default agent_matrix.db")
+                print("  /exportAll <archive_path> [--databases] - Export every agentCore to one compressed JSONL archive.")
+                print("  /importArchive <archive_path> [skip|overwrite|newer] - Import the agents and databases of an archive.")
+                print("  /stats [on|off|reset|json|prometheus] - Show or control performance metrics.")
                 print("  /exit - Exit the interface.")
                 
             elif command.startswith("/chat"):
@@ -535,8 +1263,7 @@ class agentCores:
                     print(f"⚠️ Error starting chat: {e}")
                     
             elif command == "/agentCores":
-                agents = self.listAgentCores()
-                for agent in agents:
+                for agent in self.iterAgentCores():
                     print(f"ID: {agent['agent_id']}, UID: {agent['uid']}, Version: {agent['version']}")
                     
             elif command.startswith("/showAgent"):
@@ -705,22 +1432,76 @@ class agentCores:
 
             elif command.startswith("/importAgents"):
                     try:
-                        _, import_path = command.split()
-                        self.importAgentCores(import_path)
+                        _, import_path, *policy = command.split()
+                        if len(policy) > 1:
+                            raise ValueError
+                        self.importAgentCores(import_path, *policy)
                     except ValueError:
-                        print("Usage: /importAgents <path_to_agent_matrix.db>")
+                        print("Usage: /importAgents <path_to_agent_matrix.db> [skip|overwrite|newer]")
                     except Exception as e:
                         print(f"⚠️ Error importing agents: {e}")
             
+            elif command.startswith("/exportAll"):
+                args = command.split()[1:]
+                if len(args) not in (1, 2) or args[1:] not in ([], ["--databases"]):
+                    print("Usage: /exportAll <archive_path> [--databases]")
+                else:
+                    try:
+                        self.exportAll(args[0], include_databases=len(args) == 2)
+                    except Exception as e:
+                        print(f"⚠️ Error exporting agents: {e}")
+            
+            elif command.startswith("/importArchive"):
+                args = command.split()[1:]
+                if len(args) not in (1, 2):
+                    print("Usage: /importArchive <archive_path> [skip|overwrite|newer]")
+                else:
+                    try:
+                        self.importArchive(*args)
+                    except Exception as e:
+                        print(f"⚠️ Error importing archive: {e}")
+            
+            elif command.startswith("/stats"):
+                args = command.split()[1:]
+                option = args[0] if args else None
+                if option == "on":
+                    metrics.enable()
+                    print("Metrics enabled.")
+                elif option == "off":
+                    metrics.disable()
+                    print("Metrics disabled.")
+                elif option == "reset":
+                    metrics.reset()
+                    print("Metrics reset.")
+                elif option == "json":
+                    print(metrics.to_json(indent=2))
+                elif option == "prometheus":
+                    print(metrics.to_prometheus(), end="")
+                elif option is None:
+                    if not metrics.enabled:
+                        print("Metrics are disabled. Enable with '/stats on' or AGENTCORES_METRICS=1.")
+                    print(metrics.summary() or "No metrics recorded yet.")
+                else:
+                    print("Usage: /stats [on|off|reset|json|prometheus]")
+            
             elif command == "/exit":
                 break
             
             else:
                 print("Invalid command. Type '/help' for options.")
 
-    def chat_with_agent(self, agent_id: str):
-        """Interactive chat session with a specified agent."""
-        #TODO add agentCores default conversation history db
+    def chat_with_agent(self,
+                        agent_id: str,
+                        session_id: Optional[str] = None,
+                        max_context_tokens: int = 4096,
+                        use_cache: Optional[bool] = None):
+        """Interactive chat session with a specified agent.
+        
+        Prior turns of the session are sent along with each message, trimmed to
+        max_context_tokens. Pass an existing session_id to resume a conversation.
+        Replies are served from the response cache when use_cache is True, or
+        when it is None and the agent's RESPONSE_CACHE_FLAG is set.
+        """
         #TODO allow get access to default knowledge bases
         try:
             # Load the agent
@@ -729,51 +1510,61 @@ class agentCores:
                 print(f"Agent '{agent_id}' not found.")
                 return
 
-            # Check if Ollama is available
+            # Get the agent's configuration
+            llm = agent["agentCore"]["models"]["large_language_model"]
+            if not llm:
+                print("No language model configured for this agent.")
+                return
+
+            # The model setting picks the backend, e.g. "llama3" or "stub:echo"
+            from .agentBackends import get_backend
             try:
-                import ollama
-                OLLAMA_AVAILABLE = True
-            except ImportError:
-                print("Ollama package not installed. Please install with: pip install ollama")
+                backend, model = get_backend(llm)
+            except ImportError as e:
+                print(e)
                 return
 
+            # A random id, so chats started in the same second never share history
+            session_id = session_id or uuid.uuid4().hex
             print(f"\nStarting chat with {agent_id}...")
+            print(f"Session: {session_id}")
             print("Type 'exit' to end the conversation.\n")
 
-            # Get the agent's configuration
-            llm = agent["agentCore"]["models"]["large_language_model"]
-            if not llm:
-                print("No language model configured for this agent.")
-                return
+            if use_cache is None:
+                use_cache = agent["agentCore"].get("commandFlags", {}).get("RESPONSE_CACHE_FLAG", False)
+            cache = self.getResponseCache() if use_cache else None
+            uid = agent["agentCore"].get("uid")
 
-            # Construct system prompt
-            system_prompt = (
-                f"{agent['agentCore']['prompts']['user_input_prompt']} "
-                f"{agent['agentCore']['prompts']['agentPrompts']['llmSystemPrompt']} "
-                f"{agent['agentCore']['prompts']['agentPrompts']['llmBoosterPrompt']}"
-            )
+            # Rolling context: cached system prompt plus the session's recent turns
+            context = self.getContextWindow(agent_id, session_id, max_tokens=max_context_tokens, agent=agent)
 
             while True:
                 # Get user input
                 user_input = input("\nYou: ").strip()
                 if user_input.lower() == 'exit':
+                    context.store.flush()
                     print("\nEnding chat session...")
                     break
 
                 # Stream the response
+                context.add("user", user_input)
                 print("\nAssistant: ", end='', flush=True)
-                stream = ollama.chat(
-                    model=llm,
-                    messages=[
-                        {'role': 'system', 'content': system_prompt},
-                        {'role': 'user', 'content': user_input}
-                    ],
-                    stream=True,
-                )
-
+                response = []
+                messages = context.messages()
+                if cache is not None:
+                    stream = cache.stream(cache.key(uid, llm, messages),
+                                          partial(backend.stream, model, messages), uid, llm)
+                else:
+                    stream = backend.stream(model, messages)
+                turn = metrics.chat_turn(llm)
                 for chunk in stream:
-                    print(chunk['message']['content'], end='', flush=True)
+                    turn.token()
+                    print(chunk, end='', flush=True)
+                    response.append(chunk)
+                turn.finish()
                 print()  # New line after response
+                
+                context.add("assistant", "".join(response), {"model": llm})
 
         except Exception as e:
             print(f"\n⚠️ Error in chat session: {e}")
@@ -0,0 +1,502 @@
+# agentEmbeddings.py
+"""agentEmbeddings
+
+Vector storage and top-k search over an agent's embeddings.db.
+
+Vectors are stored in the existing embeddings table as fixed-dtype NumPy
+buffers, which stays the source of truth. Alongside it an embeddingStore keeps
+a memory-mapped matrix of the (normalized) vectors, so a search is one
+vectorized matrix product instead of a scan that decodes every blob. For large
+collections an inverted-file (IVF) index written in NumPy narrows each search to
+the closest clusters.
+
+Features:
+- Batched add and delete in single transactions
+- Memory-mapped .npy sidecars that grow geometrically and sync incrementally,
+  including rows deleted or replaced through other connections, which triggers
+  record in the embedding_changes table
+- Exact brute-force top-k with cosine, dot product or euclidean scoring
+- Optional approximate search with ivfIndex
+
+Requires numpy (`pip install numpy`).
+
+Example:
+    ```python
+    from agentCores import agentCores
+
+    cores = agentCores()
+    store = cores.getEmbeddingStore("default_agent", dim=384)
+    ids = store.add(vectors, texts=["first chunk", "second chunk"])
+    hits = store.search(query_vector, k=5)
+
+    store.build_index(nlist=256)          # optional approximate index
+    hits = store.search(query_vector, k=5, nprobe=16)
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, List
+
+np = None
+
+# Rows already in the matrix that are deleted, updated or replaced by any
+# connection are logged, so every store's _sync can mask or refresh them
+CHANGE_LOG_SQL = (
+    "CREATE TABLE IF NOT EXISTS embedding_changes (seq INTEGER PRIMARY KEY, id INTEGER NOT NULL)",
+    """
+    CREATE TRIGGER IF NOT EXISTS embeddings_log_delete AFTER DELETE ON embeddings BEGIN
+        INSERT INTO embedding_changes (id) VALUES (old.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS embeddings_log_update AFTER UPDATE OF id, embedding ON embeddings BEGIN
+        INSERT INTO embedding_changes (id) VALUES (old.id);
+        INSERT INTO embedding_changes (id) SELECT new.id WHERE new.id != old.id;
+    END
+    """,
+    # INSERT OR REPLACE deletes without firing the delete trigger, so re-used ids are logged here
+    """
+    CREATE TRIGGER IF NOT EXISTS embeddings_log_replace AFTER INSERT ON embeddings
+    WHEN new.id <= (SELECT CAST(value AS INTEGER) FROM embedding_meta WHERE key = 'matrix_synced_id')
+    BEGIN
+        INSERT INTO embedding_changes (id) VALUES (new.id);
+    END
+    """,
+)
+
+def _require_numpy():
+    # numpy is imported on first use so importing the package stays fast
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("numpy package not installed. Please install with: pip install numpy")
+        np = numpy
+
+class ivfIndex:
+    """Inverted-file approximate nearest neighbour index over an embeddingStore matrix."""
+    def __init__(self, nlist: int = 100, iterations: int = 10, sample_size: int = 50000, seed: int = 0):
+        """Initialize an untrained index.
+
+        Args:
+            nlist (int): Number of k-means clusters
+            iterations (int): k-means iterations when training
+            sample_size (int): Maximum vectors used to train the centroids
+            seed (int): Random seed, so builds are reproducible
+        """
+        _require_numpy()
+        self.nlist = nlist
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.seed = seed
+        self.centroids = None
+        self.lists = []
+
+    def train(self, vectors) -> None:
+        """Fit normalized centroids with spherical k-means on a sample of vectors."""
+        rng = np.random.default_rng(self.seed)
+        count = len(vectors)
+        nlist = max(1, min(self.nlist, count))
+        sample = vectors[rng.choice(count, size=min(count, self.sample_size), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].astype(np.float32)
+        for _ in range(self.iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = sample[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.where(norms == 0, 1, norms)
+        self.centroids = centroids
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+
+    def add(self, vectors, positions) -> None:
+        """Assign matrix rows (by position) to their nearest cluster."""
+        if self.centroids is None:
+            raise RuntimeError("ivfIndex must be trained before adding vectors")
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        positions = np.asarray(positions, dtype=np.int64)
+        for cluster in np.unique(assignment):
+            self.lists[cluster] = np.concatenate([self.lists[cluster], positions[assignment == cluster]])
+
+    def candidates(self, query, nprobe: int = 8):
+        """Return matrix positions in the nprobe clusters closest to query."""
+        nprobe = min(nprobe, len(self.lists))
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.lists[cluster] for cluster in closest])
+
+class embeddingStore:
+    """Vector store backed by an agent's embeddings table and a memory-mapped matrix."""
+    METRICS = ("cosine", "dot", "euclidean")
+
+    def __init__(self,
+                 db_path: str,
+                 dim: Optional[int] = None,
+                 dtype: str = "float32",
+                 metric: str = "cosine"):
+        """Open or create an embedding store.
+
+        Args:
+            db_path (str): Path to the agent's embeddings.db
+            dim (int): Vector dimension. Required for a new store, checked for an existing one.
+            dtype (str): NumPy dtype of the stored vectors
+            metric (str): "cosine", "dot" or "euclidean"
+        """
+        _require_numpy()
+        if metric not in self.METRICS:
+            raise ValueError(f"metric must be one of {self.METRICS}")
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    id INTEGER PRIMARY KEY,
+                    text TEXT,
+                    embedding BLOB,
+                    metadata TEXT
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embedding_meta (key TEXT PRIMARY KEY, value TEXT)")
+            for statement in CHANGE_LOG_SQL:
+                self._conn.execute(statement)
+        meta = dict(self._conn.execute("SELECT key, value FROM embedding_meta"))
+        if "dim" in meta:
+            if dim is not None and dim != int(meta["dim"]):
+                raise ValueError(f"Store {db_path} holds {meta['dim']}-dimensional vectors, not {dim}")
+            dim, dtype, metric = int(meta["dim"]), meta["dtype"], meta["metric"]
+        elif dim is None:
+            raise ValueError("dim is required when creating an embedding store")
+        else:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO embedding_meta (key, value) VALUES (?, ?)",
+                    [("dim", str(dim)), ("dtype", dtype), ("metric", metric)]
+                )
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.metric = metric
+        self._vectors_path = f"{db_path}.vectors.npy"
+        self._ids_path = f"{db_path}.ids.npy"
+        self._alive_path = f"{db_path}.alive.npy"
+        self.index = None
+        self._index_duplicates = False
+        self.nprobe = 8
+        self._vectors = self._ids = self._alive = None
+        self._data_version = None
+        self._open_sidecars()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open_sidecars(self) -> None:
+        """Map the sidecar matrix, rebuilding or catching it up from the table as needed."""
+        meta = dict(self._conn.execute("SELECT key, value FROM embedding_meta"))
+        self._count = int(meta.get("matrix_count", 0))
+        self._synced_id = int(meta.get("matrix_synced_id", 0))
+        self._change_seq = int(meta.get("matrix_change_seq", 0))
+        files = (self._vectors_path, self._ids_path, self._alive_path)
+        if all(os.path.exists(path) for path in files):
+            self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+            self._ids = np.lib.format.open_memmap(self._ids_path, mode="r+")
+            self._alive = np.lib.format.open_memmap(self._alive_path, mode="r+")
+            if len(self._vectors) >= self._count and self._vectors.shape[1:] == (self.dim,):
+                self._sync()
+                return
+        self.rebuild()
+
+    def _allocate(self, capacity: int) -> None:
+        """Create sidecars with room for capacity rows, copying the current rows over."""
+        specs = ((self._vectors_path, np.float32, (capacity, self.dim), self._vectors),
+                 (self._ids_path, np.int64, (capacity,), self._ids),
+                 (self._alive_path, np.bool_, (capacity,), self._alive))
+        for path, dtype, shape, current in specs:
+            tmp_path = f"{path}.tmp.npy"
+            array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+            if self._count:
+                array[:self._count] = current[:self._count]
+            array.flush()
+            del array
+            os.replace(tmp_path, path)
+        self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+        self._ids = np.lib.format.open_memmap(self._ids_path, mode="r+")
+        self._alive = np.lib.format.open_memmap(self._alive_path, mode="r+")
+
+    def _prepare(self, vectors):
+        """Return vectors as float32 rows ready for the search matrix."""
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self.metric == "cosine":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        return matrix
+
+    def _append(self, ids, vectors) -> None:
+        """Append rows to the sidecar matrix, growing it geometrically."""
+        needed = self._count + len(ids)
+        if needed > len(self._vectors):
+            self._allocate(max(needed, 2 * len(self._vectors), 1024))
+        prepared = self._prepare(vectors)
+        self._vectors[self._count:needed] = prepared
+        self._ids[self._count:needed] = ids
+        self._alive[self._count:needed] = True
+        if self.index is not None:
+            self.index.add(prepared, np.arange(self._count, needed))
+        self._count = needed
+        self._synced_id = int(ids[-1])
+
+    def _save_sync_state(self) -> None:
+        for array in (self._vectors, self._ids, self._alive):
+            array.flush()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_meta (key, value) VALUES (?, ?)",
+                [("matrix_count", str(self._count)), ("matrix_synced_id", str(self._synced_id)),
+                 ("matrix_change_seq", str(self._change_seq))]
+            )
+            self._conn.execute("DELETE FROM embedding_changes WHERE seq <= ?", (self._change_seq,))
+
+    def _decode(self, blob):
+        """Vector of a stored embedding blob, None for NULL or wrongly sized blobs."""
+        if blob is None or len(blob) != self.dim * self.dtype.itemsize:
+            return None
+        return np.frombuffer(blob, dtype=self.dtype)
+
+    def _positions(self, ids) -> "np.ndarray":
+        """Matrix position of each id, -1 where it is not in the matrix."""
+        # Matrix rows are appended in id order, so positions can be binary searched
+        wanted = np.asarray(ids, dtype=np.int64)
+        stored = self._ids[:self._count]
+        positions = np.searchsorted(stored, wanted)
+        inside = positions < self._count
+        found = np.zeros(len(wanted), dtype=bool)
+        found[inside] = stored[positions[inside]] == wanted[inside]
+        return np.where(found, positions, -1)
+
+    def _sync(self, batch_size: int = 10000) -> None:
+        """Catch the matrix up with the table: append new rows, then apply logged changes."""
+        with self._lock:
+            while True:
+                rows = self._conn.execute(
+                    "SELECT id, embedding FROM embeddings WHERE id > ? ORDER BY id LIMIT ?",
+                    (self._synced_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                decoded = [(row[0], self._decode(row[1])) for row in rows]
+                # Rows without a usable vector cannot be searched and are skipped
+                decoded = [(id_, vector) for id_, vector in decoded if vector is not None]
+                if decoded:
+                    self._append(np.array([id_ for id_, _ in decoded], dtype=np.int64),
+                                 np.stack([vector for _, vector in decoded]))
+                self._synced_id = int(rows[-1][0])
+            if self._apply_changes(batch_size):
+                self.rebuild()
+                return
+            self._save_sync_state()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _apply_changes(self, batch_size: int) -> bool:
+        """Mask deleted rows and refresh replaced ones from the change log.
+
+        Returns:
+            bool: True if a changed row cannot be placed in the matrix, which needs a rebuild
+        """
+        changes = self._conn.execute(
+            "SELECT seq, id FROM embedding_changes WHERE seq > ? ORDER BY seq", (self._change_seq,)
+        ).fetchall()
+        if not changes:
+            return False
+        self._change_seq = changes[-1][0]
+        # Rows past the synced id are read by the append pass as they are now
+        changed = sorted({id_ for _, id_ in changes if id_ <= self._synced_id})
+        for start in range(0, len(changed), batch_size):
+            chunk = changed[start:start + batch_size]
+            placeholders = ','.join('?' * len(chunk))
+            current = dict(self._conn.execute(
+                f"SELECT id, embedding FROM embeddings WHERE id IN ({placeholders})", chunk))
+            for id_, position in zip(chunk, self._positions(chunk)):
+                vector = self._decode(current.get(id_))
+                if position < 0:
+                    if vector is not None:
+                        return True
+                    continue
+                if vector is None:
+                    self._alive[position] = False
+                    continue
+                prepared = self._prepare(vector)
+                self._vectors[position] = prepared[0]
+                self._alive[position] = True
+                if self.index is not None:
+                    # The old cluster keeps a stale entry, so searches must de-duplicate candidates
+                    self.index.add(prepared, np.array([position]))
+                    self._index_duplicates = True
+        return False
+
+    def rebuild(self) -> None:
+        """Recreate the sidecar matrix from the embeddings table."""
+        with self._lock:
+            self._count = 0
+            self._synced_id = 0
+            self._change_seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM embedding_changes").fetchone()[0]
+            self._allocate(1024)
+            self.index = None
+            self._sync()
+
+    def add(self,
+            vectors,
+            texts: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict[str, Any]]] = None) -> List[int]:
+        """Store vectors (and optional texts/metadata) in one transaction.
+
+        Returns:
+            list: The ids assigned to the new rows, in input order
+        """
+        matrix = np.asarray(vectors, dtype=self.dtype).reshape(-1, self.dim)
+        count = len(matrix)
+        texts = texts if texts is not None else [None] * count
+        metadatas = metadatas if metadatas is not None else [None] * count
+        if len(texts) != count or len(metadatas) != count:
+            raise ValueError("texts and metadatas must align with vectors")
+        with self._lock:
+            # Pick up rows other writers added, so new ids extend the matrix in order
+            self._sync()
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                start = (self._conn.execute("SELECT MAX(id) FROM embeddings").fetchone()[0] or 0) + 1
+                ids = list(range(start, start + count))
+                self._conn.executemany(
+                    "INSERT INTO embeddings (id, text, embedding, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (id_, text, row.tobytes(), json.dumps(metadata) if metadata is not None else None)
+                        for id_, text, row, metadata in zip(ids, texts, matrix, metadatas)
+                    ]
+                )
+            self._append(np.array(ids, dtype=np.int64), matrix)
+            self._save_sync_state()
+        return ids
+
+    def delete(self, ids: List[int]) -> None:
+        """Delete rows from the table and mask them out of the matrix."""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM embeddings WHERE id = ?", [(id_,) for id_ in ids])
+            positions = self._positions(ids)
+            self._alive[positions[positions >= 0]] = False
+            self._alive.flush()
+
+    def compact(self) -> None:
+        """Drop deleted rows from the matrix. Any approximate index is rebuilt."""
+        with self._lock:
+            nlist = self.index.nlist if self.index is not None else None
+            self.rebuild()
+            if nlist:
+                self.build_index(nlist=nlist, nprobe=self.nprobe)
+
+    def build_index(self, nlist: Optional[int] = None, nprobe: int = 8, **kwargs) -> ivfIndex:
+        """Train an IVF index over the live vectors; later adds are indexed incrementally.
+
+        Args:
+            nlist (int): Number of clusters, defaults to about sqrt(rows)
+            nprobe (int): Clusters scanned per search by default
+        """
+        with self._lock:
+            live = np.flatnonzero(self._alive[:self._count])
+            if not len(live):
+                raise ValueError("Cannot build an index over an empty store")
+            nlist = nlist or max(1, int(np.sqrt(len(live))))
+            index = ivfIndex(nlist=nlist, **kwargs)
+            vectors = np.asarray(self._vectors[live])
+            if self.metric != "cosine":
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors = vectors / np.where(norms == 0, 1, norms)
+            index.train(vectors)
+            index.add(vectors, live)
+            self.index = index
+            self._index_duplicates = False
+            self.nprobe = nprobe
+            return index
+
+    def search(self,
+               query,
+               k: int = 10,
+               nprobe: Optional[int] = None,
+               exact: bool = False,
+               with_text: bool = True) -> List[Dict[str, Any]]:
+        """Return the k stored vectors closest to query, best first.
+
+        Args:
+            query: Query vector
+            k (int): Number of results
+            nprobe (int): IVF clusters to scan, defaults to the value given to build_index
+            exact (bool): Scan every vector even if an approximate index exists
+            with_text (bool): Include text and metadata from the table in each hit
+
+        Returns:
+            list: Dicts with id and score (higher is closer), plus text and metadata
+        """
+        q = self._prepare(query)[0]
+        with self._lock:
+            # data_version only moves when another connection committed; this store keeps its own writes in sync
+            if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+                self._sync()
+            if self.index is not None and not exact:
+                positions = self.index.candidates(
+                    q if self.metric == "cosine" else q / (np.linalg.norm(q) or 1), nprobe or self.nprobe)
+                positions = positions[self._alive[positions]]
+                positions = np.unique(positions) if self._index_duplicates else np.sort(positions)
+                vectors = self._vectors[positions]
+            else:
+                positions = None
+                vectors = self._vectors[:self._count]
+            if self.metric == "euclidean":
+                scores = -np.linalg.norm(vectors - q, axis=1)
+            else:
+                scores = vectors @ q
+            if positions is None:
+                scores = np.where(self._alive[:self._count], scores, -np.inf)
+                positions = np.arange(self._count)
+            k = min(k, len(scores))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            top = top[np.isfinite(scores[top])]
+            hits = [{"id": int(self._ids[positions[i]]), "score": float(scores[i])} for i in top]
+            if with_text and hits:
+                placeholders = ','.join('?' * len(hits))
+                rows = {
+                    row[0]: row[1:] for row in self._conn.execute(
+                        f"SELECT id, text, metadata FROM embeddings WHERE id IN ({placeholders})",
+                        [hit["id"] for hit in hits])
+                }
+        if with_text and hits:
+            for hit in hits:
+                text, metadata = rows.get(hit["id"], (None, None))
+                hit["text"] = text
+                hit["metadata"] = json.loads(metadata) if metadata else None
+        return hits
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._alive[:self._count]))
+
+    def close(self) -> None:
+        """Flush the sidecars and close the database."""
+        with self._lock:
+            if self._vectors is not None:
+                self._save_sync_state()
+            self._vectors = self._ids = self._alive = None
+            self._conn.close()
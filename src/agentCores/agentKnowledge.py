@@ -0,0 +1,361 @@
+# agentKnowledge.py
+"""agentKnowledge
+
+Full-text search over an agent's knowledge.db.
+
+The knowledge_base table stays the source of truth. An FTS5 virtual table
+indexes its topic and content columns as an external-content index, and
+triggers keep it in sync with every insert, update and delete, so retrieval is
+a BM25-ranked index lookup instead of a LIKE '%...%' scan.
+
+Features:
+- BM25-ranked search(query, k), with topic matches weighted above content
+- Bulk ingest of documents, split into overlapping chunks and written in batched transactions
+- Existing knowledge_base rows are indexed when the FTS table is first created
+- Federated search across many stores on a thread pool with a heap merge of the top-k
+
+Example:
+    ```python
+    from agentCores import agentCores
+
+    cores = agentCores()
+    cores.ingestKnowledge("default_agent", [
+        {"topic": "sqlite", "content": long_text, "source": "docs/sqlite.md"},
+        "A plain string is stored without topic or source.",
+    ])
+    for hit in cores.searchKnowledge("default_agent", "write ahead log", k=5):
+        print(hit["score"], hit["topic"], hit["content"][:80])
+
+    # Global knowledge plus several agents at once
+    hits = cores.federatedSearch("write ahead log", agent_ids=["agent_a", "agent_b"], k=10)
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import heapq
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterable, Union, Callable
+
+KNOWLEDGE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS knowledge_base (
+        id INTEGER PRIMARY KEY,
+        topic TEXT,
+        content TEXT,
+        source TEXT,
+        last_updated TEXT
+    )
+"""
+
+KNOWLEDGE_FTS_SQL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+        topic, content,
+        content='knowledge_base', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_base_ai AFTER INSERT ON knowledge_base BEGIN
+        INSERT INTO knowledge_fts (rowid, topic, content) VALUES (new.id, new.topic, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_base_ad AFTER DELETE ON knowledge_base BEGIN
+        INSERT INTO knowledge_fts (knowledge_fts, rowid, topic, content)
+        VALUES ('delete', old.id, old.topic, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_base_au AFTER UPDATE ON knowledge_base BEGIN
+        INSERT INTO knowledge_fts (knowledge_fts, rowid, topic, content)
+        VALUES ('delete', old.id, old.topic, old.content);
+        INSERT INTO knowledge_fts (rowid, topic, content) VALUES (new.id, new.topic, new.content);
+    END
+    """,
+)
+
+def init_knowledge_schema(conn: sqlite3.Connection) -> None:
+    """Create the knowledge_base table and its FTS5 index, indexing any existing rows."""
+    conn.execute(KNOWLEDGE_TABLE_SQL)
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'"
+    ).fetchone()
+    for statement in KNOWLEDGE_FTS_SQL:
+        conn.execute(statement)
+    if not has_fts:
+        conn.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('rebuild')")
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+    """Split text into chunks of at most chunk_size characters.
+
+    Chunks end on whitespace where possible and consecutive chunks share about
+    overlap characters, so a phrase cut at a boundary is still found whole.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Prefer breaking on whitespace in the second half of the window
+            space = text.rfind(" ", start + chunk_size // 2, end)
+            newline = text.rfind("\n", start + chunk_size // 2, end)
+            cut = max(space, newline)
+            if cut > start:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        # Start the next chunk on a word boundary
+        boundary = text.find(" ", next_start, end)
+        start = boundary + 1 if boundary != -1 else next_start
+    return chunks
+
+def match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query matching any of its terms.
+
+    Terms are quoted so punctuation and FTS5 operators in user input are
+    searched literally. Returns an empty string when query has no terms.
+    """
+    terms = re.findall(r"\w+", query)
+    return " OR ".join(f'"{term}"' for term in terms)
+
+class knowledgeStore:
+    """Chunked writer and BM25 reader for a knowledge_base table."""
+    TOPIC_WEIGHT = 2.0
+    CONTENT_WEIGHT = 1.0
+
+    def __init__(self, db_path: str):
+        """Open the knowledge database, creating the FTS5 index if it is missing.
+
+        Args:
+            db_path (str): Path to the agent's knowledge.db
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            init_knowledge_schema(self._conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self,
+            content: str,
+            topic: Optional[str] = None,
+            source: Optional[str] = None) -> int:
+        """Store one knowledge entry as-is, without chunking.
+
+        Returns:
+            int: The id of the new row
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO knowledge_base (topic, content, source, last_updated) VALUES (?, ?, ?, ?)",
+                (topic, content, source, datetime.now(timezone.utc).isoformat())
+            )
+            return cursor.lastrowid
+
+    def ingest(self,
+               documents: Iterable[Union[str, Dict[str, Any]]],
+               chunk_size: int = 1000,
+               overlap: int = 100,
+               batch_size: int = 500) -> int:
+        """Chunk and store many documents.
+
+        Args:
+            documents: Strings, or dicts with "content" and optional "topic" and "source"
+            chunk_size (int): Maximum characters per stored chunk
+            overlap (int): Characters shared by consecutive chunks of a document
+            batch_size (int): Chunks written per transaction
+
+        Returns:
+            int: Number of chunks stored
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        written = 0
+        batch = []
+        for document in documents:
+            if isinstance(document, str):
+                document = {"content": document}
+            for chunk in chunk_text(document["content"], chunk_size, overlap):
+                batch.append((document.get("topic"), chunk, document.get("source"), now))
+                if len(batch) >= batch_size:
+                    written += self._write_batch(batch)
+                    batch = []
+        if batch:
+            written += self._write_batch(batch)
+        return written
+
+    def _write_batch(self, rows: List[tuple]) -> int:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT INTO knowledge_base (topic, content, source, last_updated) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def search(self,
+               query: str,
+               k: int = 10,
+               topic: Optional[str] = None,
+               raw: bool = False) -> List[Dict[str, Any]]:
+        """Return the k entries that best match query, ranked by BM25.
+
+        Args:
+            query (str): Free text; any of its terms may match
+            k (int): Number of results
+            topic (str): Only return entries with this exact topic
+            raw (bool): Pass query through as FTS5 query syntax instead
+
+        Returns:
+            list: Dicts with id, score (higher is better), topic, content, source and last_updated
+        """
+        expression = query if raw else match_expression(query)
+        if not expression or k <= 0:
+            return []
+        sql = f"""
+            SELECT kb.id, bm25(knowledge_fts, {self.TOPIC_WEIGHT}, {self.CONTENT_WEIGHT}) AS rank,
+                   kb.topic, kb.content, kb.source, kb.last_updated
+            FROM knowledge_fts
+            JOIN knowledge_base kb ON kb.id = knowledge_fts.rowid
+            WHERE knowledge_fts MATCH ?
+        """
+        params = [expression]
+        if topic is not None:
+            sql += " AND kb.topic = ?"
+            params.append(topic)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(k)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"id": id_, "score": -rank, "topic": topic_, "content": content,
+             "source": source, "last_updated": last_updated}
+            for id_, rank, topic_, content, source, last_updated in rows
+        ]
+
+    def delete(self, ids: List[int]) -> None:
+        """Delete entries by id; the triggers remove them from the index."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM knowledge_base WHERE id = ?", [(id_,) for id_ in ids])
+
+    def optimize(self) -> None:
+        """Merge the FTS5 index segments, e.g. after a large ingest."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('optimize')")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM knowledge_base").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+def federated_search(sources: Dict[Any, Callable[[], Optional[knowledgeStore]]],
+                     query: str,
+                     k: int = 10,
+                     min_score: Optional[float] = None,
+                     timeout: Optional[float] = None,
+                     executor: Optional[ThreadPoolExecutor] = None,
+                     workers: int = 8,
+                     errors: Optional[Dict[str, Exception]] = None,
+                     **search_kwargs) -> List[Dict[str, Any]]:
+    """Search many knowledge stores concurrently and merge their top-k.
+
+    Each source is searched on a worker thread; results are merged into a
+    bounded heap as they arrive. BM25 scores are computed per store, so the
+    merge treats them as comparable relevance estimates. A source that fails to
+    open or search, e.g. a corrupt or locked database, is reported and skipped
+    instead of failing the whole query.
+
+    Args:
+        sources (dict): Name -> callable returning the store to search, or None to skip it.
+            Opening happens on the worker, so stores that are not open yet open in parallel.
+        query (str): Free-text query
+        k (int): Number of merged results
+        min_score (float): Return as soon as k results scoring at least this have
+            arrived, without waiting for the remaining stores
+        timeout (float): Return what has arrived after this many seconds
+        executor (ThreadPoolExecutor): Pool to run on; a temporary one is used otherwise
+        workers (int): Size of the temporary pool
+        errors (dict): Filled with source name -> exception for every failed source;
+            failures are printed as warnings when omitted
+        **search_kwargs: Passed to knowledgeStore.search
+
+    Returns:
+        list: Hits as from knowledgeStore.search plus "store" (the source name), best first
+    """
+    if k <= 0 or not sources:
+        return []
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=min(workers, len(sources)), thread_name_prefix="agentKnowledge")
+
+    def search_source(name, open_store):
+        try:
+            store = open_store()
+            if store is None:
+                return name, [], None
+            return name, store.search(query, k=k, **search_kwargs), None
+        except Exception as e:
+            return name, [], e
+
+    heap = []  # min-heap of (score, tiebreak, hit) holding the best k so far
+    counter = 0
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    pending = {executor.submit(search_source, name, open_store) for name, open_store in sources.items()}
+    try:
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                name, hits, error = future.result()
+                if error is not None:
+                    if errors is None:
+                        print(f"Warning: Knowledge search skipped '{name}': {error}")
+                    else:
+                        errors[name] = error
+                for hit in hits:
+                    hit["store"] = name
+                    counter += 1
+                    entry = (hit["score"], counter, hit)
+                    if len(heap) < k:
+                        heapq.heappush(heap, entry)
+                    elif entry[0] > heap[0][0]:
+                        heapq.heapreplace(heap, entry)
+            if min_score is not None and len(heap) == k and heap[0][0] >= min_score:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            # Pending futures were cancelled above, so nothing queued is left to run
+            executor.shutdown(wait=False)
+    return [hit for _, _, hit in sorted(heap, key=lambda entry: (-entry[0], entry[1]))]
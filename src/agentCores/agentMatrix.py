@@ -9,10 +9,17 @@ layer for the agentCores package, providing CRUD operations for agent configurat
 
 Features:
 - Efficient SQLite-based storage
-- Version tracking for agent configurations
+- Version tracking for agent configurations with an append-only history table
 - Unique identifier management
+- Indexed lookups by agent_id, uid and save_date
+- PRAGMA user_version driven schema migrations applied in place
+- Optional content-addressed storage that keeps shared core sections only once
+- Pluggable core_data codecs (JSON, zlib, msgpack) with per-row codec tags
 - Metadata support for agent cores
-- Bulk operations support
+- Bulk operations support with single-transaction executemany writes
+- SQL-level import from another matrix file with skip / overwrite / newer conflict policies
+- Constant-memory streaming over the whole store with iter_cores / iter_batches
+- Optional connection pooling with WAL journaling and tuned pragmas
 
 Example:
     ```python
@@ -30,6 +37,16 @@ Example:
     
     # Retrieve configurations
     agents = matrix.get(ids=["agent1"])
+    
+    # Pooled mode keeps connections open between calls
+    with agentMatrix("agents.db", pool_size=4) as matrix:
+        agents = matrix.get(ids=["agent1"])
+    
+    # Content-addressed mode stores sections shared between cores only once
+    matrix = agentMatrix("agents.db", dedup=True)
+    
+    # Compressed storage; rows written with other codecs still read fine
+    matrix = agentMatrix("agents.db", codec="zlib")
     ```
 
 Author: Leo Borcherding
@@ -40,58 +57,891 @@ License: MIT
 
 import sqlite3
 import json
+import hashlib
+import itertools
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from typing import Optional, Dict, Any
 from pathlib import Path
+from .agentCoreCache import agentCoreCache
+from .agentCodecs import get_codec
+from .agentMetrics import metrics
 
 class agentMatrix:
     """Storage implementation for agent cores using SQLite."""
-    def __init__(self, db_path: str = "agent_matrix.db"):
-        """Initialize the agent matrix storage."""
+    
+    SCHEMA_VERSION = 5
+    
+    # Sections of agentCore stored once by content hash in dedup mode
+    DEDUP_SECTIONS = ("models", "prompts", "commandFlags", "databases")
+    
+    # Summary fields are denormalized from the original document so they can be
+    # indexed and listed without decoding core_data, whatever its codec
+    _UPSERT_SQL = """
+        INSERT INTO agent_cores (agent_id, core_data, codec, save_date, uid, version, model)
+        VALUES (
+            :agent_id, :core_data, :codec, :save_date,
+            CASE WHEN json_valid(:document) THEN json_extract(:document, '$.agentCore.uid') END,
+            CASE WHEN json_valid(:document) THEN json_extract(:document, '$.agentCore.version') END,
+            CASE WHEN json_valid(:document) THEN json_extract(:document, '$.agentCore.models.large_language_model') END
+        )
+        ON CONFLICT (agent_id) DO UPDATE SET
+            core_data = excluded.core_data,
+            codec = excluded.codec,
+            save_date = excluded.save_date,
+            uid = excluded.uid,
+            version = excluded.version,
+            model = excluded.model
+    """
+    
+    _ROW_COLUMNS = "agent_id, core_data, save_date, uid, version, codec"
+    
+    IMPORT_POLICIES = ("skip", "overwrite", "newer")
+    
+    _IMPORT_UPDATE = """
+        ON CONFLICT (agent_id) DO UPDATE SET
+            core_data = excluded.core_data,
+            codec = excluded.codec,
+            save_date = excluded.save_date,
+            uid = excluded.uid,
+            version = excluded.version,
+            model = excluded.model
+    """
+    
+    _IMPORT_CONFLICT_SQL = {
+        "skip": "ON CONFLICT (agent_id) DO NOTHING",
+        "overwrite": _IMPORT_UPDATE,
+        "newer": _IMPORT_UPDATE + """
+        WHERE COALESCE(excluded.version, 0) > COALESCE(agent_cores.version, 0)
+           OR (COALESCE(excluded.version, 0) = COALESCE(agent_cores.version, 0)
+               AND excluded.uid IS NOT agent_cores.uid
+               AND COALESCE(excluded.save_date, '') > COALESCE(agent_cores.save_date, ''))
+        """,
+    }
+    
+    DEFAULT_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,      # negative values are KiB, so ~16MB of page cache
+        "mmap_size": 268435456,    # 256MB memory-mapped I/O
+        "temp_store": "MEMORY"
+    }
+    
+    def __init__(self,
+                 db_path: str = "agent_matrix.db",
+                 pool_size: int = 0,
+                 pragmas: Optional[Dict[str, Any]] = None,
+                 timeout: float = 30.0,
+                 dedup: bool = False,
+                 section_cache_size: int = 1024,
+                 codec: str = "json"):
+        """Initialize the agent matrix storage.
+        
+        Args:
+            db_path (str): Path to the SQLite database file
+            pool_size (int): Number of long-lived connections to keep open. 0 keeps
+                the original behaviour of opening a new connection for every call.
+            pragmas (dict): Pragma overrides applied once to each pooled connection
+            timeout (float): Seconds to wait for a free pooled connection or a database lock
+            dedup (bool): Store DEDUP_SECTIONS once by sha256 and keep only references
+                in each core. Reads are unaffected by this flag, so databases holding
+                both layouts always decode transparently.
+            section_cache_size (int): Number of decoded sections cached for reads
+            codec (str): Codec used to write core_data, see agentCodecs. Every row
+                records its codec, so reads never depend on this setting.
+        """
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.pragmas = dict(self.DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self._pool = queue.LifoQueue(maxsize=pool_size) if pool_size > 0 else None
+        self._pool_lock = threading.Lock()
+        self._connections = []
+        self._closed = False
+        self.dedup = dedup
+        self.codec = get_codec(codec)
+        self._section_cache = agentCoreCache(section_cache_size)
         self._init_db()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a pooled connection and apply the configured pragmas once."""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Yield a connection inside a transaction, pooled or per-call."""
+        if self._pool is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+            return
+
+        if self._closed:
+            raise sqlite3.ProgrammingError("agentMatrix connection pool is closed")
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._pool_lock:
+                if len(self._connections) < self.pool_size:
+                    conn = self._open_connection()
+                    self._connections.append(conn)
+            if conn is None:
+                try:
+                    conn = self._pool.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"Timed out waiting for a free connection to {self.db_path}")
+        try:
+            with conn:
+                yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._pool.put(conn)
+
+    def close(self) -> None:
+        """Close every pooled connection. Safe to call more than once."""
+        if self._pool is None or self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._pool_lock:
+            self._connections.clear()
+
     def _init_db(self):
-        """Initialize the SQLite database with the agent_cores table."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS agent_cores (
-                    agent_id TEXT,
-                    core_data TEXT,
-                    save_date TEXT,
-                    uid TEXT UNIQUE,
-                    version INTEGER,
-                    PRIMARY KEY (agent_id, uid)
-                )
-            """)
+        """Initialize the SQLite database, migrating older schemas in place."""
+        self.migrate()
+
+    def schema_version(self) -> int:
+        """Return the schema version recorded in PRAGMA user_version."""
+        with self._connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self) -> bool:
+        """Upgrade the database to SCHEMA_VERSION.
+        
+        Every pending step runs inside a single IMMEDIATE transaction, so a failed
+        migration leaves the database untouched and concurrent openers wait for the
+        first one to finish instead of migrating twice.
+        
+        Returns:
+            bool: True if any migration step was applied
+        """
+        with self._connection() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= self.SCHEMA_VERSION:
+                return False
+            conn.execute("BEGIN IMMEDIATE")
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if current >= self.SCHEMA_VERSION:
+                return False
+            for version in range(current + 1, self.SCHEMA_VERSION + 1):
+                getattr(self, f"_migrate_to_v{version}")(conn)
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            return True
+
+    def _migrate_to_v1(self, conn: sqlite3.Connection) -> None:
+        """v1: the original unversioned agent_cores table."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS agent_cores (
+                agent_id TEXT,
+                core_data TEXT,
+                save_date TEXT,
+                uid TEXT UNIQUE,
+                version INTEGER,
+                PRIMARY KEY (agent_id, uid)
+            )
+        """)
+
+    def _migrate_to_v2(self, conn: sqlite3.Connection) -> None:
+        """v2: one current row per agent, version history and secondary indexes.
+        
+        Older tables either lack the uid/version columns entirely or never filled
+        them, so both are recovered from the stored JSON. Every legacy row is kept
+        in agent_core_versions and the most recently written row per agent becomes
+        the current one.
+        """
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(agent_cores)")}
+        uid_expr = "json_extract(core_data, '$.agentCore.uid')"
+        version_expr = "json_extract(core_data, '$.agentCore.version')"
+        if "uid" in columns:
+            uid_expr = f"COALESCE(CASE WHEN json_valid(core_data) THEN {uid_expr} END, uid)"
+        else:
+            uid_expr = f"CASE WHEN json_valid(core_data) THEN {uid_expr} END"
+        if "version" in columns:
+            version_expr = f"COALESCE(CASE WHEN json_valid(core_data) THEN {version_expr} END, version)"
+        else:
+            version_expr = f"CASE WHEN json_valid(core_data) THEN {version_expr} END"
+
+        conn.execute("ALTER TABLE agent_cores RENAME TO agent_cores_v1")
+        conn.execute("""
+            CREATE TABLE agent_cores (
+                agent_id TEXT PRIMARY KEY,
+                core_data TEXT,
+                save_date TEXT,
+                uid TEXT,
+                version INTEGER
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS agent_core_versions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                agent_id TEXT NOT NULL,
+                uid TEXT,
+                version INTEGER,
+                core_data TEXT,
+                save_date TEXT
+            )
+        """)
+        conn.execute(f"""
+            INSERT INTO agent_core_versions (agent_id, uid, version, core_data, save_date)
+            SELECT agent_id, {uid_expr}, {version_expr}, core_data, save_date
+            FROM agent_cores_v1 WHERE agent_id IS NOT NULL ORDER BY rowid
+        """)
+        conn.execute(f"""
+            INSERT INTO agent_cores (agent_id, core_data, save_date, uid, version)
+            SELECT agent_id, core_data, save_date, {uid_expr}, {version_expr}
+            FROM agent_cores_v1
+            WHERE rowid IN (SELECT MAX(rowid) FROM agent_cores_v1 WHERE agent_id IS NOT NULL GROUP BY agent_id)
+        """)
+        conn.execute("DROP TABLE agent_cores_v1")
+
+        # agent_id lookups use the primary key index
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_cores_uid ON agent_cores (uid)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_cores_save_date ON agent_cores (save_date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_core_versions_agent ON agent_core_versions (agent_id, version)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_core_versions_uid ON agent_core_versions (uid)")
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS agent_cores_history_insert AFTER INSERT ON agent_cores
+            BEGIN
+                INSERT INTO agent_core_versions (agent_id, uid, version, core_data, save_date)
+                VALUES (NEW.agent_id, NEW.uid, NEW.version, NEW.core_data, NEW.save_date);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS agent_cores_history_update AFTER UPDATE ON agent_cores
+            WHEN NEW.core_data IS NOT OLD.core_data
+            BEGIN
+                INSERT INTO agent_core_versions (agent_id, uid, version, core_data, save_date)
+                VALUES (NEW.agent_id, NEW.uid, NEW.version, NEW.core_data, NEW.save_date);
+            END
+        """)
+
+    def _migrate_to_v3(self, conn: sqlite3.Connection) -> None:
+        """v3: model summary column so listings never decode core_data."""
+        conn.execute("ALTER TABLE agent_cores ADD COLUMN model TEXT")
+        conn.execute("""
+            UPDATE agent_cores
+            SET model = json_extract(core_data, '$.agentCore.models.large_language_model')
+            WHERE json_valid(core_data)
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_cores_model ON agent_cores (model)")
+
+    def _migrate_to_v4(self, conn: sqlite3.Connection) -> None:
+        """v4: codec tag per row and the content-addressed core_sections table."""
+        conn.execute("ALTER TABLE agent_cores ADD COLUMN codec TEXT NOT NULL DEFAULT 'json'")
+        conn.execute("ALTER TABLE agent_core_versions ADD COLUMN codec TEXT NOT NULL DEFAULT 'json'")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS core_sections (
+                hash TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._drop_history_triggers(conn)
+        self._create_history_triggers(conn)
+
+    @staticmethod
+    def _drop_history_triggers(conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TRIGGER IF EXISTS agent_cores_history_insert")
+        conn.execute("DROP TRIGGER IF EXISTS agent_cores_history_update")
+
+    @staticmethod
+    def _create_history_triggers(conn: sqlite3.Connection) -> None:
+        """Record every inserted or changed current core in agent_core_versions."""
+        conn.execute("""
+            CREATE TRIGGER agent_cores_history_insert AFTER INSERT ON agent_cores
+            BEGIN
+                INSERT INTO agent_core_versions (agent_id, uid, version, core_data, codec, save_date)
+                VALUES (NEW.agent_id, NEW.uid, NEW.version, NEW.core_data, NEW.codec, NEW.save_date);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER agent_cores_history_update AFTER UPDATE ON agent_cores
+            WHEN NEW.core_data IS NOT OLD.core_data
+            BEGIN
+                INSERT INTO agent_core_versions (agent_id, uid, version, core_data, codec, save_date)
+                VALUES (NEW.agent_id, NEW.uid, NEW.version, NEW.core_data, NEW.codec, NEW.save_date);
+            END
+        """)
+
+    def _migrate_to_v5(self, conn: sqlite3.Connection) -> None:
+        """v5: partial index of cores missing a uid or version, so has_unversioned() is one lookup."""
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_agent_cores_unversioned ON agent_cores (agent_id)
+            WHERE uid IS NULL OR version IS NULL
+        """)
+
+    def has_unversioned(self) -> bool:
+        """Whether any current core lacks a uid or version."""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT 1 FROM agent_cores WHERE uid IS NULL OR version IS NULL LIMIT 1"
+            ).fetchone() is not None
+
+    def needs_migration(self) -> bool:
+        """Whether the schema or any stored core is behind, i.e. a migration pass would change anything."""
+        return self.schema_version() < self.SCHEMA_VERSION or self.has_unversioned()
 
     def upsert(self, documents: list, ids: list, metadatas: list = None) -> None:
         """Store agent core(s) in matrix."""
-        with sqlite3.connect(self.db_path) as conn:
-            for idx, (doc, id_) in enumerate(zip(documents, ids)):
-                metadata = metadatas[idx] if metadatas else {'save_date': None}
-                conn.execute(
-                    "INSERT OR REPLACE INTO agent_cores (agent_id, core_data, save_date) VALUES (?, ?, ?)",
-                    (id_, doc, metadata.get('save_date'))
+        self.bulk_upsert(documents, ids, metadatas)
+
+    def bulk_upsert(self,
+                    documents,
+                    ids,
+                    metadatas=None,
+                    chunk_size: int = 500) -> int:
+        """Store many agent cores in a single all-or-nothing transaction.
+        
+        Rows are written with executemany in chunks of chunk_size so arbitrarily
+        large iterables never need to be materialized at once. If any chunk fails
+        the whole transaction is rolled back.
+        
+        Args:
+            documents: Iterable of JSON encoded agent cores
+            ids: Iterable of agent ids, aligned with documents
+            metadatas: Optional iterable of metadata dicts, aligned with documents
+            chunk_size (int): Number of rows handed to each executemany call
+            
+        Returns:
+            int: Number of rows written
+        """
+        if metadatas is None:
+            metadatas = itertools.repeat({'save_date': None})
+        return self.upsert_rows(zip(ids, documents, metadatas), chunk_size=chunk_size)
+
+    @metrics.timed("agentcores_matrix_seconds", op="upsert")
+    def upsert_rows(self, rows, chunk_size: int = 500) -> int:
+        """Store (agent_id, document, metadata) rows in one all-or-nothing transaction.
+        
+        This is the row shape yielded by iter_cores(decode=False), so one matrix can
+        be streamed into another with constant memory.
+        
+        Args:
+            rows: Iterable of (agent_id, JSON document, metadata dict) tuples
+            chunk_size (int): Number of rows handed to each executemany call
+            
+        Returns:
+            int: Number of rows written
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        rows = iter(rows)
+        written = 0
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                params, sections = [], {}
+                for id_, doc, metadata in chunk:
+                    core_data, codec = self._encode(doc, sections)
+                    params.append({"agent_id": id_, "document": doc, "core_data": core_data,
+                                   "codec": codec, "save_date": (metadata or {}).get('save_date')})
+                if sections:
+                    conn.executemany("INSERT OR IGNORE INTO core_sections (hash, data) VALUES (?, ?)",
+                                     sections.items())
+                conn.executemany(self._UPSERT_SQL, params)
+                written += len(chunk)
+        metrics.inc("agentcores_matrix_rows_written_total", written)
+        return written
+
+    @metrics.timed("agentcores_matrix_seconds", op="import")
+    def import_from(self,
+                    source_path: str,
+                    on_conflict: str = "overwrite",
+                    validate: bool = True,
+                    save_date: Optional[str] = None,
+                    shard: Optional[tuple] = None,
+                    written_ids: bool = False) -> Dict[str, Any]:
+        """Copy every agent core of another matrix file with one INSERT ... SELECT.
+
+        The source is attached to a dedicated connection and its rows move in a
+        single IMMEDIATE transaction without passing through Python. Stored bytes
+        and codec tags are copied unchanged, together with the shared sections of
+        content-addressed rows, so cores written with any codec import intact.
+        The source is opened read-only and never modified; a source with an older
+        schema is copied to a temporary file with the backup API and the copy is
+        migrated and imported instead.
+
+        Args:
+            source_path (str): agent_matrix.db file to import from
+            on_conflict (str): What to do with agent_ids that already exist here:
+                "skip" keeps the current core, "overwrite" replaces it, "newer"
+                replaces it only if the incoming core has a higher version, or the
+                same version with a different uid and a later save_date
+            validate (bool): Skip JSON-encoded cores that json_valid rejects.
+                Binary codecs cannot be checked in SQL and are always copied.
+            save_date (str): save_date for source rows without one, defaults to today
+            shard (tuple): (index, count) to import only the agent_ids of one
+                ShardedAgentMatrix shard
+            written_ids (bool): Also return the agent_ids that were inserted or
+                updated, recorded by temporary triggers on the import connection
+
+        Returns:
+            dict: source, invalid, inserted, updated and skipped row counts, plus
+                invalid_ids listing the rejected agent_ids and, if requested,
+                written_ids listing the inserted and updated ones
+        """
+        if on_conflict not in self.IMPORT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {self.IMPORT_POLICIES}, got {on_conflict!r}")
+        if not Path(source_path).exists():
+            raise FileNotFoundError(f"Import database not found: {source_path}")
+        if Path(source_path).resolve() == Path(self.db_path).resolve():
+            raise ValueError("Cannot import a matrix into itself")
+        with self.current_schema_source(source_path) as path:
+            return self._import_attached(self._read_only_uri(path), on_conflict, validate, save_date, shard,
+                                         written_ids)
+
+    @staticmethod
+    def _read_only_uri(path: str) -> str:
+        return f"{Path(path).resolve().as_uri()}?mode=ro"
+
+    @classmethod
+    @contextmanager
+    def current_schema_source(cls, source_path: str):
+        """Yield a path holding source_path's matrix at the current schema, without modifying the source.
+
+        Current sources are yielded as they are. Older ones are copied read-only
+        with the backup API into a temporary file, which is migrated, yielded and
+        deleted afterwards.
+        """
+        if not Path(source_path).exists():
+            raise FileNotFoundError(f"Import database not found: {source_path}")
+        source_conn = sqlite3.connect(cls._read_only_uri(source_path), uri=True)
+        try:
+            if source_conn.execute("PRAGMA user_version").fetchone()[0] >= cls.SCHEMA_VERSION:
+                source_conn.close()
+                yield source_path
+                return
+            with tempfile.TemporaryDirectory(prefix="agentMatrixImport") as tmp:
+                copy_path = str(Path(tmp) / "source.db")
+                copy_conn = sqlite3.connect(copy_path)
+                try:
+                    source_conn.backup(copy_conn)
+                finally:
+                    copy_conn.close()
+                source_conn.close()
+                cls(copy_path).close()
+                yield copy_path
+        finally:
+            source_conn.close()
+
+    def _import_attached(self,
+                         source_uri: str,
+                         on_conflict: str,
+                         validate: bool,
+                         save_date: Optional[str],
+                         shard: Optional[tuple],
+                         written_ids: bool = False) -> Dict[str, Any]:
+        """import_from body: copy the rows of the current-schema matrix at source_uri."""
+        filters = ["s.agent_id IS NOT NULL"]
+        params = {"today": save_date or time.strftime("%Y-%m-%d")}
+        if shard is not None:
+            filters.append("shard_of(s.agent_id, :shard_count) = :shard_index")
+            params.update(shard_index=shard[0], shard_count=shard[1])
+        valid = ("(s.codec NOT IN ('json', 'cas') OR json_valid(s.core_data))" if validate else "1")
+        where = " AND ".join(filters)
+        conflict = self._IMPORT_CONFLICT_SQL[on_conflict]
+
+        # uri=True lets ATTACH take the read-only file: URI
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None, uri=True)
+        try:
+            if shard is not None:
+                from .shardedAgentMatrix import shard_of
+                conn.create_function("shard_of", 2, shard_of, deterministic=True)
+            conn.execute("ATTACH DATABASE ? AS source", (source_uri,))
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    source, accepted, existing = conn.execute(f"""
+                        SELECT COUNT(*), COALESCE(SUM({valid}), 0),
+                               COALESCE(SUM({valid} AND m.agent_id IS NOT NULL), 0)
+                        FROM source.agent_cores AS s LEFT JOIN main.agent_cores AS m USING (agent_id)
+                        WHERE {where}
+                    """, params).fetchone()
+                    invalid_ids = [row[0] for row in conn.execute(
+                        f"SELECT s.agent_id FROM source.agent_cores AS s WHERE {where} AND NOT {valid}",
+                        params)] if validate else []
+                    conn.execute("INSERT OR IGNORE INTO core_sections (hash, data) "
+                                 "SELECT hash, data FROM source.core_sections")
+                    if written_ids:
+                        # Temporary objects only exist on this connection and vanish with it
+                        conn.execute("CREATE TEMP TABLE imported_ids (agent_id TEXT PRIMARY KEY)")
+                        for event in ("INSERT", "UPDATE"):
+                            conn.execute(f"""
+                                CREATE TEMP TRIGGER imported_on_{event.lower()} AFTER {event} ON main.agent_cores
+                                BEGIN INSERT OR IGNORE INTO imported_ids VALUES (NEW.agent_id); END
+                            """)
+                    # WHERE is required before ON CONFLICT so SQLite does not parse it as a join
+                    written = conn.execute(f"""
+                        INSERT INTO agent_cores (agent_id, core_data, codec, save_date, uid, version, model)
+                        SELECT s.agent_id, s.core_data, s.codec, COALESCE(s.save_date, :today),
+                               s.uid, s.version, s.model
+                        FROM source.agent_cores AS s
+                        WHERE {where} AND {valid}
+                        {conflict}
+                    """, params).rowcount
+                    if written_ids:
+                        imported = [row[0] for row in conn.execute(
+                            "SELECT agent_id FROM temp.imported_ids ORDER BY agent_id")]
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.execute("DETACH DATABASE source")
+        finally:
+            conn.close()
+
+        inserted = accepted - existing
+        updated = written - inserted
+        metrics.inc("agentcores_matrix_rows_written_total", written)
+        result = {"source": source, "invalid": source - accepted, "inserted": inserted,
+                  "updated": updated, "skipped": existing - updated, "invalid_ids": invalid_ids}
+        if written_ids:
+            result["written_ids"] = imported
+        return result
+
+    def _encode(self, document, sections: Dict[str, str]) -> tuple:
+        """Return (core_data, codec tag) for a JSON document.
+        
+        In dedup mode each DEDUP_SECTIONS dict is replaced by {"$cas": sha256} and
+        its canonical JSON is added to sections for storage in core_sections. The
+        tag is the codec name, prefixed with "cas+" for content-addressed rows
+        (plain "cas" for JSON ones, as written before codecs existed). Documents
+        the codec cannot encode are stored as-is with the json codec.
+        """
+        if not self.dedup:
+            if self.codec.name == "json":
+                return document, "json"
+            try:
+                return self.codec.encode(document), self.codec.name
+            except (ValueError, TypeError):
+                return document, "json"
+        try:
+            core = json.loads(document)
+        except (ValueError, TypeError):
+            return document, "json"
+        agent_core = core.get("agentCore") if isinstance(core, dict) else None
+        referenced = False
+        if isinstance(agent_core, dict):
+            for name in self.DEDUP_SECTIONS:
+                section = agent_core.get(name)
+                if isinstance(section, dict):
+                    canonical = json.dumps(section, sort_keys=True, separators=(",", ":"))
+                    digest = hashlib.sha256(canonical.encode()).hexdigest()
+                    sections[digest] = canonical
+                    agent_core[name] = {"$cas": digest}
+                    referenced = True
+        if not referenced:
+            return self.codec.encode(document), self.codec.name
+        if self.codec.name == "json":
+            return json.dumps(core), "cas"
+        return self.codec.dumps(core), f"cas+{self.codec.name}"
+
+    @staticmethod
+    def _parse_tag(tag: str) -> tuple:
+        """Split a codec tag into (content addressed, codec)."""
+        if tag == "cas":
+            return True, get_codec("json")
+        if tag.startswith("cas+"):
+            return True, get_codec(tag[4:])
+        return False, get_codec(tag)
+
+    def _load_sections(self, conn: sqlite3.Connection, digests: set) -> Dict[str, Any]:
+        """Return digest -> section for digests, reading cache misses in one query per 500."""
+        resolved = {digest: self._section_cache.get(digest) for digest in digests}
+        missing = [digest for digest, section in resolved.items() if section is None]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for digest, data in conn.execute(
+                    f"SELECT hash, data FROM core_sections WHERE hash IN ({placeholders})", chunk):
+                section = json.loads(data)
+                self._section_cache.put(digest, section)
+                resolved[digest] = section
+        return resolved
+
+    def _decode_rows(self, conn: sqlite3.Connection, rows: list, parse: bool) -> list:
+        """Decode _ROW_COLUMNS rows into (agent_id, core, metadata) tuples.
+        
+        Content-addressed rows are parsed first so the sections missing from the
+        cache for the whole batch are read together on conn.
+        """
+        loaded, digests = [], set()
+        for row in rows:
+            tag = row[5]
+            core = refs = None
+            if tag != "json":
+                content_addressed, codec = self._parse_tag(tag)
+                if content_addressed:
+                    core = codec.loads(row[1])
+                    refs = {
+                        name: value["$cas"] for name, value in core["agentCore"].items()
+                        if isinstance(value, dict) and len(value) == 1 and "$cas" in value
+                    }
+                    digests.update(refs.values())
+            loaded.append((row, core, refs))
+        sections = self._load_sections(conn, digests) if digests else {}
+
+        decoded = []
+        for (agent_id, core_data, save_date, uid, version, tag), core, refs in loaded:
+            if core is None:
+                if tag == "json":
+                    document = json.loads(core_data) if parse else core_data
+                else:
+                    codec = self._parse_tag(tag)[1]
+                    document = codec.loads(core_data) if parse else codec.decode(core_data)
+            else:
+                agent_core = core["agentCore"]
+                for name, digest in refs.items():
+                    if sections.get(digest) is None:
+                        raise sqlite3.DatabaseError(f"Missing core section {digest} for agent core")
+                    agent_core[name] = sections[digest]
+                document = core if parse else json.dumps(core)
+            decoded.append((agent_id, document,
+                            {"agent_id": agent_id, "save_date": save_date, "uid": uid, "version": version}))
+        return decoded
+
+    def vacuum_sections(self) -> int:
+        """Delete core sections no longer referenced by any current or historical core.
+        
+        Returns:
+            int: Number of sections removed
+        """
+        with self._connection() as conn:
+            referenced = set()
+            rows = conn.execute(
+                "SELECT core_data, codec FROM agent_cores WHERE codec LIKE 'cas%' "
+                "UNION ALL SELECT core_data, codec FROM agent_core_versions WHERE codec LIKE 'cas%'"
+            )
+            for core_data, tag in rows:
+                agent_core = self._parse_tag(tag)[1].loads(core_data)["agentCore"]
+                referenced.update(
+                    value["$cas"] for value in agent_core.values()
+                    if isinstance(value, dict) and "$cas" in value
                 )
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS referenced_sections (hash TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM referenced_sections")
+            conn.executemany("INSERT INTO referenced_sections (hash) VALUES (?)", ((h,) for h in referenced))
+            cursor = conn.execute(
+                "DELETE FROM core_sections WHERE hash NOT IN (SELECT hash FROM referenced_sections)")
+            conn.execute("DELETE FROM referenced_sections")
+            return cursor.rowcount
 
+    def storage_stats(self) -> Dict[str, Any]:
+        """Return row counts and stored byte totals for cores and shared sections."""
+        with self._connection() as conn:
+            cores, core_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(core_data)), 0) FROM agent_cores").fetchone()
+            sections, section_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM core_sections").fetchone()
+            codecs = dict(conn.execute("SELECT codec, COUNT(*) FROM agent_cores GROUP BY codec").fetchall())
+        return {
+            "cores": cores,
+            "core_bytes": core_bytes,
+            "sections": sections,
+            "section_bytes": section_bytes,
+            "codecs": codecs,
+            "section_cache": self._section_cache.stats()
+        }
+
+    @metrics.timed("agentcores_matrix_seconds", op="get")
     def get(self, ids: Optional[list] = None) -> Dict:
         """Retrieve agent core(s) from matrix."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             if ids:
                 placeholders = ','.join('?' * len(ids))
-                query = f"SELECT agent_id, core_data, save_date FROM agent_cores WHERE agent_id IN ({placeholders})"
+                query = f"SELECT {self._ROW_COLUMNS} FROM agent_cores WHERE agent_id IN ({placeholders})"
                 results = conn.execute(query, ids).fetchall()
             else:
-                results = conn.execute("SELECT agent_id, core_data, save_date FROM agent_cores").fetchall()
+                results = conn.execute(f"SELECT {self._ROW_COLUMNS} FROM agent_cores").fetchall()
+
+            return self._to_result(conn, results)
+
+    @metrics.timed("agentcores_matrix_seconds", op="get_by_uid")
+    def get_by_uid(self, uid: str) -> Dict:
+        """Retrieve the current agent core(s) carrying the given UID."""
+        with self._connection() as conn:
+            results = conn.execute(
+                f"SELECT {self._ROW_COLUMNS} FROM agent_cores WHERE uid = ?",
+                (uid,)
+            ).fetchall()
+            return self._to_result(conn, results)
+
+    @metrics.timed("agentcores_matrix_seconds", op="history")
+    def history(self, agent_id: str) -> Dict:
+        """Retrieve every stored version of an agent core, oldest first."""
+        with self._connection() as conn:
+            results = conn.execute(
+                f"SELECT {self._ROW_COLUMNS} FROM agent_core_versions "
+                "WHERE agent_id = ? ORDER BY id",
+                (agent_id,)
+            ).fetchall()
+            return self._to_result(conn, results)
+
+    def list_summaries(self,
+                       limit: Optional[int] = None,
+                       offset: int = 0,
+                       after: Optional[str] = None,
+                       model: Optional[str] = None,
+                       saved_after: Optional[str] = None,
+                       saved_before: Optional[str] = None,
+                       page_size: int = 500):
+        """Lazily yield summary rows ordered by agent_id without touching core_data.
+        
+        Pages are fetched with keyset pagination on the agent_id primary key, so
+        each page is a short indexed query and no read transaction is held open
+        between pages.
+        
+        Args:
+            limit (int): Maximum number of rows to yield
+            offset (int): Number of matching rows to skip first
+            after (str): Keyset cursor, only agents with agent_id > after are returned
+            model (str): Only agents whose large_language_model equals this value
+            saved_after (str): Only agents saved on or after this date (YYYY-MM-DD)
+            saved_before (str): Only agents saved on or before this date (YYYY-MM-DD)
+            page_size (int): Rows fetched per query
+            
+        Yields:
+            dict: agent_id, uid, version, model and save_date of each agent
+        """
+        filters, params = [], []
+        if model is not None:
+            filters.append("model = ?")
+            params.append(model)
+        if saved_after is not None:
+            filters.append("save_date >= ?")
+            params.append(saved_after)
+        if saved_before is not None:
+            filters.append("save_date <= ?")
+            params.append(saved_before)
+
+        pages = self._iter_pages("agent_id, uid, version, model, save_date", filters, params,
+                                 limit=limit, offset=offset, after=after, page_size=page_size)
+        for rows in pages:
+            for agent_id, uid, version, model_name, save_date in rows:
+                yield {"agent_id": agent_id, "uid": uid, "version": version,
+                       "model": model_name, "save_date": save_date}
+
+    def iter_batches(self,
+                     batch_size: int = 500,
+                     decode: bool = True,
+                     unversioned_only: bool = False,
+                     after: Optional[str] = None):
+        """Stream agent cores in batches ordered by agent_id.
+        
+        Memory use is bounded by batch_size regardless of the store size. Batches
+        are fetched with keyset pagination, so writers are never blocked behind a
+        long-lived read cursor and the matrix may be written to between batches.
+        
+        Args:
+            batch_size (int): Number of agent cores per batch
+            decode (bool): Yield parsed dicts instead of the raw JSON documents
+            unversioned_only (bool): Only yield cores missing a uid or version
+            after (str): Keyset cursor, only agents with agent_id > after are returned
+            
+        Yields:
+            list: (agent_id, core, metadata) tuples
+        """
+        filters = ["(uid IS NULL OR version IS NULL)"] if unversioned_only else []
+        # Each page is decoded on the connection that fetched it
+        yield from self._iter_pages(self._ROW_COLUMNS, filters, [], after=after, page_size=batch_size,
+                                    transform=lambda conn, rows: self._decode_rows(conn, rows, decode))
+
+    def iter_cores(self, batch_size: int = 500, decode: bool = True, **kwargs):
+        """Stream (agent_id, core, metadata) tuples one at a time. See iter_batches."""
+        for batch in self.iter_batches(batch_size=batch_size, decode=decode, **kwargs):
+            yield from batch
+
+    def _iter_pages(self,
+                    columns: str,
+                    filters: list,
+                    params: list,
+                    limit: Optional[int] = None,
+                    offset: int = 0,
+                    after: Optional[str] = None,
+                    page_size: int = 500,
+                    transform=None):
+        """Yield lists of agent_cores rows using keyset pagination on agent_id.
+        
+        transform(conn, rows), if given, is applied to each page before the
+        connection that fetched it is released; its result is yielded instead.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        remaining = limit
+        while remaining is None or remaining > 0:
+            where = list(filters)
+            page_params = list(params)
+            if after is not None:
+                where.append("agent_id > ?")
+                page_params.append(after)
+            fetch = page_size if remaining is None else min(page_size, remaining)
+            query = f"SELECT {columns} FROM agent_cores"
+            if where:
+                query += " WHERE " + " AND ".join(where)
+            query += " ORDER BY agent_id LIMIT ? OFFSET ?"
+            with self._connection() as conn:
+                with metrics.timer("agentcores_matrix_seconds", op="page"):
+                    rows = conn.execute(query, page_params + [fetch, offset]).fetchall()
+                page = transform(conn, rows) if rows and transform is not None else rows
+            offset = 0
+            if not rows:
+                return
+            yield page
+            after = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < fetch:
+                return
 
-            return {
-                "ids": [r[0] for r in results],
-                "documents": [r[1] for r in results],
-                "metadatas": [{"agent_id": r[0], "save_date": r[2]} for r in results]
-            }
+    def _to_result(self, conn: sqlite3.Connection, results: list) -> Dict:
+        """Shape _ROW_COLUMNS rows like get(), with documents decoded to JSON."""
+        decoded = self._decode_rows(conn, results, parse=False)
+        return {
+            "ids": [r[0] for r in decoded],
+            "documents": [r[1] for r in decoded],
+            "metadatas": [r[2] for r in decoded]
+        }
 
+    @metrics.timed("agentcores_matrix_seconds", op="delete")
     def delete(self, ids: list) -> None:
-        """Remove agent core(s) from matrix."""
-        with sqlite3.connect(self.db_path) as conn:
+        """Remove agent core(s) from matrix. Their version history is kept."""
+        with self._connection() as conn:
             placeholders = ','.join('?' * len(ids))
-            conn.execute(f"DELETE FROM agent_cores WHERE agent_id IN ({placeholders})", ids)
\ No newline at end of file
+            conn.execute(f"DELETE FROM agent_cores WHERE agent_id IN ({placeholders})", ids)
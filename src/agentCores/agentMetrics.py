@@ -0,0 +1,309 @@
+# agentMetrics.py
+"""agentMetrics
+
+In-process counters and timing histograms for the agentCores hot paths.
+
+Instrumented code reports to the process-wide registry `metrics`. It starts
+disabled, and while disabled every timer and counter call returns after a
+single attribute check, so instrumentation can stay in place everywhere.
+Enable it with metrics.enable() or by setting AGENTCORES_METRICS=1.
+
+Metrics:
+- agentcores_matrix_seconds{op}: agentMatrix reads (get, get_by_uid, history, page
+  for each listing page) and writes (upsert, delete)
+- agentcores_matrix_rows_written_total: rows stored by agentMatrix upserts
+- agentcores_operation_seconds{op}: loadAgentCore, mintAgent and _generateUID
+- agentcores_core_cache_total{result}: loadAgentCore cache hits and misses
+- agentcores_db_open_seconds{db_type}: opening per-agent conversation, embeddings and knowledge stores
+- agentcores_chat_ttft_seconds{model}, agentcores_chat_turn_seconds{model}: time to first
+  token and total turn time
+- agentcores_chat_tokens_per_second{model}, agentcores_chat_tokens_total{model}: streamed
+  chunks, which for the bundled backends are one token each
+
+Histograms use fixed buckets, so recording is a bisect and an increment with no
+stored samples; snapshot() estimates p50/p90/p99 from the buckets and the
+observed min/max.
+
+Example:
+    ```python
+    from agentCores import agentCores, metrics
+
+    metrics.enable()
+    cores = agentCores()
+    cores.loadAgentCore("default_agent")
+    print(metrics.to_prometheus())
+
+    with metrics.timer("my_job_seconds", job="nightly"):
+        run_job()
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import bisect
+import functools
+import json
+import math
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+class _histogram:
+    """Cumulative-bucket histogram with a running count and sum."""
+    __slots__ = ("buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket, within the observed range."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = max(self.buckets[i - 1] if i else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+class _timer:
+    """Context manager observing the elapsed seconds into a histogram."""
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+class _nullTimer:
+    """Shared no-op timer and chat turn returned while the registry is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def token(self) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+_NULL_TIMER = _nullTimer()
+
+class chatTurn:
+    """Records time to first token, tokens/sec and total time of one streamed reply."""
+    __slots__ = ("registry", "model", "start", "first", "tokens")
+
+    def __init__(self, registry, model: str):
+        self.registry = registry
+        self.model = model
+        self.start = time.perf_counter()
+        self.first = None
+        self.tokens = 0
+
+    def token(self) -> None:
+        """Call once per streamed chunk."""
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self) -> None:
+        """Record the turn; call after the last chunk."""
+        end = time.perf_counter()
+        registry, model = self.registry, self.model
+        registry.observe("agentcores_chat_turn_seconds", end - self.start, model=model)
+        if self.first is None:
+            return
+        registry.observe("agentcores_chat_ttft_seconds", self.first - self.start, model=model)
+        registry.inc("agentcores_chat_tokens_total", self.tokens, model=model)
+        if self.tokens > 1 and end > self.first:
+            # Rate of the streaming phase, after the first token arrived
+            registry.observe("agentcores_chat_tokens_per_second",
+                             (self.tokens - 1) / (end - self.first), model=model)
+
+class metricsRegistry:
+    """Thread-safe registry of labelled counters and histograms."""
+    def __init__(self, enabled: bool = False):
+        """Create an empty registry.
+
+        Args:
+            enabled (bool): Record observations; while False every call is a no-op
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, _histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {"agentcores_chat_tokens_per_second": RATE_BUCKETS}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def set_buckets(self, name: str, buckets) -> None:
+        """Use custom bucket upper bounds for histograms of name created from now on."""
+        self._buckets[name] = tuple(sorted(buckets))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add value to a counter."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a value in a histogram."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels):
+        """Context manager timing its block into histogram name."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _timer(self, name, labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator timing every call of a function into histogram name."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def chat_turn(self, model: str):
+        """Start recording one chat turn of model, see chatTurn."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return chatTurn(self, model)
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values as plain data: counters and histogram count/sum/mean/p50/p90/p99."""
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = [{
+                    "labels": dict(key),
+                    "count": h.count,
+                    "sum": h.sum,
+                    "mean": h.sum / h.count if h.count else None,
+                    "min": h.min if h.count else None,
+                    "max": h.max if h.count else None,
+                    "p50": h.quantile(0.5),
+                    "p90": h.quantile(0.9),
+                    "p99": h.quantile(0.99),
+                } for key, h in series.items()]
+        return {"enabled": self.enabled, "counters": counters, "histograms": histograms}
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels(key)} {_number(value)}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(key + (('le', _number(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {_number(h.sum)}")
+                    lines.append(f"{name}_count{_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Human readable table of every histogram and counter, as shown by /stats."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["histograms"].items()):
+            for entry in series:
+                labels = ",".join(f"{k}={v}" for k, v in entry["labels"].items())
+                scale, unit = (1000, "ms") if name.endswith("_seconds") else (1, "")
+                lines.append(
+                    f"{name}{'{' + labels + '}' if labels else ''}: n={entry['count']} "
+                    f"mean={entry['mean'] * scale:.3f}{unit} p50={entry['p50'] * scale:.3f}{unit} "
+                    f"p99={entry['p99'] * scale:.3f}{unit}")
+        for name, series in sorted(snapshot["counters"].items()):
+            for entry in series:
+                labels = ",".join(f"{k}={v}" for k, v in entry["labels"].items())
+                lines.append(f"{name}{'{' + labels + '}' if labels else ''}: {_number(entry['value'])}")
+        return "\n".join(lines)
+
+def _labels(key: tuple) -> str:
+    if not key:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in key)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + "}"
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+metrics = metricsRegistry(enabled=os.environ.get("AGENTCORES_METRICS", "").lower() in ("1", "true", "yes"))
@@ -0,0 +1,231 @@
+# agentResponseCache.py
+"""agentResponseCache
+
+SQLite-backed cache of model replies for agents that answer deterministic,
+templated prompts.
+
+Entries are keyed by (agent uid, model, system prompt, message history hash).
+The uid is the content hash of the agent core, so editing an agent's prompts or
+models changes its uid and its old entries simply stop matching; they age out
+through the TTL and size limits. A hit replays the stored reply chunk by chunk,
+so streaming callers behave the same as on a miss.
+
+Features:
+- Time-to-live expiry checked on read, plus purge_expired() for bulk cleanup
+- Least-recently-used eviction by entry count and total reply bytes
+- Sync and async stream wrappers that store a reply only after it completed
+
+Example:
+    ```python
+    from agentCores import agentCores
+
+    cores = agentCores()
+    cache = cores.getResponseCache(ttl=3600, max_entries=50000)
+    key = cache.key(agent["agentCore"]["uid"], "llama3", messages)
+    for chunk in cache.stream(key, lambda: backend.stream("llama3", messages)):
+        print(chunk, end="")
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List, Callable, Iterator, AsyncIterator
+
+class responseCache:
+    """TTL and size bounded store of streamed model replies."""
+    def __init__(self,
+                 db_path: str,
+                 ttl: Optional[float] = 86400.0,
+                 max_entries: Optional[int] = 10000,
+                 max_bytes: Optional[int] = None):
+        """Open or create the cache.
+
+        Args:
+            db_path (str): Cache database, e.g. shared/response_cache.db
+            ttl (float): Seconds an entry stays valid; None keeps entries until evicted
+            max_entries (int): Entries kept before the least recently used are evicted
+            max_bytes (int): Total reply bytes kept before the least recently used are evicted
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    agent_uid TEXT,
+                    model TEXT,
+                    chunks TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache (last_used)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_agent ON response_cache (agent_uid)")
+        self._hits = 0
+        self._misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def key(agent_uid: str, model: str, messages: List[Dict[str, str]]) -> str:
+        """Cache key of a request: agent uid, model, system prompt and history hash.
+
+        A leading system message is taken as the system prompt and every other
+        message as history.
+        """
+        system = ""
+        if messages and messages[0].get("role") == "system":
+            system, messages = messages[0]["content"], messages[1:]
+        history = hashlib.sha256(
+            json.dumps([[m["role"], m["content"]] for m in messages], separators=(",", ":")).encode()
+        ).hexdigest()
+        prompt = hashlib.sha256(system.encode()).hexdigest()
+        return hashlib.sha256(f"{agent_uid}\0{model}\0{prompt}\0{history}".encode()).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[List[str]]:
+        """Return the stored reply chunks, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chunks, created FROM response_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            if self.ttl is not None and row[1] + self.ttl <= now:
+                with self._conn:
+                    self._conn.execute("DELETE FROM response_cache WHERE cache_key = ?", (cache_key,))
+                self._misses += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE response_cache SET last_used = ?, hits = hits + 1 WHERE cache_key = ?",
+                    (now, cache_key)
+                )
+            self._hits += 1
+        return json.loads(row[0])
+
+    def put(self,
+            cache_key: str,
+            chunks: List[str],
+            agent_uid: Optional[str] = None,
+            model: Optional[str] = None) -> None:
+        """Store a complete reply, then evict entries beyond the size limits."""
+        data = json.dumps(chunks)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache "
+                "(cache_key, agent_uid, model, chunks, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, agent_uid, model, data, len(data), now, now)
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        if self.max_bytes is not None:
+            # Keep the most recently used entries whose running size fits in max_bytes
+            self._conn.execute("""
+                DELETE FROM response_cache WHERE cache_key IN (
+                    SELECT cache_key FROM (
+                        SELECT cache_key, SUM(size) OVER (ORDER BY last_used DESC, cache_key) AS running
+                        FROM response_cache
+                    ) WHERE running > ?
+                )
+            """, (self.max_bytes,))
+
+    def stream(self, cache_key: str, produce: Callable[[], Iterator[str]],
+               agent_uid: Optional[str] = None, model: Optional[str] = None) -> Iterator[str]:
+        """Replay a cached reply, or stream produce() and cache it once it completes."""
+        chunks = self.get(cache_key)
+        if chunks is not None:
+            yield from chunks
+            return
+        chunks = []
+        for chunk in produce():
+            chunks.append(chunk)
+            yield chunk
+        self.put(cache_key, chunks, agent_uid, model)
+
+    async def astream(self, cache_key: str, produce: Callable[[], AsyncIterator[str]],
+                      agent_uid: Optional[str] = None, model: Optional[str] = None,
+                      run=None) -> AsyncIterator[str]:
+        """Async counterpart of stream.
+
+        Args:
+            run: Optional coroutine function run(func, *args) that executes the
+                blocking cache reads and writes off the event loop
+        """
+        if run is None:
+            async def run(func, *args):
+                return func(*args)
+        chunks = await run(self.get, cache_key)
+        if chunks is not None:
+            for chunk in chunks:
+                yield chunk
+            return
+        chunks = []
+        async for chunk in produce():
+            chunks.append(chunk)
+            yield chunk
+        await run(self.put, cache_key, chunks, agent_uid, model)
+
+    def purge_expired(self) -> int:
+        """Delete every expired entry.
+
+        Returns:
+            int: Number of entries deleted
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM response_cache WHERE created <= ?", (time.time() - self.ttl,)
+            ).rowcount
+
+    def clear(self, agent_uid: Optional[str] = None) -> None:
+        """Delete all entries, or only those of one agent uid."""
+        with self._lock, self._conn:
+            if agent_uid is None:
+                self._conn.execute("DELETE FROM response_cache")
+            else:
+                self._conn.execute("DELETE FROM response_cache WHERE agent_uid = ?", (agent_uid,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, stored bytes, and hits/misses of this instance."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache").fetchone()
+            return {"entries": entries, "bytes": size, "hits": self._hits, "misses": self._misses}
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
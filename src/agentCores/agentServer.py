@@ -0,0 +1,370 @@
+# agentServer.py
+"""agentServer
+
+Concurrent multi-agent chat server on asyncio.
+
+chat_with_agent drives one conversation per process through input(). agentServer
+hosts many agent sessions at once: each client connection sends chat requests
+as newline-delimited JSON and receives the reply streamed back token by token.
+Agent cores are loaded from the matrix once and shared by every session of that
+agent, and blocking store calls run on the AsyncAgentCores worker pool.
+
+Features:
+- Per-session state: rolling context window and a lock that orders the session's turns
+- Bounded memory: idle sessions expire after session_ttl, the least recently used
+  sessions are flushed beyond max_sessions, and at most max_agents cores stay cached
+- Streaming token output, with writer.drain() after every token so slow clients push
+  back on generation instead of growing buffers
+- A configurable concurrency limit per model; requests beyond it queue
+- Optional response cache for agents with RESPONSE_CACHE_FLAG set, see agentResponseCache
+- Each agent's large_language_model picks its backend (see agentBackends); the stub
+  backend serves load tests without a model server
+
+Protocol, one JSON object per line:
+    request:  {"agent_id": "default_agent", "session_id": "s1", "message": "Hello"}
+    reply:    {"token": "..."} per token, then {"done": true, "session_id": "s1"}
+    errors:   {"error": "..."}
+    end:      {"agent_id": "default_agent", "session_id": "s1", "end": true} flushes and drops the session
+    stats:    {"stats": "json"} or {"stats": "prometheus"} replies {"stats": ...} from agentMetrics
+
+Example:
+    ```bash
+    python -m agentCores serve --port 8765 --stub --model-limit 4
+    ```
+    ```python
+    import asyncio
+    from agentCores import agentCores
+    from agentCores.agentServer import agentServer
+    from agentCores.agentBackends import stubBackend
+
+    async def main():
+        server = agentServer(agentCores(), backend=stubBackend(), model_limits={"llama3": 2})
+        async for token in server.chat("default_agent", "session-1", "Hello!"):
+            print(token, end="")
+        await server.close()
+
+    asyncio.run(main())
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, AsyncIterator
+from .agentCores import agentCores
+from .agentBackends import get_backend, microBatcher
+from .asyncAgentCores import AsyncAgentCores
+from .agentMetrics import metrics
+
+class chatSession:
+    """State of one (agent, session) conversation on the server."""
+    def __init__(self, agent_id: str, session_id: str, context):
+        self.agent_id = agent_id
+        self.session_id = session_id
+        self.context = context
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+class agentServer:
+    """Hosts concurrent chat sessions with many agents."""
+    def __init__(self,
+                 cores: Optional[agentCores] = None,
+                 backend=None,
+                 host: str = "127.0.0.1",
+                 port: int = 8765,
+                 default_model_limit: int = 4,
+                 model_limits: Optional[Dict[str, int]] = None,
+                 max_context_tokens: int = 4096,
+                 workers: int = 8,
+                 batch_window: Optional[float] = None,
+                 max_batch: int = 16,
+                 response_cache=None,
+                 session_ttl: Optional[float] = 1800.0,
+                 max_sessions: int = 10000,
+                 max_agents: int = 1024):
+        """Initialize the server.
+
+        Args:
+            cores (agentCores): Agent store to serve; a default agentCores if omitted
+            backend (llmBackend): Backend for every model; if omitted each agent's
+                large_language_model selects one, see agentBackends.get_backend
+            host (str): Interface to listen on
+            port (int): TCP port; 0 picks a free port
+            default_model_limit (int): Concurrent generations allowed per model
+            model_limits (dict): Per-model overrides of default_model_limit
+            max_context_tokens (int): Token budget of each session's context window
+            workers (int): Threads for blocking store calls
+            batch_window (float): If set, micro-batch concurrent requests per model,
+                waiting up to this many seconds for a batch to fill
+            max_batch (int): Largest micro-batch
+            response_cache (responseCache): Cache serving agents whose
+                RESPONSE_CACHE_FLAG is set; no caching if omitted
+            session_ttl (float): Seconds a session may stay idle before it is flushed
+                and dropped; None keeps idle sessions until max_sessions is reached
+            max_sessions (int): Open sessions kept; the least recently used idle ones
+                are flushed and dropped when a new session would exceed it
+            max_agents (int): Agent cores kept loaded, least recently used evicted first
+        """
+        if max_sessions < 1 or max_agents < 1:
+            raise ValueError("max_sessions and max_agents must be at least 1")
+        self.async_cores = AsyncAgentCores(cores if cores is not None else agentCores(), workers=workers)
+        self.cores = self.async_cores.cores
+        self.backend = backend
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.response_cache = response_cache
+        self._backends = {}
+        self.host = host
+        self.port = port
+        self.default_model_limit = default_model_limit
+        self.model_limits = dict(model_limits or {})
+        self.max_context_tokens = max_context_tokens
+        self._model_semaphores = {}
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.max_agents = max_agents
+        self._agents = OrderedDict()
+        self._sessions = OrderedDict()
+        self._server = None
+
+    async def start(self) -> None:
+        """Start listening; self.port holds the bound port afterwards."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=1 << 20)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening, close backend connections, flush every session and release the store."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Async model clients are bound to this event loop
+        for backend, _ in self._backends.values():
+            await backend.aclose()
+        self._backends.clear()
+        await self.async_cores.run(self.cores.close)
+        await self.async_cores.close()
+
+    def _backend(self, model_spec: str):
+        """Backend and model name for a large_language_model value, wrapped for batching if enabled."""
+        resolved = self._backends.get(model_spec)
+        if resolved is None:
+            if self.backend is not None:
+                backend, model = self.backend, model_spec
+            else:
+                backend, model = get_backend(model_spec)
+            if self.batch_window is not None:
+                # The model limit then caps batches in flight rather than requests
+                backend = microBatcher(backend, window=self.batch_window, max_batch=self.max_batch,
+                                       max_concurrent=self.model_limits.get(model_spec, self.default_model_limit))
+            resolved = self._backends[model_spec] = (backend, model)
+        return resolved
+
+    def _model_semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._model_semaphores.get(model)
+        if semaphore is None:
+            limit = self.model_limits.get(model, self.default_model_limit)
+            semaphore = self._model_semaphores[model] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def _agent(self, agent_id: str) -> Dict[str, Any]:
+        """Load an agent core once; concurrent first requests share the same load."""
+        pending = self._agents.get(agent_id)
+        if pending is None:
+            pending = self._agents[agent_id] = asyncio.ensure_future(self.async_cores.loadAgentCore(agent_id))
+            while len(self._agents) > self.max_agents:
+                # Requests already awaiting an evicted load still receive its result
+                self._agents.popitem(last=False)
+        else:
+            self._agents.move_to_end(agent_id)
+        try:
+            agent = await pending
+        except Exception:
+            self._agents.pop(agent_id, None)
+            raise
+        if agent is None:
+            self._agents.pop(agent_id, None)
+            raise ValueError(f"Agent '{agent_id}' not found")
+        return agent
+
+    async def _session(self, agent_id: str, session_id: str, agent: Dict[str, Any]) -> chatSession:
+        key = (agent_id, session_id)
+        session = self._sessions.get(key)
+        if session is None:
+            await self.evictSessions(reserve=1)
+            context = await self.async_cores.run(
+                self.cores.getContextWindow, agent_id, session_id,
+                max_tokens=self.max_context_tokens, agent=agent)
+            # Another request may have created it while the window loaded
+            session = self._sessions.setdefault(key, chatSession(agent_id, session_id, context))
+        else:
+            self._sessions.move_to_end(key)
+        session.last_used = time.monotonic()
+        return session
+
+    async def evictSessions(self, reserve: int = 0) -> int:
+        """Flush and drop sessions idle longer than session_ttl, and the least recently
+        used ones while more than max_sessions - reserve are open. Sessions in the
+        middle of a turn are never evicted.
+
+        Returns:
+            int: Number of sessions dropped
+        """
+        now = time.monotonic()
+        limit = self.max_sessions - reserve
+        victims = []
+        # Sessions are kept in least recently used order
+        for key, session in self._sessions.items():
+            over = len(self._sessions) - len(victims) > limit
+            idle = self.session_ttl is not None and now - session.last_used > self.session_ttl
+            if not (over or idle):
+                break
+            if not session.lock.locked():
+                victims.append(key)
+        for agent_id, session_id in victims:
+            await self.endSession(agent_id, session_id)
+        return len(victims)
+
+    def invalidateAgent(self, agent_id: str) -> None:
+        """Reload the agent core on its next request, e.g. after it was edited."""
+        self._agents.pop(agent_id, None)
+        self.cores._invalidateCache(agent_id)
+
+    async def endSession(self, agent_id: str, session_id: str) -> None:
+        """Flush a session's turns and drop its state."""
+        session = self._sessions.pop((agent_id, session_id), None)
+        if session is not None:
+            async with session.lock:
+                await self.async_cores.run(session.context.store.flush)
+        self.cores.closeContextWindow(agent_id, session_id)
+
+    async def chat(self, agent_id: str, session_id: str, message: str) -> AsyncIterator[str]:
+        """Run one chat turn and stream the reply tokens.
+
+        Turns of one session run one at a time in arrival order; different
+        sessions run concurrently up to each model's limit.
+        """
+        agent = await self._agent(agent_id)
+        model = agent["agentCore"]["models"]["large_language_model"]
+        if not model:
+            raise ValueError(f"No language model configured for agent '{agent_id}'")
+        session = await self._session(agent_id, session_id, agent)
+        async with session.lock:
+            context = session.context
+            system_prompt = self.cores.getSystemPrompt(agent)
+            if context.system_prompt != system_prompt:
+                # The core was edited and reloaded since the session started
+                context.set_system_prompt(system_prompt)
+            await self.async_cores.run(context.add, "user", message)
+            messages = await self.async_cores.run(context.messages)
+            response = []
+            core = agent["agentCore"]
+            if self.response_cache is not None and core.get("commandFlags", {}).get("RESPONSE_CACHE_FLAG"):
+                stream = self.response_cache.astream(
+                    self.response_cache.key(core.get("uid"), model, messages),
+                    lambda: self._generate(model, messages), core.get("uid"), model,
+                    run=self.async_cores.run)
+            else:
+                stream = self._generate(model, messages)
+            turn = metrics.chat_turn(model)
+            async for token in stream:
+                turn.token()
+                response.append(token)
+                yield token
+            turn.finish()
+            await self.async_cores.run(context.add, "assistant", "".join(response), {"model": model})
+
+    async def _generate(self, model: str, messages: list) -> AsyncIterator[str]:
+        """Stream a reply from the model's backend within the model's concurrency limit."""
+        backend, model_name = self._backend(model)
+        if isinstance(backend, microBatcher):
+            async for token in backend.astream(model_name, messages):
+                yield token
+        else:
+            async with self._model_semaphore(model):
+                async for token in backend.astream(model_name, messages):
+                    yield token
+
+    async def _send(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+        writer.write(json.dumps(payload).encode() + b"\n")
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one client connection, answering its requests in order."""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await self._send(writer, {"error": "request line too long"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if isinstance(request, dict) and "stats" in request:
+                        stats = metrics.to_prometheus() if request["stats"] == "prometheus" else metrics.snapshot()
+                        await self._send(writer, {"stats": stats})
+                        continue
+                    agent_id = request["agent_id"]
+                except (ValueError, KeyError, TypeError):
+                    await self._send(writer, {"error": "expected a JSON object with agent_id"})
+                    continue
+                session_id = request.get("session_id") or uuid.uuid4().hex
+                try:
+                    if request.get("end"):
+                        await self.endSession(agent_id, session_id)
+                    else:
+                        async for token in self.chat(agent_id, session_id, request.get("message", "")):
+                            await self._send(writer, {"token": token})
+                    await self._send(writer, {"done": True, "session_id": session_id})
+                except (ConnectionError, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    await self._send(writer, {"error": str(e), "session_id": session_id})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+async def chat_request(host: str,
+                       port: int,
+                       agent_id: str,
+                       message: str,
+                       session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Minimal client: send one request and yield the server's reply objects."""
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    try:
+        request = {"agent_id": agent_id, "session_id": session_id, "message": message}
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            yield reply
+            if "done" in reply or "error" in reply:
+                break
+    finally:
+        writer.close()
+        await writer.wait_closed()
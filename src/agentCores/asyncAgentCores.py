@@ -0,0 +1,96 @@
+# asyncAgentCores.py
+"""asyncAgentCores
+
+Awaitable counterparts of the agentCores operations used on request paths.
+
+AsyncAgentCores wraps an agentCores instance and runs its blocking calls on a
+bounded thread pool, so hundreds of concurrent requests can share one agent store
+without stalling the event loop. Pair it with a pooled matrix and a core cache for
+the best throughput.
+
+Example:
+    ```python
+    import asyncio
+    from agentCores import AsyncAgentCores
+    
+    async def main():
+        async with AsyncAgentCores(db_path="agents.db", pool_size=8, cache_size=256) as cores:
+            agent = await cores.loadAgentCore("default_agent")
+            summaries = await cores.listAgentCores()
+    
+    asyncio.run(main())
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any
+from .agentCores import agentCores
+
+class AsyncAgentCores:
+    """asyncio facade over agentCores."""
+    def __init__(self, cores: Optional[agentCores] = None, workers: int = 8, **cores_kwargs):
+        """Initialize the facade.
+        
+        Args:
+            cores (agentCores): Existing instance to wrap; created from cores_kwargs if omitted
+            workers (int): Maximum number of blocking calls in flight
+            **cores_kwargs: Keyword arguments for agentCores
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self._owns_cores = cores is None
+        self.cores = cores if cores is not None else agentCores(**cores_kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agentCores")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def run(self, func, *args, **kwargs):
+        """Run any blocking call, e.g. on a context window or store, on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def loadAgentCore(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Load an agent configuration from the library."""
+        return await self.run(self.cores.loadAgentCore, agent_id)
+
+    async def storeAgentCore(self, agent_id: str, core_config: Dict[str, Any]) -> None:
+        """Store an agent configuration in the matrix."""
+        return await self.run(self.cores.storeAgentCore, agent_id, core_config)
+
+    async def storeAgentCores(self, core_configs: Dict[str, Dict[str, Any]], chunk_size: int = 500) -> int:
+        """Store many agent configurations in one transaction."""
+        return await self.run(self.cores.storeAgentCores, core_configs, chunk_size)
+
+    async def deleteAgentCore(self, agent_id: str) -> None:
+        """Remove an agent configuration from storage."""
+        return await self.run(self.cores.deleteAgentCore, agent_id)
+
+    async def mintAgent(self, agent_id: str, **kwargs) -> Dict:
+        """Create a new agent with proper database initialization."""
+        return await self.run(self.cores.mintAgent, agent_id, **kwargs)
+
+    async def listAgentCores(self, **kwargs) -> list:
+        """List available agent cores."""
+        return await self.run(functools.partial(self.cores.listAgentCores, **kwargs))
+
+    async def close(self) -> None:
+        """Wait for pending calls, stop the workers and close an owned agentCores.
+        
+        An agentCores passed in by the caller stays open; one created by the
+        facade is closed with agentCores.close, flushing its stores.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+        if self._owns_cores:
+            await loop.run_in_executor(None, self.cores.close)
@@ -0,0 +1,101 @@
+# asyncAgentMatrix.py
+"""asyncAgentMatrix
+
+Awaitable access to agentMatrix for asyncio applications.
+
+SQLite calls block, so running agentMatrix directly inside a coroutine stalls the
+event loop for every read and write. AsyncAgentMatrix runs each call on a
+dedicated worker thread pool whose size matches a pooled agentMatrix, so every
+worker effectively owns one long-lived connection.
+
+Example:
+    ```python
+    import asyncio
+    from agentCores import AsyncAgentMatrix
+    
+    async def main():
+        async with AsyncAgentMatrix("agents.db", workers=4) as matrix:
+            await matrix.upsert(documents=[agent_json], ids=["agent1"])
+            agents = await matrix.get(ids=["agent1"])
+    
+    asyncio.run(main())
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict
+from .agentMatrix import agentMatrix
+
+class AsyncAgentMatrix:
+    """asyncio facade over a pooled agentMatrix."""
+    def __init__(self,
+                 db_path: str = "agent_matrix.db",
+                 workers: int = 1,
+                 matrix: Optional[agentMatrix] = None,
+                 **matrix_kwargs):
+        """Initialize the async matrix.
+        
+        Args:
+            db_path (str): Path to the SQLite database file
+            workers (int): Number of worker threads, and pooled connections
+            matrix (agentMatrix): Existing matrix to wrap instead of opening db_path
+            **matrix_kwargs: Extra keyword arguments for agentMatrix
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self._owns_matrix = matrix is None
+        self.matrix = matrix if matrix is not None else agentMatrix(db_path, pool_size=workers, **matrix_kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agentMatrix")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking matrix call on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def upsert(self, documents: list, ids: list, metadatas: list = None) -> None:
+        """Store agent core(s) in matrix."""
+        return await self._run(self.matrix.upsert, documents, ids, metadatas)
+
+    async def bulk_upsert(self, documents, ids, metadatas=None, chunk_size: int = 500) -> int:
+        """Store many agent cores in a single all-or-nothing transaction."""
+        return await self._run(self.matrix.bulk_upsert, documents, ids, metadatas, chunk_size)
+
+    async def get(self, ids: Optional[list] = None) -> Dict:
+        """Retrieve agent core(s) from matrix."""
+        return await self._run(self.matrix.get, ids)
+
+    async def get_by_uid(self, uid: str) -> Dict:
+        """Retrieve the current agent core(s) carrying the given UID."""
+        return await self._run(self.matrix.get_by_uid, uid)
+
+    async def history(self, agent_id: str) -> Dict:
+        """Retrieve every stored version of an agent core, oldest first."""
+        return await self._run(self.matrix.history, agent_id)
+
+    async def delete(self, ids: list) -> None:
+        """Remove agent core(s) from matrix."""
+        return await self._run(self.matrix.delete, ids)
+
+    async def migrate(self) -> bool:
+        """Upgrade the database to the current schema version."""
+        return await self._run(self.matrix.migrate)
+
+    async def close(self) -> None:
+        """Wait for pending calls, stop the workers and close owned connections."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+        if self._owns_matrix:
+            self.matrix.close()
@@ -0,0 +1,525 @@
+# shardedAgentMatrix.py
+"""shardedAgentMatrix
+
+An agentMatrix partitioned across several SQLite files.
+
+SQLite allows one writer per database file, so a single agent_matrix.db
+serializes every minting and import job. ShardedAgentMatrix places each agent
+core in one of N shard files chosen by a stable hash of its agent_id, so writes
+to different shards proceed in parallel. It offers the agentMatrix interface and
+can be passed to agentCores wherever an agentMatrix is accepted.
+
+Features:
+- Stable blake2b placement of agent_id, identical across processes and runs
+- Writes partitioned per shard, each shard in its own transaction on its own thread
+- Parallel cross-shard get / get_by_uid, and agent_id ordered list_summaries and
+  iter_batches merged from concurrently prefetched shard pages
+- rebalance(n) moves cores, history and shared sections into a new shard count with SQL,
+  holding off writes, gets and imports until the new shards are open
+
+Shard files sit next to db_path: "agents.db" with 4 shards uses agents.0-of-4.db
+through agents.3-of-4.db. The manifest agents.shards.json names the committed
+shard count; rebalance fills the new shards under temporary names and switches
+the manifest only once all of them are complete.
+
+Example:
+    ```python
+    from agentCores import agentCores, ShardedAgentMatrix
+
+    matrix = ShardedAgentMatrix("agents.db", shards=8, pool_size=2)
+    cores = agentCores(matrix=matrix)
+    cores.mintAgents([f"agent_{i}" for i in range(10000)])
+
+    matrix.rebalance(16)
+    ```
+
+Author: Leo Borcherding
+Version: 0.1.0
+Date: 2024-12-11
+License: MIT
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+from .agentMatrix import agentMatrix
+
+_DONE = object()
+# Sent to shard writers when the row producer failed, so they roll back
+_ABORT = object()
+
+# Suffix of shard files still being filled by rebalance
+_PENDING_SUFFIX = ".rebalancing"
+
+def shard_of(agent_id: str, shards: int) -> int:
+    """Stable shard index of an agent_id."""
+    digest = hashlib.blake2b(str(agent_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+class _shardLock:
+    """Many concurrent shard operations, or one exclusive rebalance."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = 0
+        self._exclusive = False
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._exclusive:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                if not self._active:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        """Wait for running operations to finish and hold off new ones."""
+        with self._cond:
+            while self._exclusive:
+                self._cond.wait()
+            self._exclusive = True
+            while self._active:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+class ShardedAgentMatrix:
+    """agentMatrix interface over N hash-partitioned shard files."""
+    SCHEMA_VERSION = agentMatrix.SCHEMA_VERSION
+
+    def __init__(self,
+                 db_path: str = "agent_matrix.db",
+                 shards: Optional[int] = None,
+                 workers: Optional[int] = None,
+                 **matrix_kwargs):
+        """Open or create the shards.
+
+        Args:
+            db_path (str): Base path the shard file names are derived from
+            shards (int): Number of shards. None uses the count found on disk, or 4
+                for a new matrix. A count different from the one on disk raises;
+                open with the existing count and call rebalance instead.
+            workers (int): Threads for cross-shard operations, defaults to the shard count
+            **matrix_kwargs: pool_size, pragmas, dedup, codec, ... for every shard agentMatrix
+        """
+        self.db_path = db_path
+        self.matrix_kwargs = matrix_kwargs
+        existing = self.existing_shard_count()
+        if shards is None:
+            shards = existing or 4
+        elif existing and existing != shards:
+            raise ValueError(
+                f"{db_path} has {existing} shards on disk; open it with shards={existing} "
+                f"and call rebalance({shards})")
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self._lock = _shardLock()
+        self._workers = workers
+        self._max_workers = workers or shards
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="agentShard")
+        self.shards = self._open_shards(shards)
+        if existing != shards or not os.path.exists(self.manifest_path()):
+            self._write_manifest(shards)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.shards)
+
+    def shard_path(self, index: int, shards: int) -> str:
+        base = Path(self.db_path)
+        return str(base.with_name(f"{base.stem}.{index}-of-{shards}{base.suffix}"))
+
+    def manifest_path(self) -> str:
+        base = Path(self.db_path)
+        return str(base.with_name(f"{base.stem}.shards.json"))
+
+    def _read_manifest(self) -> int:
+        try:
+            with open(self.manifest_path()) as f:
+                return int(json.load(f)["shards"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+
+    def _write_manifest(self, shards: int) -> None:
+        """Atomically record shards as the committed shard count."""
+        path = self.manifest_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"shards": shards}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def existing_shard_count(self) -> int:
+        """Shard count of the committed shard set on disk, 0 if there is none.
+
+        The manifest decides when it names a complete set. Without one, as for
+        matrices created before the manifest existed, the single complete set
+        found on disk is used; several complete sets raise instead of guessing.
+        """
+        base = Path(self.db_path)
+        pattern = re.compile(rf"^{re.escape(base.stem)}\.(\d+)-of-(\d+){re.escape(base.suffix)}$")
+        found = {}
+        if base.parent.is_dir():
+            for name in os.listdir(base.parent):
+                match = pattern.match(name)
+                if match:
+                    found.setdefault(int(match.group(2)), set()).add(int(match.group(1)))
+        complete = [count for count, indexes in found.items() if indexes == set(range(count))]
+        committed = self._read_manifest()
+        if committed in complete:
+            return committed
+        if committed:
+            raise ValueError(f"{self.manifest_path()} names {committed} shards but their files are missing")
+        if len(complete) > 1:
+            raise ValueError(f"{self.db_path} has complete shard sets for {sorted(complete)} shards "
+                             f"and no manifest; remove the stale set")
+        return complete[0] if complete else 0
+
+    def _open_shards(self, shards: int) -> List[agentMatrix]:
+        paths = [self.shard_path(i, shards) for i in range(shards)]
+        return list(self._executor.map(lambda path: agentMatrix(path, **self.matrix_kwargs), paths))
+
+    def _shard(self, agent_id: str) -> agentMatrix:
+        return self.shards[shard_of(agent_id, len(self.shards))]
+
+    def _group(self, ids: list) -> Dict[int, list]:
+        groups = {}
+        for id_ in ids:
+            groups.setdefault(shard_of(id_, len(self.shards)), []).append(id_)
+        return groups
+
+    def _group_rows(self, rows) -> Dict[int, list]:
+        groups = {}
+        for row in rows:
+            groups.setdefault(shard_of(row[0], len(self.shards)), []).append(row)
+        return groups
+
+    def _map(self, func, shards=None) -> list:
+        """Run func(shard) on every shard concurrently and return the results in shard order."""
+        return list(self._executor.map(func, self.shards if shards is None else shards))
+
+    def close(self) -> None:
+        """Close every shard and stop the worker threads."""
+        for shard in self.shards:
+            shard.close()
+        self._executor.shutdown(wait=True)
+
+    def schema_version(self) -> int:
+        return min(self._map(lambda shard: shard.schema_version()))
+
+    def migrate(self) -> bool:
+        with self._lock.shared():
+            return any(self._map(lambda shard: shard.migrate()))
+
+    def has_unversioned(self) -> bool:
+        return any(self._map(lambda shard: shard.has_unversioned()))
+
+    def needs_migration(self) -> bool:
+        return any(self._map(lambda shard: shard.needs_migration()))
+
+    def upsert(self, documents: list, ids: list, metadatas: list = None) -> None:
+        """Store agent core(s) in their shards."""
+        self.bulk_upsert(documents, ids, metadatas)
+
+    def bulk_upsert(self, documents, ids, metadatas=None, chunk_size: int = 500) -> int:
+        """Store many agent cores, one transaction per shard. See agentMatrix.bulk_upsert."""
+        if metadatas is None:
+            metadatas = itertools.repeat({'save_date': None})
+        rows = zip(ids, documents, metadatas)
+        if isinstance(ids, (list, tuple)):
+            rows = list(rows)
+        return self.upsert_rows(rows, chunk_size=chunk_size)
+
+    def upsert_rows(self, rows, chunk_size: int = 500) -> int:
+        """Store (agent_id, document, metadata) rows, streaming each shard's rows to its own writer.
+
+        Every shard writes its rows in a single transaction on its own thread, so
+        shards are written in parallel; rows from an iterator are streamed with
+        bounded memory, while a list is grouped by shard up front. Each shard is
+        all-or-nothing; shards that already committed are not rolled back when
+        another shard fails. If the rows iterable itself raises, every shard
+        rolls back, as agentMatrix.upsert_rows does.
+        """
+        with self._lock.shared():
+            return self._upsert_rows(rows, chunk_size)
+
+    def _upsert_rows(self, rows, chunk_size: int) -> int:
+        if isinstance(rows, (list, tuple)):
+            groups = self._group_rows(rows)
+            return sum(self._executor.map(lambda item: self.shards[item[0]].upsert_rows(item[1], chunk_size),
+                                          groups.items()))
+        queues = [queue.Queue(maxsize=chunk_size) for _ in self.shards]
+        failed = threading.Event()
+
+        def shard_rows(q):
+            while True:
+                row = q.get()
+                if row is _DONE:
+                    return
+                if row is _ABORT:
+                    raise RuntimeError("Row producer failed; shard write rolled back")
+                yield row
+
+        def write(index):
+            try:
+                return self.shards[index].upsert_rows(shard_rows(queues[index]), chunk_size)
+            except BaseException:
+                failed.set()
+                raise
+
+        # Writers need their own threads: each blocks on its queue until the rows end
+        with ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="agentShardWriter") as pool:
+            futures = [pool.submit(write, i) for i in range(len(self.shards))]
+            end = _DONE
+            try:
+                for row in rows:
+                    q = queues[shard_of(row[0], len(self.shards))]
+                    while not failed.is_set():
+                        try:
+                            q.put(row, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    if failed.is_set():
+                        break
+            except BaseException:
+                end = _ABORT
+                raise
+            finally:
+                for q, future in zip(queues, futures):
+                    while not future.done():
+                        try:
+                            q.put(end, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+            return sum(future.result() for future in futures)
+
+    def get(self, ids: Optional[list] = None) -> Dict:
+        """Retrieve agent core(s), querying the shards concurrently."""
+        with self._lock.shared():
+            if ids:
+                groups = self._group(ids)
+                parts = list(self._executor.map(lambda item: self.shards[item[0]].get(ids=item[1]),
+                                                groups.items()))
+            else:
+                parts = self._map(lambda shard: shard.get())
+        return self._merge_results(parts)
+
+    def get_by_uid(self, uid: str) -> Dict:
+        """Retrieve the current agent core(s) carrying the given UID from every shard."""
+        with self._lock.shared():
+            return self._merge_results(self._map(lambda shard: shard.get_by_uid(uid)))
+
+    def history(self, agent_id: str) -> Dict:
+        """Retrieve every stored version of an agent core, oldest first."""
+        with self._lock.shared():
+            return self._shard(agent_id).history(agent_id)
+
+    def delete(self, ids: list) -> None:
+        """Remove agent core(s) from their shards. Their version history is kept."""
+        with self._lock.shared():
+            groups = self._group(ids)
+            list(self._executor.map(lambda item: self.shards[item[0]].delete(item[1]), groups.items()))
+
+    @staticmethod
+    def _merge_results(parts: list) -> Dict:
+        return {key: [value for part in parts for value in part[key]] for key in ("ids", "documents", "metadatas")}
+
+    def _prefetched(self, iterator, chunk: int):
+        """Yield lists of up to chunk items from iterator, fetching the next list in the background."""
+        fetch = lambda: list(itertools.islice(iterator, chunk))
+        future = self._executor.submit(fetch)
+        while True:
+            items = future.result()
+            if not items:
+                return
+            future = self._executor.submit(fetch)
+            yield items
+
+    def _merged(self, iterators: list, chunk: int, key):
+        """Merge per-shard iterators that are each sorted by key, prefetching every shard concurrently."""
+        streams = [itertools.chain.from_iterable(self._prefetched(it, chunk)) for it in iterators]
+        return heapq.merge(*streams, key=key)
+
+    def list_summaries(self,
+                       limit: Optional[int] = None,
+                       offset: int = 0,
+                       after: Optional[str] = None,
+                       page_size: int = 500,
+                       **filters):
+        """Lazily yield summary rows ordered by agent_id across all shards. See agentMatrix.list_summaries."""
+        # Each shard may contribute every one of the first offset + limit rows
+        shard_limit = None if limit is None else offset + limit
+        iterators = [shard.list_summaries(limit=shard_limit, after=after, page_size=page_size, **filters)
+                     for shard in self.shards]
+        merged = self._merged(iterators, page_size, key=lambda summary: summary["agent_id"])
+        stop = None if limit is None else offset + limit
+        yield from itertools.islice(merged, offset, stop)
+
+    def iter_cores(self, batch_size: int = 500, decode: bool = True, **kwargs):
+        """Stream (agent_id, core, metadata) tuples ordered by agent_id across all shards."""
+        iterators = [shard.iter_cores(batch_size=batch_size, decode=decode, **kwargs) for shard in self.shards]
+        yield from self._merged(iterators, batch_size, key=lambda row: row[0])
+
+    def iter_batches(self, batch_size: int = 500, decode: bool = True, **kwargs):
+        """Stream agent cores in batches ordered by agent_id across all shards. See agentMatrix.iter_batches."""
+        cores = self.iter_cores(batch_size=batch_size, decode=decode, **kwargs)
+        while True:
+            batch = list(itertools.islice(cores, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def import_from(self, source_path: str, **kwargs) -> Dict[str, Any]:
+        """Import another matrix file into every shard concurrently. See agentMatrix.import_from.
+
+        Each shard copies only its own agent_ids, in its own transaction.
+        """
+        # An older source is migrated once in a temporary copy shared by every shard
+        with agentMatrix.current_schema_source(source_path) as path, self._lock.shared():
+            count = len(self.shards)
+            parts = list(self._executor.map(
+                lambda index: self.shards[index].import_from(path, shard=(index, count), **kwargs),
+                range(count)))
+        totals = {key: sum(part[key] for part in parts)
+                  for key in ("source", "invalid", "inserted", "updated", "skipped")}
+        for key in ("invalid_ids", "written_ids"):
+            if key in parts[0]:
+                totals[key] = sorted(agent_id for part in parts for agent_id in part[key])
+        return totals
+
+    def vacuum_sections(self) -> int:
+        with self._lock.shared():
+            return sum(self._map(lambda shard: shard.vacuum_sections()))
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """Totals of agentMatrix.storage_stats over every shard, plus the per-shard core counts."""
+        stats = self._map(lambda shard: shard.storage_stats())
+        codecs = {}
+        for shard_stats in stats:
+            for codec, count in shard_stats["codecs"].items():
+                codecs[codec] = codecs.get(codec, 0) + count
+        totals = {key: sum(s[key] for s in stats) for key in ("cores", "core_bytes", "sections", "section_bytes")}
+        totals["codecs"] = codecs
+        totals["shards"] = [s["cores"] for s in stats]
+        return totals
+
+    def rebalance(self, shards: int) -> None:
+        """Move every core into a new set of shards files and delete the old ones.
+
+        Rows are copied with INSERT ... SELECT from the attached old shards, keeping
+        stored encodings, content-addressed sections and the full version history.
+        New shards are filled under temporary names and renamed into place once all
+        of them are complete; the manifest is switched after the renames and the
+        old files are deleted last. An interrupted rebalance therefore leaves the
+        old shard set committed and intact.
+
+        Writes, gets and imports running on other threads are waited for, and new
+        ones wait until the new shards are open. Iterators from list_summaries,
+        iter_cores and iter_batches are not covered: finish them before rebalancing.
+        """
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        with self._lock.exclusive():
+            old_count = len(self.shards)
+            if shards == old_count:
+                return
+            new_paths = [self.shard_path(i, shards) for i in range(shards)]
+            pending_paths = [f"{path}{_PENDING_SUFFIX}" for path in new_paths]
+            for path in new_paths + pending_paths:
+                _remove_database(path)
+            try:
+                for path in pending_paths:
+                    agentMatrix(path, **self.matrix_kwargs).close()
+                old_paths = [shard.db_path for shard in self.shards]
+                list(self._executor.map(lambda i: self._fill_shard(pending_paths[i], i, shards, old_paths),
+                                        range(shards)))
+                for pending, path in zip(pending_paths, new_paths):
+                    os.replace(pending, path)
+            except BaseException:
+                for path in pending_paths:
+                    _remove_database(path)
+                raise
+            self._write_manifest(shards)
+            for shard in self.shards:
+                shard.close()
+            for path in old_paths:
+                _remove_database(path)
+            if self._workers is None and shards > self._max_workers:
+                self._executor.shutdown(wait=True)
+                self._max_workers = shards
+                self._executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="agentShard")
+            self.shards = self._open_shards(shards)
+
+    def _fill_shard(self, path: str, index: int, shards: int, sources: List[str]) -> None:
+        """Copy the rows belonging to shard index of shards from every source file into path."""
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            conn.create_function("shard_of", 2, shard_of, deterministic=True)
+            core_columns = ", ".join(row[1] for row in conn.execute("PRAGMA table_info(agent_cores)"))
+            history_columns = ", ".join(
+                row[1] for row in conn.execute("PRAGMA table_info(agent_core_versions)") if row[1] != "id")
+            # The copied history already holds every version, so the triggers must not add more
+            conn.execute("BEGIN IMMEDIATE")
+            agentMatrix._drop_history_triggers(conn)
+            conn.execute("COMMIT")
+            for source in sources:
+                conn.execute("ATTACH DATABASE ? AS source", (source,))
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute("INSERT OR IGNORE INTO core_sections SELECT hash, data FROM source.core_sections")
+                    conn.execute(f"""
+                        INSERT INTO agent_core_versions ({history_columns})
+                        SELECT {history_columns} FROM source.agent_core_versions
+                        WHERE shard_of(agent_id, ?) = ? ORDER BY id
+                    """, (shards, index))
+                    conn.execute(f"""
+                        INSERT INTO agent_cores ({core_columns})
+                        SELECT {core_columns} FROM source.agent_cores
+                        WHERE shard_of(agent_id, ?) = ?
+                    """, (shards, index))
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                finally:
+                    conn.execute("DETACH DATABASE source")
+            conn.execute("BEGIN IMMEDIATE")
+            agentMatrix._create_history_triggers(conn)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+def _remove_database(path: str) -> None:
+    """Delete a SQLite file and its WAL sidecars if present."""
+    for stale in (path, f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
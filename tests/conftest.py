@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def make_core(agent_id, **fields):
+    core = {"agent_id": agent_id, "uid": None, "version": None,
+            "models": {"large_language_model": "llama3"},
+            "prompts": {"user_input_prompt": f"You are {agent_id}."}}
+    core.update(fields)
+    return {"agentCore": core}
+
+
+@pytest.fixture
+def make_docs():
+    """Build (documents, ids) for agent_ids agent_000 .. agent_{n-1}."""
+    def build(n, prefix="agent"):
+        ids = [f"{prefix}_{i:03d}" for i in range(n)]
+        return [json.dumps(make_core(agent_id)) for agent_id in ids], ids
+    return build
+
+
+@pytest.fixture
+def cores(tmp_path):
+    """An agentCores store in a fresh directory."""
+    from agentCores import agentCores
+    (tmp_path / "system").mkdir()
+    instance = agentCores(db_path=str(tmp_path / "system" / "agent_matrix.db"), cache_size=64)
+    yield instance
+    instance.close()
@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from agentCores import agentCores, ShardedAgentMatrix
+from conftest import make_core
+
+
+def new_cores(root, **kwargs):
+    (root / "system").mkdir(parents=True)
+    return agentCores(db_path=str(root / "system" / "agent_matrix.db"), **kwargs)
+
+
+def store(cores, versions, turns):
+    """Store one core per agent at the given version and write turns to its conversation."""
+    ids = list(versions)
+    documents = [json.dumps(make_core(agent_id, uid=f"{agent_id}-v{version}", version=version))
+                 for agent_id, version in versions.items()]
+    cores.agent_library.bulk_upsert(documents, ids)
+    for agent_id in ids:
+        conversation = cores.getConversationStore(agent_id)
+        for turn in turns:
+            conversation.append("s1", "user", f"{turn} {agent_id}")
+        conversation.flush()
+
+
+def contents(cores, agent_id):
+    return [turn["content"] for turn in cores.getConversationStore(agent_id).last_turns("s1", 100)]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    source = new_cores(tmp_path / "source")
+    store(source, {"agent_a": 2, "agent_b": 1, "agent_c": 1}, ["exported"])
+    path = str(tmp_path / "fleet.jsonl.gz")
+    assert source.exportAll(path, include_databases=True, db_types=["conversation"]) == \
+        {"agents": 3, "databases": 3}
+    source.close()
+    return path
+
+
+def test_round_trip(tmp_path, archive):
+    target = new_cores(tmp_path / "target")
+    counts = target.importArchive(archive)
+    assert (counts["inserted"], counts["databases"]) == (3, 3)
+    assert contents(target, "agent_b") == ["exported agent_b"]
+    linked = target.loadAgentCore("agent_b")["agentCore"]["databases"]["conversation"]
+    assert linked == target.get_agent_db_paths("agent_b")["conversation"]
+    target.close()
+
+
+def test_round_trip_into_sharded_store(tmp_path, archive):
+    (tmp_path / "sharded" / "system").mkdir(parents=True)
+    db_path = str(tmp_path / "sharded" / "system" / "agent_matrix.db")
+    target = agentCores(db_path=db_path, matrix=ShardedAgentMatrix(db_path, shards=3))
+    assert target.importArchive(archive)["databases"] == 3
+    assert contents(target, "agent_c") == ["exported agent_c"]
+    target.close()
+
+
+def test_newer_restores_databases_of_updated_agents_only(tmp_path, archive):
+    target = new_cores(tmp_path / "target")
+    store(target, {"agent_a": 1, "agent_b": 3}, ["local"])
+    counts = target.importArchive(archive, on_conflict="newer")
+    assert (counts["inserted"], counts["updated"], counts["skipped"]) == (1, 1, 1)
+    assert counts["databases"] == 2
+    assert target.loadAgentCore("agent_a")["agentCore"]["version"] == 2
+    assert contents(target, "agent_a") == ["exported agent_a"]
+    assert target.loadAgentCore("agent_b")["agentCore"]["version"] == 3
+    assert contents(target, "agent_b") == ["local agent_b"]
+    assert not any(name.endswith(".restoring")
+                   for _, _, files in os.walk(tmp_path / "target") for name in files)
+    target.close()
+
+
+def test_truncated_archive_changes_nothing(tmp_path, archive):
+    lines = gzip.open(archive).read().splitlines(True)
+    truncated = str(tmp_path / "truncated.jsonl.gz")
+    with gzip.open(truncated, "wb") as f:
+        f.writelines(lines[:-1])
+    target = new_cores(tmp_path / "target")
+    with pytest.raises(ValueError, match="truncated"):
+        target.importArchive(truncated)
+    assert target.loadAgentCore("agent_a") is None
+    target.close()
@@ -0,0 +1,251 @@
+import asyncio
+import sys
+import time
+import types
+
+import pytest
+
+from agentCores.agentBackends import llmBackend, microBatcher, stubBackend
+
+
+def ask(content):
+    return [{"role": "user", "content": content}]
+
+
+class recordingBackend(stubBackend):
+    """Stub that records each abatch call and how many ran at once."""
+    def __init__(self, delay=0.0):
+        super().__init__(tokens=4)
+        self.delay = delay
+        self.batches = []
+        self.running = 0
+        self.max_running = 0
+
+    async def abatch(self, model, batch):
+        self.batches.append(batch)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return await super().abatch(model, batch)
+
+
+async def reply(backend, model, messages):
+    return "".join([chunk async for chunk in backend.astream(model, messages)])
+
+
+def test_batcher_matches_backend_and_dedups_identical_requests():
+    stub = recordingBackend()
+    batcher = microBatcher(stub, window=0.01)
+
+    async def run():
+        return await asyncio.gather(*(reply(batcher, "m", ask(text)) for text in ("a", "b", "a")))
+
+    replies = asyncio.run(run())
+    assert replies == ["".join(stub.stream("m", ask(text))) for text in ("a", "b", "a")]
+    assert stub.batches == [[ask("a"), ask("b")]]
+
+
+def test_full_batch_dispatches_without_waiting_for_window():
+    stub = recordingBackend()
+    batcher = microBatcher(stub, window=5.0, max_batch=2)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(reply(batcher, "m", ask("a")), reply(batcher, "m", ask("b"))), timeout=1.0)
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 1.0
+    assert stub.batches == [[ask("a"), ask("b")]]
+
+
+def test_window_collects_requests_per_model():
+    stub = recordingBackend()
+    batcher = microBatcher(stub, window=0.05)
+
+    async def run():
+        first = asyncio.ensure_future(reply(batcher, "m", ask("a")))
+        other_model = asyncio.ensure_future(reply(batcher, "n", ask("a")))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(reply(batcher, "m", ask("b")))
+        await asyncio.gather(first, other_model, second)
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started >= 0.05
+    assert sorted(map(len, stub.batches)) == [1, 2]
+
+
+def test_max_concurrent_caps_batches_in_flight():
+    stub = recordingBackend(delay=0.02)
+    batcher = microBatcher(stub, window=0.0, max_batch=1, max_concurrent=2)
+
+    async def run():
+        await asyncio.gather(*(reply(batcher, "m", ask(str(i))) for i in range(6)))
+
+    asyncio.run(run())
+    assert len(stub.batches) == 6
+    assert stub.max_running == 2
+
+
+def test_batcher_without_abatch_streams_each_request():
+    class echoBackend(llmBackend):
+        name = "echo"
+
+        def stream(self, model, messages):
+            yield from messages[-1]["content"].upper()
+
+    batcher = microBatcher(echoBackend(), window=0.01)
+
+    async def run():
+        return await asyncio.gather(reply(batcher, "m", ask("ab")), reply(batcher, "m", ask("cd")))
+
+    assert asyncio.run(run()) == ["AB", "CD"]
+
+
+def test_batch_failure_reaches_every_request():
+    class failingBackend(stubBackend):
+        async def abatch(self, model, batch):
+            raise RuntimeError("model crashed")
+
+    batcher = microBatcher(failingBackend(), window=0.01)
+
+    async def run():
+        return await asyncio.gather(reply(batcher, "m", ask("a")), reply(batcher, "m", ask("b")),
+                                    return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(run())] == [RuntimeError, RuntimeError]
+
+
+class fakeOllama:
+    """Stand-in for the ollama package whose chat calls follow a script.
+
+    Each script entry is the list of chunks for one call; an exception in the
+    list is raised at that point of the stream.
+    """
+    class ResponseError(Exception):
+        def __init__(self, error, status_code=-1):
+            super().__init__(error)
+            self.status_code = status_code
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.http_clients = []
+
+    def _next(self):
+        self.calls += 1
+        return self.script.pop(0)
+
+    def module(self):
+        fake = self
+
+        class httpClient:
+            def __init__(self):
+                self.closed = False
+                fake.http_clients.append(self)
+
+            def close(self):
+                self.closed = True
+
+            async def aclose(self):
+                self.closed = True
+
+        class Client:
+            def __init__(self, host=None, timeout=None):
+                self._client = httpClient()
+
+            def chat(self, model, messages, stream):
+                for item in fake._next():
+                    if isinstance(item, Exception):
+                        raise item
+                    yield {"message": {"content": item}}
+
+        class AsyncClient:
+            def __init__(self, host=None, timeout=None):
+                self._client = httpClient()
+
+            async def chat(self, model, messages, stream):
+                steps = fake._next()
+
+                async def chunks():
+                    for item in steps:
+                        if isinstance(item, Exception):
+                            raise item
+                        yield {"message": {"content": item}}
+                return chunks()
+
+        return types.SimpleNamespace(Client=Client, AsyncClient=AsyncClient, ResponseError=self.ResponseError)
+
+
+@pytest.fixture
+def ollama_with(monkeypatch):
+    """Build an ollamaBackend on top of a fakeOllama following script."""
+    def build(script):
+        from agentCores.agentBackends import ollamaBackend
+        fake = fakeOllama(script)
+        monkeypatch.setitem(sys.modules, "ollama", fake.module())
+        return ollamaBackend(retries=2, backoff=0.0), fake
+    return build
+
+
+def test_ollama_retries_before_first_chunk(ollama_with):
+    backend, fake = ollama_with([[fakeOllama.ResponseError("overloaded", 503)],
+                                 [ConnectionError("refused")],
+                                 ["a", "b"]])
+    assert "".join(backend.stream("llama3", ask("hi"))) == "ab"
+    assert fake.calls == 3
+
+
+def test_ollama_does_not_retry_after_first_chunk(ollama_with):
+    backend, fake = ollama_with([["a", ConnectionError("reset")], ["a", "b"]])
+    received = []
+    with pytest.raises(ConnectionError):
+        for chunk in backend.stream("llama3", ask("hi")):
+            received.append(chunk)
+    assert received == ["a"]
+    assert fake.calls == 1
+
+
+def test_ollama_does_not_retry_client_errors(ollama_with):
+    backend, fake = ollama_with([[fakeOllama.ResponseError("bad model", 404)], ["a"]])
+    with pytest.raises(fakeOllama.ResponseError):
+        list(backend.stream("llama3", ask("hi")))
+    assert fake.calls == 1
+
+
+def test_ollama_async_retry_rule(ollama_with):
+    backend, fake = ollama_with([[fakeOllama.ResponseError("overloaded", 503)], ["a", "b"],
+                                 ["a", ConnectionError("reset")]])
+
+    async def run():
+        assert await reply(backend, "llama3", ask("hi")) == "ab"
+        received = []
+        with pytest.raises(ConnectionError):
+            async for chunk in backend.astream("llama3", ask("hi")):
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(run()) == ["a"]
+    assert fake.calls == 3
+
+
+def test_ollama_async_client_closed_when_loop_changes(ollama_with):
+    backend, fake = ollama_with([["a"], ["b"], ["c"]])
+    first_loop = asyncio.new_event_loop()
+    try:
+        first_loop.run_until_complete(reply(backend, "llama3", ask("hi")))
+        asyncio.run(reply(backend, "llama3", ask("hi")))
+        # The replaced client is closed on the loop it belongs to
+        first_loop.run_until_complete(asyncio.sleep(0))
+        assert fake.http_clients[0].closed
+    finally:
+        first_loop.close()
+
+    async def run():
+        await reply(backend, "llama3", ask("hi"))
+        await backend.aclose()
+
+    asyncio.run(run())
+    assert fake.http_clients[-1].closed
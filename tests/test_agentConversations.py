@@ -0,0 +1,109 @@
+import sqlite3
+import time
+
+import pytest
+
+from agentCores.agentConversations import conversationStore
+
+
+def stored(path):
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT content FROM conversations ORDER BY id")]
+
+
+def rename_table(path, old, new):
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"ALTER TABLE {old} RENAME TO {new}")
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_flush_on_size(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    with conversationStore(path, flush_size=3, flush_interval=None) as store:
+        store.append("s1", "user", "a")
+        store.append("s1", "assistant", "b")
+        assert stored(path) == []
+        store.append("s1", "user", "c")
+        assert stored(path) == ["a", "b", "c"]
+
+
+def test_flush_on_interval(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    with conversationStore(path, flush_size=100, flush_interval=0.05) as store:
+        store.append("s1", "user", "a")
+        wait_for(lambda: stored(path) == ["a"])
+
+
+def test_failed_flush_keeps_turns_for_retry(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    with conversationStore(path, flush_size=100, flush_interval=None) as store:
+        store.append("s1", "user", "a")
+        store.append("s1", "assistant", "b")
+        rename_table(path, "conversations", "moved")
+        with pytest.raises(sqlite3.OperationalError):
+            store.flush()
+        store.append("s1", "user", "c")
+        rename_table(path, "moved", "conversations")
+        assert [turn["content"] for turn in store.turns_since("s1", include_pending=True)] == ["a", "b", "c"]
+        assert store.flush() == 3
+        assert stored(path) == ["a", "b", "c"]
+
+
+def test_background_flush_errors_are_recorded(tmp_path, capsys):
+    path = str(tmp_path / "conversations.db")
+    with conversationStore(path, flush_size=100, flush_interval=0.02) as store:
+        rename_table(path, "conversations", "moved")
+        store.append("s1", "user", "a")
+        wait_for(lambda: store.flush_errors > 0)
+        assert isinstance(store.last_flush_error, sqlite3.OperationalError)
+        assert "Background flush" in capsys.readouterr().out
+        rename_table(path, "moved", "conversations")
+        wait_for(lambda: stored(path) == ["a"])
+        assert store.last_flush_error is None
+
+
+def test_last_turns_spans_flushed_and_pending(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    with conversationStore(path, flush_size=100, flush_interval=None) as store:
+        for content in ("a", "b"):
+            store.append("s1", "user", content)
+        store.append("s2", "user", "other")
+        store.flush()
+        for content in ("c", "d"):
+            store.append("s1", "assistant", content, metadata={"n": content})
+        turns = store.last_turns("s1", n=3)
+        assert [turn["content"] for turn in turns] == ["b", "c", "d"]
+        assert turns[-1]["metadata"] == {"n": "d"}
+        assert store.sessions() == ["s1", "s2"]
+
+
+def test_turns_since_with_pending(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    with conversationStore(path, flush_size=100, flush_interval=None) as store:
+        store.append("s1", "user", "a")
+        store.append("s1", "assistant", "b")
+        store.flush()
+        store.append("s1", "user", "c")
+        store.append("s2", "user", "other")
+        first = store.turns_since("s1")[0]["id"]
+        assert [turn["content"] for turn in store.turns_since("s1", after_id=first)] == ["b"]
+        pending = store.turns_since("s1", after_id=first, include_pending=True)
+        assert [(turn["content"], turn["id"] is None) for turn in pending] == [("b", False), ("c", True)]
+        assert stored(path) == ["a", "b"]
+
+
+def test_close_flushes_pending_turns(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    store = conversationStore(path, flush_size=100, flush_interval=10)
+    store.append("s1", "user", "a")
+    store.close()
+    assert stored(path) == ["a"]
+    with pytest.raises(sqlite3.ProgrammingError):
+        store.append("s1", "user", "b")
+    store.close()
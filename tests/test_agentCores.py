@@ -0,0 +1,202 @@
+import asyncio
+import json
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from agentCores.agentBackends import stubBackend
+from agentCores.agentServer import agentServer
+
+
+def test_system_prompt_follows_stored_core(cores):
+    cores.mintAgent("writer")
+    agent = cores.loadAgentCore("writer")
+    window = cores.getContextWindow("writer", "s1")
+    assert window.system_prompt == cores.getSystemPrompt(agent)
+
+    agent["agentCore"]["prompts"]["agentPrompts"]["llmSystemPrompt"] = "Answer in French."
+    cores.storeAgentCore("writer", agent)
+    assert "Answer in French." in cores.getSystemPrompt(cores.loadAgentCore("writer"))
+    assert "Answer in French." in cores.getContextWindow("writer", "s1").system_prompt
+
+
+def test_link_database_invalidates_cached_core(cores, tmp_path):
+    cores.mintAgent("linked")
+    cores.loadAgentCore("linked")
+    cores.linkDatabase("linked", "notes", str(tmp_path / "notes.db"))
+    assert cores.loadAgentCore("linked")["agentCore"]["databases"]["notes"] == str(tmp_path / "notes.db")
+
+
+def test_server_session_picks_up_edited_prompt(cores):
+    cores.mintAgent("served", model_config={"large_language_model": "llama3"})
+
+    async def run():
+        server = agentServer(cores, backend=stubBackend())
+        async for _ in server.chat("served", "s1", "hi"):
+            pass
+        agent = cores.loadAgentCore("served")
+        agent["agentCore"]["prompts"]["agentPrompts"]["llmSystemPrompt"] = "Be terse."
+        cores.storeAgentCore("served", agent)
+        server.invalidateAgent("served")
+        async for _ in server.chat("served", "s1", "again"):
+            pass
+        prompt = server._sessions[("served", "s1")].context.system_prompt
+        await server.close()
+        return prompt
+
+    assert "Be terse." in asyncio.run(run())
+
+
+def test_import_loads_only_core_modules():
+    src = str(Path(__file__).resolve().parent.parent / "src")
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); import agentCores; "
+            "print(' '.join(sorted(m for m in sys.modules if m.startswith('agentCores.'))))")
+    loaded = subprocess.run([sys.executable, "-c", code, src], capture_output=True, text=True,
+                            check=True).stdout.split()
+    for lazy in ("agentConversations", "agentContext", "agentResponseCache", "agentKnowledge",
+                 "agentEmbeddings", "shardedAgentMatrix", "agentServer"):
+        assert f"agentCores.{lazy}" not in loaded
+
+
+def test_template_copies_are_independent(cores):
+    first = cores.getNewAgentCore()
+    first["agentCore"]["models"]["large_language_model"] = "changed"
+    assert cores.getNewAgentCore()["agentCore"]["models"]["large_language_model"] != "changed"
+
+
+def test_mint_agents_rejects_duplicate_ids(cores):
+    with pytest.raises(ValueError, match="dup"):
+        cores.mintAgents(["dup", "unique", {"agent_id": "dup"}])
+    assert cores.loadAgentCore("unique") is None
+    minted = cores.mintAgents(["one", "two"])
+    assert [core["agentCore"]["agent_id"] for core in minted] == ["one", "two"]
+
+
+def test_migrate_agent_cores_fills_uid_and_version(cores, make_docs):
+    documents, ids = make_docs(3)
+    cores.agent_library.upsert(documents=documents, ids=ids)
+    assert cores.migrateAgentCores() == 3
+    for agent_id in ids:
+        core = cores.loadAgentCore(agent_id)["agentCore"]
+        assert core["version"] == 1 and core["uid"]
+    assert cores.migrateAgentCores() == 0
+
+
+def test_core_cache_follows_store_and_delete(cores):
+    cores.mintAgent("cached")
+    first = cores.loadAgentCore("cached")
+    first["agentCore"]["version"] = 99
+    assert cores.loadAgentCore("cached")["agentCore"]["version"] != 99
+
+    first["agentCore"]["version"] = 7
+    cores.storeAgentCore("cached", first)
+    assert cores.loadAgentCore("cached")["agentCore"]["version"] == 7
+
+    cores.deleteAgentCore("cached")
+    assert cores.loadAgentCore("cached") is None
+
+
+def test_import_agent_cores_invalidates_cache(cores, tmp_path, make_docs):
+    from agentCores import agentMatrix
+    cores.mintAgent("agent_001")
+    cores.loadAgentCore("agent_001")
+
+    documents, ids = make_docs(5)
+    with agentMatrix(str(tmp_path / "other.db")) as other:
+        other.upsert(documents=documents, ids=ids)
+    counts = cores.importAgentCores(str(tmp_path / "other.db"), on_conflict="overwrite")
+    assert counts["inserted"] == 4 and counts["updated"] == 1
+    assert cores.loadAgentCore("agent_001")["agentCore"]["prompts"] == {"user_input_prompt": "You are agent_001."}
+
+
+def test_import_agent_cores_missing_source(cores, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        cores.importAgentCores(str(tmp_path / "missing.db"))
+    with pytest.raises(ValueError):
+        cores.importAgentCores(str(tmp_path / "missing.db"), on_conflict="merge")
+
+
+@pytest.fixture
+def listed(cores):
+    for i in range(10):
+        model = "llama3" if i % 2 else "phi3"
+        core = {"agentCore": {"agent_id": f"agent_{i:02d}", "uid": f"uid{i}", "version": 1,
+                              "models": {"large_language_model": model}}}
+        cores.agent_library.upsert(documents=[json.dumps(core)], ids=[f"agent_{i:02d}"],
+                                   metadatas=[{"save_date": f"2024-12-{i + 1:02d}"}])
+    return cores
+
+
+def test_list_agent_cores_returns_list(listed):
+    agents = listed.listAgentCores()
+    assert isinstance(agents, list) and len(agents) == 10
+    assert agents[0] == {"agent_id": "agent_00", "uid": "uid0", "version": 1,
+                         "model": "phi3", "save_date": "2024-12-01"}
+    assert list(listed.iterAgentCores()) == agents
+
+
+def test_list_agent_cores_paging(listed):
+    ids = lambda agents: [agent["agent_id"] for agent in agents]
+    assert ids(listed.listAgentCores(limit=3)) == ["agent_00", "agent_01", "agent_02"]
+    assert ids(listed.listAgentCores(limit=3, offset=8)) == ["agent_08", "agent_09"]
+    assert ids(listed.listAgentCores(after="agent_06", limit=2)) == ["agent_07", "agent_08"]
+    assert listed.listAgentCores(after="agent_09") == []
+
+
+def test_list_agent_cores_filters(listed):
+    ids = lambda agents: [agent["agent_id"] for agent in agents]
+    assert ids(listed.listAgentCores(model="llama3")) == ["agent_01", "agent_03", "agent_05", "agent_07", "agent_09"]
+    assert ids(listed.listAgentCores(saved_after="2024-12-04", saved_before="2024-12-06")) == \
+        ["agent_03", "agent_04", "agent_05"]
+    assert ids(listed.listAgentCores(model="phi3", saved_after="2024-12-05", limit=2)) == ["agent_04", "agent_06"]
+
+
+def test_provisioning_creates_current_databases(cores):
+    provisioned = cores.provisionAgentDatabases([f"p{i}" for i in range(6)], workers=4)
+    assert sorted(provisioned) == [f"p{i}" for i in range(6)]
+    for paths in provisioned.values():
+        for path in paths.values():
+            with sqlite3.connect(path) as conn:
+                assert conn.execute("PRAGMA user_version").fetchone()[0] == cores.AGENT_DB_SCHEMA_VERSION
+
+
+@pytest.mark.parametrize("use_template", [True, False])
+def test_reprovisioning_keeps_existing_rows(cores, use_template):
+    paths = cores.provisionAgentDatabases(["kept", "other"], use_template=use_template)["kept"]
+    with sqlite3.connect(paths["conversation"]) as conn:
+        conn.execute("INSERT INTO conversations (role, content, session_id) VALUES ('user', 'hello', 's1')")
+    cores.provisionAgentDatabases(["kept", "other"], use_template=use_template)
+    cores.create_agent_databases("kept", use_template=use_template)
+    with sqlite3.connect(paths["conversation"]) as conn:
+        assert conn.execute("SELECT content FROM conversations").fetchall() == [("hello",)]
+
+
+def test_provisioning_upgrades_older_databases(cores):
+    paths = cores.get_agent_db_paths("legacy")
+    Path(paths["conversation"]).parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(paths["conversation"]) as conn:
+        conn.execute("CREATE TABLE conversations (id INTEGER PRIMARY KEY, timestamp TEXT, role TEXT, "
+                     "content TEXT, session_id TEXT, metadata TEXT)")
+        conn.execute("INSERT INTO conversations (role, content, session_id) VALUES ('user', 'old', 's1')")
+        conn.execute("PRAGMA user_version = 1")
+    cores.provisionAgentDatabases(["legacy"])
+    with sqlite3.connect(paths["conversation"]) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == cores.AGENT_DB_SCHEMA_VERSION
+        assert conn.execute("SELECT content FROM conversations").fetchall() == [("old",)]
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(conversations)")]
+        assert "idx_conversations_session_time" in indexes
+
+
+def test_chats_without_session_id_get_separate_histories(cores, monkeypatch):
+    cores.mintAgent("chatty", model_config={"large_language_model": "stub:echo"})
+    replies = iter(["first chat", "exit", "second chat", "exit"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+    cores.chat_with_agent("chatty")
+    cores.chat_with_agent("chatty")
+    store = cores.getConversationStore("chatty")
+    sessions = store.sessions()
+    assert len(sessions) == 2
+    assert sorted(store.last_turns(session)[0]["content"] for session in sessions) == ["first chat", "second chat"]
@@ -0,0 +1,64 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from agentCores.agentEmbeddings import embeddingStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    instance = embeddingStore(str(tmp_path / "embeddings.db"), dim=4)
+    instance.add(np.eye(4), texts=["x", "y", "z", "w"])
+    yield instance
+    instance.close()
+
+
+def other_connection(store):
+    return sqlite3.connect(store.db_path, isolation_level=None)
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_external_delete_is_masked(store, indexed):
+    if indexed:
+        store.build_index(nlist=2, nprobe=2)
+    conn = other_connection(store)
+    conn.execute("DELETE FROM embeddings WHERE text = 'x'")
+    conn.close()
+    hits = store.search([1, 0, 0, 0], k=4)
+    assert "x" not in [hit["text"] for hit in hits]
+    assert len(store) == 3
+
+
+def test_external_replace_refreshes_vector(store):
+    conn = other_connection(store)
+    vector = np.array([0, 0, 0, 1], dtype=np.float32).tobytes()
+    conn.execute("INSERT OR REPLACE INTO embeddings (id, text, embedding) VALUES (1, 'x2', ?)", (vector,))
+    conn.close()
+    hits = store.search([0, 0, 0, 1], k=2)
+    assert sorted(hit["text"] for hit in hits) == ["w", "x2"]
+    assert store.search([1, 0, 0, 0], k=1)[0]["score"] < 0.5
+
+
+def test_null_and_malformed_blobs_are_skipped(store):
+    conn = other_connection(store)
+    conn.execute("INSERT INTO embeddings (text, embedding) VALUES ('null', NULL)")
+    conn.execute("INSERT INTO embeddings (text, embedding) VALUES ('short', x'00')")
+    conn.execute("UPDATE embeddings SET embedding = NULL WHERE text = 'y'")
+    conn.close()
+    hits = store.search([0, 1, 0, 0], k=10)
+    assert sorted(hit["text"] for hit in hits) == ["w", "x", "z"]
+    store.add([[0, 1, 0, 0]], texts=["y2"])
+    assert store.search([0, 1, 0, 0], k=1)[0]["text"] == "y2"
+
+
+def test_changes_survive_reopen(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    with embeddingStore(path, dim=4) as store:
+        store.add(np.eye(4), texts=["x", "y", "z", "w"])
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("DELETE FROM embeddings WHERE text = 'z'")
+    conn.close()
+    with embeddingStore(path) as store:
+        assert len(store) == 3
+        assert "z" not in [hit["text"] for hit in store.search([0, 0, 1, 0], k=4)]
@@ -0,0 +1,47 @@
+from agentCores.agentKnowledge import federated_search, knowledgeStore
+
+
+def test_federated_search_skips_failing_store(cores):
+    cores.mintAgent("healthy")
+    cores.mintAgent("corrupt")
+    cores.ingestKnowledge("healthy", [{"topic": "sqlite", "content": "the write ahead log"}])
+    with open(cores.get_agent_db_paths("corrupt")["knowledge"], "wb") as f:
+        f.write(b"this is not a sqlite database" * 100)
+
+    errors = {}
+    hits = cores.federatedSearch("write ahead log", agent_ids=["healthy", "corrupt"],
+                                 include_global=False, errors=errors)
+    assert [hit["store"] for hit in hits] == ["healthy"]
+    assert list(errors) == ["corrupt"]
+
+
+def test_federated_search_merges_top_k(tmp_path):
+    stores = {}
+    for name in ("a", "b"):
+        stores[name] = knowledgeStore(str(tmp_path / f"{name}.db"))
+        stores[name].ingest([{"topic": "vectors", "content": f"{name} memory mapped vectors {i}"}
+                             for i in range(5)])
+
+    def failing():
+        raise RuntimeError("database is locked")
+
+    sources = {name: (lambda store=store: store) for name, store in stores.items()}
+    sources["locked"] = failing
+    errors = {}
+    hits = federated_search(sources, "memory mapped", k=4, errors=errors)
+    assert len(hits) == 4
+    assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
+    assert isinstance(errors["locked"], RuntimeError)
+    for store in stores.values():
+        store.close()
+
+
+def test_agent_named_global_keeps_its_own_store(cores):
+    cores.mintAgent("global")
+    cores.ingestKnowledge("global", [{"topic": "notes", "content": "agent private write ahead log"}])
+    cores.getGlobalKnowledgeStore().ingest([{"topic": "notes", "content": "shared write ahead log"}])
+    assert cores.getGlobalKnowledgeStore() is not cores.getKnowledgeStore("global")
+
+    hits = cores.federatedSearch("write ahead log", agent_ids=["global"])
+    assert {hit["store"] for hit in hits} == {"global", cores.GLOBAL_KNOWLEDGE}
+    assert cores.getGlobalKnowledgeStore().db_path == cores.db_paths["shared"]["global_knowledge"]
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agentCores import agentMatrix, ShardedAgentMatrix
+from conftest import make_core
+
+
+def legacy_matrix(path, n=10):
+    """An agent_matrix.db as written before schema versioning: no uid/version, user_version 0."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE agent_cores (agent_id TEXT PRIMARY KEY, core_data TEXT, save_date TEXT)")
+    conn.executemany("INSERT INTO agent_cores VALUES (?, ?, ?)",
+                     [(f"legacy_{i:03d}", json.dumps(make_core(f"legacy_{i:03d}")), "2024-12-01")
+                      for i in range(n)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def checksum(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_migrate_legacy_matrix(tmp_path):
+    path = legacy_matrix(str(tmp_path / "legacy.db"))
+    with agentMatrix(path) as matrix:
+        assert matrix.schema_version() == agentMatrix.SCHEMA_VERSION
+        result = matrix.get(ids=["legacy_003"])
+        assert result["ids"] == ["legacy_003"]
+        assert json.loads(result["documents"][0])["agentCore"]["agent_id"] == "legacy_003"
+        assert len(list(matrix.iter_cores())) == 10
+
+
+def test_import_policies(tmp_path, make_docs):
+    documents, ids = make_docs(10)
+    source_path = str(tmp_path / "source.db")
+    with agentMatrix(source_path) as source:
+        source.bulk_upsert(documents, ids, [{"save_date": "2024-12-10"}] * 10)
+    edited = [json.dumps(make_core(agent_id, models={"large_language_model": "mistral"})) for agent_id in ids[:5]]
+    with agentMatrix(str(tmp_path / "target.db")) as target:
+        target.bulk_upsert(edited, ids[:5], [{"save_date": "2024-12-11"}] * 5)
+        counts = target.import_from(source_path, on_conflict="skip")
+        assert (counts["inserted"], counts["updated"], counts["skipped"]) == (5, 0, 5)
+        assert json.loads(target.get(ids=["agent_000"])["documents"][0]) == json.loads(edited[0])
+        counts = target.import_from(source_path, on_conflict="newer")
+        assert (counts["inserted"], counts["updated"]) == (0, 0)
+        counts = target.import_from(source_path, on_conflict="overwrite")
+        assert counts["updated"] == 10
+        assert json.loads(target.get(ids=["agent_000"])["documents"][0]) == json.loads(documents[0])
+
+
+def test_import_rejects_invalid_json(tmp_path, make_docs):
+    documents, ids = make_docs(3)
+    source_path = str(tmp_path / "source.db")
+    with agentMatrix(source_path) as source:
+        source.bulk_upsert(documents[:2] + ["{not json"], ids)
+    with agentMatrix(str(tmp_path / "target.db")) as target:
+        counts = target.import_from(source_path)
+        assert counts["invalid_ids"] == [ids[2]]
+        assert counts["inserted"] == 2
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_import_leaves_legacy_source_untouched(tmp_path, sharded):
+    source_path = legacy_matrix(str(tmp_path / "legacy.db"))
+    before = checksum(source_path)
+    target_path = str(tmp_path / "target.db")
+    target = ShardedAgentMatrix(target_path, shards=3) if sharded else agentMatrix(target_path)
+    with target:
+        counts = target.import_from(source_path)
+        assert counts["inserted"] == 10
+        assert sorted(target.get()["ids"]) == [f"legacy_{i:03d}" for i in range(10)]
+    assert checksum(source_path) == before
+    conn = sqlite3.connect(source_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    conn.close()
+
+
+def test_import_missing_source(tmp_path):
+    with agentMatrix(str(tmp_path / "target.db")) as target:
+        with pytest.raises(FileNotFoundError):
+            target.import_from(str(tmp_path / "missing.db"))
+
+
+def test_import_leaves_current_source_untouched(tmp_path, make_docs):
+    documents, ids = make_docs(5)
+    source_path = str(tmp_path / "source.db")
+    with agentMatrix(source_path) as source:
+        source.bulk_upsert(documents, ids)
+    before = checksum(source_path)
+    with agentMatrix(str(tmp_path / "target.db")) as target:
+        assert target.import_from(source_path)["inserted"] == 5
+    assert checksum(source_path) == before
+
+
+def test_dedup_stores_shared_sections_once(tmp_path, make_docs):
+    documents, ids = make_docs(20)
+    path = str(tmp_path / "agents.db")
+    with agentMatrix(path, dedup=True) as matrix:
+        matrix.upsert(documents=documents, ids=ids)
+    with sqlite3.connect(path) as conn:
+        # models is identical across all cores, prompts differ per agent
+        assert conn.execute("SELECT COUNT(*) FROM core_sections").fetchone()[0] == 21
+
+
+@pytest.mark.parametrize("codec", ["json", "zlib"])
+@pytest.mark.parametrize("dedup", [False, True])
+def test_codec_and_dedup_round_trip(tmp_path, make_docs, codec, dedup):
+    documents, ids = make_docs(6)
+    with agentMatrix(str(tmp_path / "agents.db"), codec=codec, dedup=dedup) as matrix:
+        matrix.upsert(documents=documents, ids=ids)
+        result = matrix.get(ids=ids)
+    assert result["ids"] == ids
+    assert [json.loads(doc) for doc in result["documents"]] == [json.loads(doc) for doc in documents]
+
+
+def test_sharded_migrate_legacy_shards(tmp_path):
+    with ShardedAgentMatrix(str(tmp_path / "agents.db"), shards=2) as sharded:
+        paths = [shard.db_path for shard in sharded.shards]
+    for path in paths:
+        os.remove(path)
+        legacy_matrix(path, n=3)
+    with ShardedAgentMatrix(str(tmp_path / "agents.db"), shards=2) as sharded:
+        sharded.migrate()
+        assert all(shard.schema_version() == agentMatrix.SCHEMA_VERSION for shard in sharded.shards)
+        # Schema is current, the cores themselves still lack uid and version
+        assert sharded.has_unversioned()
+        assert len(list(sharded.iter_cores())) == 6
+
+
+def test_iter_batches_reads_sections_on_page_connection(tmp_path, make_docs, monkeypatch):
+    documents, ids = make_docs(20)
+    path = str(tmp_path / "agents.db")
+    with agentMatrix(path, dedup=True) as matrix:
+        matrix.upsert(documents=documents, ids=ids)
+
+    connect = sqlite3.connect
+    opened = []
+    monkeypatch.setattr(sqlite3, "connect", lambda *args, **kwargs: opened.append(args) or connect(*args, **kwargs))
+    # A one-entry section cache misses on nearly every row
+    with agentMatrix(path, dedup=True, section_cache_size=1) as matrix:
+        opened.clear()
+        batches = list(matrix.iter_batches(batch_size=10))
+    assert [row[0] for batch in batches for row in batch] == ids
+    assert [row[1] for batch in batches for row in batch] == [json.loads(doc) for doc in documents]
+    # One connection per page (the last one finds no more rows), none per row
+    assert len(opened) == 3
+
+
+def test_pool_applies_pragmas_to_every_connection(tmp_path):
+    with agentMatrix(str(tmp_path / "agents.db"), pool_size=2, pragmas={"cache_size": -4000}) as matrix:
+        with matrix._connection() as first, matrix._connection() as second:
+            assert first is not second
+            for conn in (first, second):
+                assert conn.execute("PRAGMA cache_size").fetchone()[0] == -4000
+                assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+                assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+
+
+def test_pool_reuses_connections_across_threads(tmp_path, make_docs):
+    documents, ids = make_docs(200)
+    with agentMatrix(str(tmp_path / "agents.db"), pool_size=4) as matrix:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: matrix.bulk_upsert(documents[i:i + 25], ids[i:i + 25]), range(0, 200, 25)))
+            list(pool.map(lambda agent_id: matrix.get(ids=[agent_id]), ids))
+        assert len(matrix._connections) <= 4
+        assert sorted(matrix.get()["ids"]) == ids
+
+
+def test_closed_pool_refuses_work(tmp_path, make_docs):
+    documents, ids = make_docs(3)
+    with agentMatrix(str(tmp_path / "agents.db"), pool_size=2) as matrix:
+        matrix.upsert(documents=documents, ids=ids)
+    with pytest.raises(sqlite3.ProgrammingError):
+        matrix.get(ids=ids)
+    matrix.close()
+    with agentMatrix(str(tmp_path / "agents.db"), pool_size=2) as reopened:
+        assert sorted(reopened.get()["ids"]) == ids
+
+
+@pytest.mark.parametrize("pool_size", [0, 2])
+def test_bulk_upsert_rolls_back_when_a_later_chunk_fails(tmp_path, make_docs, pool_size):
+    documents, ids = make_docs(12)
+    # Not a bindable value, so executemany fails on the second chunk
+    documents[7] = object()
+    with agentMatrix(str(tmp_path / "agents.db"), pool_size=pool_size) as matrix:
+        with pytest.raises(sqlite3.Error):
+            matrix.bulk_upsert(documents, ids, chunk_size=5)
+        assert matrix.get()["ids"] == []
+        documents[7] = json.dumps(make_core(ids[7]))
+        assert matrix.bulk_upsert(documents, ids, chunk_size=5) == 12
+        assert sorted(matrix.get()["ids"]) == ids
+
+
+def test_bulk_upsert_rolls_back_when_input_fails(tmp_path, make_docs):
+    documents, ids = make_docs(12)
+
+    def failing_ids():
+        yield from ids[:8]
+        raise ValueError("id source failed")
+
+    with agentMatrix(str(tmp_path / "agents.db")) as matrix:
+        with pytest.raises(ValueError):
+            matrix.bulk_upsert(documents, failing_ids(), chunk_size=5)
+        assert matrix.get()["ids"] == []
+
+
+def test_bulk_upsert_validates_chunk_size(tmp_path, make_docs):
+    documents, ids = make_docs(3)
+    with agentMatrix(str(tmp_path / "agents.db")) as matrix:
+        with pytest.raises(ValueError):
+            matrix.bulk_upsert(documents, ids, chunk_size=0)
+        assert matrix.get()["ids"] == []
+        assert matrix.bulk_upsert(documents, ids, chunk_size=1) == 3
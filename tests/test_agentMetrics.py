@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from agentCores.agentMetrics import metrics, metricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return metricsRegistry(enabled=True)
+
+
+@pytest.fixture
+def global_metrics():
+    """The process-wide registry, restored to disabled and empty afterwards."""
+    enabled = metrics.enabled
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+    metrics.enabled = enabled
+
+
+def test_histogram_quantiles_interpolate_within_buckets(registry):
+    registry.set_buckets("job_seconds", (1, 2, 5, 10))
+    for value in range(1, 11):
+        registry.observe("job_seconds", value)
+    entry = registry.snapshot()["histograms"]["job_seconds"][0]
+    assert (entry["count"], entry["sum"], entry["mean"]) == (10, 55, 5.5)
+    assert (entry["min"], entry["max"]) == (1, 10)
+    assert entry["p50"] == pytest.approx(5.0)
+    assert entry["p90"] == pytest.approx(9.0)
+    assert entry["p99"] == pytest.approx(9.9)
+
+
+def test_quantiles_stay_within_observed_range(registry):
+    registry.set_buckets("rate", (1, 2))
+    for value in (50, 60, 70):
+        registry.observe("rate", value)
+    entry = registry.snapshot()["histograms"]["rate"][0]
+    assert 50 <= entry["p50"] <= entry["p99"] <= 70
+
+
+def test_labels_make_separate_series(registry):
+    registry.inc("hits_total", result="hit")
+    registry.inc("hits_total", 2, result="hit")
+    registry.inc("hits_total", result="miss")
+    values = {entry["labels"]["result"]: entry["value"]
+              for entry in registry.snapshot()["counters"]["hits_total"]}
+    assert values == {"hit": 3, "miss": 1}
+
+
+def test_prometheus_output(registry):
+    registry.set_buckets("op_seconds", (0.1, 1.0))
+    registry.observe("op_seconds", 0.05, op="get")
+    registry.observe("op_seconds", 0.5, op="get")
+    registry.observe("op_seconds", 3.0, op="get")
+    registry.inc("rows_total", 7, path='a"b\\c')
+    lines = registry.to_prometheus().splitlines()
+    assert lines[:2] == ["# TYPE rows_total counter", 'rows_total{path="a\\"b\\\\c"} 7']
+    assert lines[2:] == [
+        "# TYPE op_seconds histogram",
+        'op_seconds_bucket{op="get",le="0.1"} 1',
+        'op_seconds_bucket{op="get",le="1.0"} 2',
+        'op_seconds_bucket{op="get",le="+Inf"} 3',
+        'op_seconds_sum{op="get"} 3.55',
+        'op_seconds_count{op="get"} 3',
+    ]
+
+
+def test_json_output(registry):
+    with registry.timer("block_seconds", job="test"):
+        pass
+    data = json.loads(registry.to_json())
+    assert data["enabled"] is True
+    entry = data["histograms"]["block_seconds"][0]
+    assert entry["labels"] == {"job": "test"} and entry["count"] == 1
+
+
+def test_disabled_registry_is_a_no_op():
+    registry = metricsRegistry(enabled=False)
+
+    @registry.timed("call_seconds")
+    def call(value):
+        return value * 2
+
+    assert call(21) == 42
+    registry.inc("count_total")
+    registry.observe("value", 1.0)
+    with registry.timer("block_seconds"):
+        pass
+    turn = registry.chat_turn("llama3")
+    turn.token()
+    turn.finish()
+    assert registry.timer("a") is registry.timer("b")
+    assert registry.snapshot() == {"enabled": False, "counters": {}, "histograms": {}}
+    assert registry.to_prometheus() == "\n"
+
+
+def test_timed_and_chat_turn_record_when_enabled(registry):
+    @registry.timed("call_seconds", op="double")
+    def call(value):
+        return value * 2
+
+    assert call(2) == 4
+    turn = registry.chat_turn("llama3")
+    for _ in range(3):
+        turn.token()
+    turn.finish()
+    snapshot = registry.snapshot()
+    assert snapshot["histograms"]["call_seconds"][0]["labels"] == {"op": "double"}
+    assert snapshot["counters"]["agentcores_chat_tokens_total"][0]["value"] == 3
+    for name in ("agentcores_chat_turn_seconds", "agentcores_chat_ttft_seconds"):
+        assert snapshot["histograms"][name][0]["count"] == 1
+
+
+def test_stats_command(cores, global_metrics, monkeypatch, capsys):
+    commands = iter(["/stats off", "/stats", "/stats on", "/agentCores", "/stats", "/stats prometheus",
+                     "/stats json", "/stats reset", "/stats", "/stats bogus", "/exit"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(commands))
+    cores.mintAgent("stats_agent")
+    cores.commandInterface()
+    out = capsys.readouterr().out
+    assert "Metrics are disabled." in out
+    assert "Metrics enabled." in out
+    assert "agentcores_matrix_seconds{op=page}: n=1" in out
+    assert '# TYPE agentcores_matrix_seconds histogram' in out
+    assert '"histograms"' in out
+    assert "Metrics reset." in out and "No metrics recorded yet." in out
+    assert "Usage: /stats [on|off|reset|json|prometheus]" in out
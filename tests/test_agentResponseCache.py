@@ -0,0 +1,38 @@
+import time
+
+from agentCores.agentResponseCache import responseCache
+
+
+def test_stream_caches_completed_reply(tmp_path):
+    calls = []
+
+    def produce():
+        calls.append(1)
+        yield from ["Hel", "lo"]
+
+    messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "hi"}]
+    with responseCache(str(tmp_path / "cache.db")) as cache:
+        key = cache.key("uid-1", "llama3", messages)
+        assert list(cache.stream(key, produce)) == ["Hel", "lo"]
+        assert list(cache.stream(key, produce)) == ["Hel", "lo"]
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+
+
+def test_key_changes_with_uid_and_system_prompt():
+    messages = [{"role": "system", "content": "A"}, {"role": "user", "content": "hi"}]
+    edited = [{"role": "system", "content": "B"}, {"role": "user", "content": "hi"}]
+    key = responseCache.key("uid-1", "llama3", messages)
+    assert key != responseCache.key("uid-2", "llama3", messages)
+    assert key != responseCache.key("uid-1", "llama3", edited)
+
+
+def test_ttl_and_entry_limit(tmp_path):
+    with responseCache(str(tmp_path / "cache.db"), ttl=0.05, max_entries=2) as cache:
+        for key in ("a", "b", "c"):
+            cache.put(key, [key])
+        assert cache.stats()["entries"] == 2
+        assert cache.get("a") is None
+        time.sleep(0.1)
+        assert cache.get("c") is None
+        assert cache.purge_expired() == 1
@@ -0,0 +1,57 @@
+import asyncio
+
+from agentCores.agentBackends import stubBackend
+from agentCores.agentServer import agentServer
+
+
+async def chat(server, agent_id, session_id, message="hi"):
+    return "".join([token async for token in server.chat(agent_id, session_id, message)])
+
+
+def test_least_recently_used_sessions_are_evicted(cores):
+    cores.mintAgent("served", model_config={"large_language_model": "llama3"})
+
+    async def run():
+        server = agentServer(cores, backend=stubBackend(), max_sessions=2)
+        await chat(server, "served", "s1")
+        await chat(server, "served", "s2")
+        await chat(server, "served", "s1")
+        await chat(server, "served", "s3")
+        sessions = sorted(session_id for _, session_id in server._sessions)
+        await server.close()
+        return sessions
+
+    assert asyncio.run(run()) == ["s1", "s3"]
+    assert ("served", "s2") not in cores._context_windows
+    # The evicted session's turns were flushed to the conversation store
+    assert len(cores.getConversationStore("served").last_turns("s2", 10)) == 2
+
+
+def test_idle_sessions_expire(cores):
+    cores.mintAgent("served", model_config={"large_language_model": "llama3"})
+
+    async def run():
+        server = agentServer(cores, backend=stubBackend(), session_ttl=0.01)
+        await chat(server, "served", "s1")
+        await asyncio.sleep(0.05)
+        await chat(server, "served", "s2")
+        sessions = list(server._sessions)
+        await server.close()
+        return sessions
+
+    assert asyncio.run(run()) == [("served", "s2")]
+
+
+def test_agent_cache_is_bounded(cores):
+    for agent_id in ("a", "b", "c"):
+        cores.mintAgent(agent_id, model_config={"large_language_model": "llama3"})
+
+    async def run():
+        server = agentServer(cores, backend=stubBackend(), max_agents=2)
+        for agent_id in ("a", "b", "a", "c"):
+            await chat(server, agent_id, "s")
+        cached = list(server._agents)
+        await server.close()
+        return cached
+
+    assert asyncio.run(run()) == ["a", "c"]
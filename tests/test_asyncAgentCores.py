@@ -0,0 +1,34 @@
+import asyncio
+import sqlite3
+
+from agentCores import AsyncAgentCores, agentCores
+
+
+def test_close_leaves_caller_cores_open(tmp_path):
+    (tmp_path / "system").mkdir()
+    cores = agentCores(db_path=str(tmp_path / "system" / "agent_matrix.db"), pool_size=2)
+
+    async def run():
+        async with AsyncAgentCores(cores, workers=2) as facade:
+            await facade.mintAgent("kept")
+
+    asyncio.run(run())
+    assert [summary["agent_id"] for summary in cores.listAgentCores()] == ["kept"]
+    cores.close()
+
+
+def test_close_flushes_owned_cores(tmp_path):
+    (tmp_path / "system").mkdir()
+
+    async def run():
+        facade = AsyncAgentCores(db_path=str(tmp_path / "system" / "agent_matrix.db"), workers=2)
+        await facade.mintAgent("owned")
+        store = await facade.run(facade.cores.getConversationStore, "owned", flush_interval=None)
+        await facade.run(store.append, "s1", "user", "hello")
+        await facade.close()
+        return facade.cores, store.db_path
+
+    owned, db_path = asyncio.run(run())
+    assert not owned._conversation_stores
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT content FROM conversations").fetchall() == [("hello",)]
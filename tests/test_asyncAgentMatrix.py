@@ -0,0 +1,15 @@
+import asyncio
+
+from agentCores import AsyncAgentMatrix
+
+
+def test_async_round_trip(tmp_path, make_docs):
+    documents, ids = make_docs(20)
+
+    async def run():
+        async with AsyncAgentMatrix(str(tmp_path / "agents.db"), workers=4) as matrix:
+            await asyncio.gather(*(matrix.bulk_upsert(documents[i:i + 5], ids[i:i + 5]) for i in range(0, 20, 5)))
+            await matrix.delete(ids[:10])
+            return sorted((await matrix.get())["ids"])
+
+    assert asyncio.run(run()) == ids[10:]
@@ -0,0 +1,107 @@
+import os
+import threading
+
+import pytest
+
+from agentCores import ShardedAgentMatrix
+
+
+def test_rebalance_moves_every_core(tmp_path, make_docs):
+    documents, ids = make_docs(50)
+    db_path = str(tmp_path / "agents.db")
+    with ShardedAgentMatrix(db_path, shards=2) as matrix:
+        matrix.bulk_upsert(documents, ids)
+        matrix.rebalance(4)
+        assert matrix.shard_count == 4
+        assert sorted(matrix.get()["ids"]) == ids
+    with ShardedAgentMatrix(db_path) as matrix:
+        assert matrix.shard_count == 4
+        assert [row[0] for row in matrix.iter_cores()] == ids
+    assert not os.path.exists(str(tmp_path / "agents.0-of-2.db"))
+
+
+def test_interrupted_rebalance_keeps_old_shards(tmp_path, make_docs, monkeypatch):
+    documents, ids = make_docs(50)
+    db_path = str(tmp_path / "agents.db")
+    matrix = ShardedAgentMatrix(db_path, shards=2)
+    matrix.bulk_upsert(documents, ids)
+    fill_shard = ShardedAgentMatrix._fill_shard
+
+    def crash_on_shard_3(self, path, index, shards, sources):
+        if index == 3:
+            raise RuntimeError("simulated crash")
+        return fill_shard(self, path, index, shards, sources)
+
+    monkeypatch.setattr(ShardedAgentMatrix, "_fill_shard", crash_on_shard_3)
+    with pytest.raises(RuntimeError):
+        matrix.rebalance(4)
+    matrix.close()
+    monkeypatch.undo()
+
+    with ShardedAgentMatrix(db_path) as reopened:
+        assert reopened.shard_count == 2
+        assert sorted(reopened.get()["ids"]) == ids
+    with ShardedAgentMatrix(db_path, shards=2) as reopened:
+        reopened.rebalance(4)
+        assert sorted(reopened.get()["ids"]) == ids
+
+
+def test_renamed_but_uncommitted_shards_are_ignored(tmp_path, make_docs, monkeypatch):
+    """A crash after the new files are renamed into place but before the manifest switch."""
+    documents, ids = make_docs(20)
+    db_path = str(tmp_path / "agents.db")
+    matrix = ShardedAgentMatrix(db_path, shards=2)
+    matrix.bulk_upsert(documents, ids)
+
+    def crash(self, shards):
+        raise RuntimeError("simulated crash")
+
+    monkeypatch.setattr(ShardedAgentMatrix, "_write_manifest", crash)
+    with pytest.raises(RuntimeError):
+        matrix.rebalance(3)
+    matrix.close()
+    monkeypatch.undo()
+    assert os.path.exists(str(tmp_path / "agents.2-of-3.db"))
+
+    with ShardedAgentMatrix(db_path) as reopened:
+        assert reopened.shard_count == 2
+        assert sorted(reopened.get()["ids"]) == ids
+
+
+def test_failing_row_producer_rolls_back_every_shard(tmp_path, make_docs):
+    documents, ids = make_docs(30)
+
+    def rows():
+        for i, (agent_id, document) in enumerate(zip(ids, documents)):
+            if i == 10:
+                raise ValueError("producer failed")
+            yield agent_id, document, None
+
+    with ShardedAgentMatrix(str(tmp_path / "agents.db"), shards=3) as matrix:
+        with pytest.raises(ValueError):
+            matrix.upsert_rows(rows(), chunk_size=4)
+        assert matrix.get()["ids"] == []
+
+
+def test_rebalance_waits_for_writes_in_flight(tmp_path, make_docs):
+    documents, ids = make_docs(40)
+    release = threading.Event()
+
+    def rows():
+        for i, (agent_id, document) in enumerate(zip(ids, documents)):
+            if i == 20:
+                release.wait()
+            yield agent_id, document, None
+
+    with ShardedAgentMatrix(str(tmp_path / "agents.db"), shards=2) as matrix:
+        writer = threading.Thread(target=matrix.upsert_rows, args=(rows(),))
+        writer.start()
+        rebalancer = threading.Thread(target=matrix.rebalance, args=(4,))
+        rebalancer.start()
+        rebalancer.join(0.2)
+        assert rebalancer.is_alive()
+        release.set()
+        writer.join()
+        rebalancer.join()
+        assert matrix.shard_count == 4
+        assert sorted(matrix.get()["ids"]) == ids